@@ -5,24 +5,27 @@ from django.conf import settings
 from copy import copy
 
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.generic import GenericRelation
+from django.db import transaction, IntegrityError
 
+from tastypie.bundle import Bundle
 from tastypie.serializers import Serializer
 from tastypie.utils import trailing_slash
 from tastypie.constants import ALL, ALL_WITH_RELATIONS
 from tastypie import fields
 
-from biblioref.models import Reference, ReferenceSource, ReferenceAnalytic, ReferenceAlternateID, ReferenceLocal, ReferenceComplement
-from attachments.models import Attachment
+from biblioref.models import Reference, ReferenceRender
+from biblioref.prefetch import ReferenceBulkLoader
 from isis_serializer import ISISSerializer
 
-from tastypie_custom import CustomResource
+from tastypie_custom import CustomResource, KeysetPaginator
 
-from main.models import Descriptor, ResourceThematic
 from database.models import Database
+from utils.version import get_system_version
 from biblioref.field_definitions import field_tag_map
 
 import os
-import requests
+import search_service
 import urllib
 import json
 
@@ -31,6 +34,7 @@ class ReferenceResource(CustomResource):
     class Meta:
         queryset = Reference.objects.all()
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         serializer = ISISSerializer(formats=['json', 'xml', 'isis_id'], field_tag=field_tag_map)
         resource_name = 'bibliographic'
         filtering = {
@@ -59,7 +63,7 @@ class ReferenceResource(CustomResource):
                 self.wrap_view('get_search'), name="api_get_search"),
             url(r"^(?P<resource_name>%s)/get_last_id%s$" % (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('get_last_id'), name="api_get_last_id"),
-        ]
+        ] + super(ReferenceResource, self).prepend_urls()
 
     def get_search(self, request, **kwargs):
         self.method_check(request, allowed=['get'])
@@ -81,16 +85,93 @@ class ReferenceResource(CustomResource):
         else:
             fq = '(status:1 AND django_ct:biblioref.reference*)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main', 'op': op, 'output': 'site', 'lang': lang,
                          'q': q, 'fq': fq, 'start': start, 'count': count, 'id': id, 'sort': sort}
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
+
+    def build_bundles(self, request, objects):
+        # bundles of stored renderings, only references changed since last request are dehydrated
+        renders = self.get_renders(request, objects)
+
+        return [Bundle(obj=obj, data=json.loads(renders[obj.pk].json), request=request) for obj in objects]
+
+    def iter_chunk_isis_id(self, request, objects):
+        renders = self.get_renders(request, objects)
+
+        return (renders[obj.pk].isis_id.encode('utf-8') for obj in objects)
+
+    def get_renders(self, request, objects):
+        """
+        Return dict with the stored rendering (JSON and ISIS ID) of each reference. Missing or invalid
+        renderings are built and stored. Renderings are invalidated on change of the reference or of its
+        related rows (see biblioref.models.rendered_reference_ids)
+        """
+        version = get_system_version()
+        stored = ReferenceRender.objects.in_bulk([obj.pk for obj in objects])
+        renders = dict((pk, render) for pk, render in stored.items() if render.is_valid(version))
+
+        missing = [obj for obj in objects if obj.pk not in renders]
+        if missing:
+            serializer = self._meta.serializer
+            new_renders = []
+            for bundle in self.dehydrate_bundles(request, missing):
+                isis_id = serializer.to_isis_id({'objects': [bundle]}).decode('utf-8')
+                render = ReferenceRender(reference_id=bundle.obj.pk, system_version=version,
+                                         json=serializer.to_json(bundle), isis_id=isis_id)
+                new_renders.append(render)
+                renders[bundle.obj.pk] = render
+
+            read_versions = dict((pk, render.version) for pk, render in stored.items())
+            self.store_renders(new_renders, read_versions)
+
+        return renders
+
+    def store_renders(self, new_renders, read_versions):
+        """
+        Store renderings of references not invalidated (changed) after they were read. read_versions
+        is the version of the renderings read before build (no entry if there was no rendering)
+        """
+        reference_ids = [render.reference_id for render in new_renders]
+        try:
+            with transaction.atomic():
+                # invalidations of the locked renderings wait the end of transaction
+                current_versions = dict(ReferenceRender.objects.select_for_update().filter(reference__in=reference_ids)
+                                                               .values_list('reference_id', 'version'))
+                valid_renders = [render for render in new_renders
+                                 if current_versions.get(render.reference_id) == read_versions.get(render.reference_id)]
+                # version is kept, only invalidations change it
+                for render in valid_renders:
+                    render.version = current_versions.get(render.reference_id, 0)
+
+                ReferenceRender.objects.filter(reference__in=[render.reference_id for render in valid_renders
+                                                              if render.reference_id in current_versions]).delete()
+                ReferenceRender.objects.bulk_create(valid_renders)
+        except IntegrityError:
+            # stored or invalidated at same time by other request
+            pass
+
+    def dehydrate_bundles(self, request, objects):
+        # load related data of all references of the page with a few bulk queries (see ReferenceBulkLoader)
+        loader = ReferenceBulkLoader(objects)
+
+        bundles = []
+        for obj in objects:
+            bundle = self.build_bundle(obj=obj, request=request)
+            bundle.loader = loader
+            bundles.append(self.full_dehydrate(bundle, for_list=True))
+
+        return bundles
+
+    def get_loader(self, bundle):
+        # detail requests don't pass by get_list, create a loader for the single object
+        if not getattr(bundle, 'loader', None):
+            bundle.loader = ReferenceBulkLoader([bundle.obj])
+
+        return bundle.loader
 
     def full_dehydrate(self, bundle, for_list=False):
         # complete bundle fields with child fields. Ex. Analytic and Source fields to Reference
@@ -99,11 +180,7 @@ class ReferenceResource(CustomResource):
         bundle = super(ReferenceResource, self).full_dehydrate(bundle)
 
         # Check type of Reference to add additional fields to bundle
-        reference_id = bundle.obj.id
-        if 'a' in bundle.data['treatment_level']:
-            obj = ReferenceAnalytic.objects.get(pk=reference_id)
-        else:
-            obj = ReferenceSource.objects.get(pk=reference_id)
+        obj = self.get_loader(bundle).get_child(bundle.obj)
 
         # Add additional fields to bundle
         bundle = self.add_fields_to_bundle(bundle, obj)
@@ -120,20 +197,25 @@ class ReferenceResource(CustomResource):
                                  'total_number_of_volumes', 'thesis_dissertation_leader',
                                  'thesis_dissertation_institution', 'thesis_dissertation_academic_title']
 
-            source_id = bundle.data['source']
-            obj_source = ReferenceSource.objects.get(pk=source_id)
+            # source is loaded with the analytic (select_related)
+            obj_source = obj.source
             bundle = self.add_fields_to_bundle(bundle, obj_source, import_field_list)
             bundle.data['source_control'] = 'FONTE'
 
         # Add system version control number
-        version_file = open(os.path.join(settings.PROJECT_ROOT_PATH, 'templates/version.txt'))
-        version_number = version_file.readlines()[0]
-        bundle.data['system_version'] = version_number.rstrip()
+        bundle.data['system_version'] = get_system_version()
 
         return bundle
 
     def add_fields_to_bundle(self, bundle, obj, import_field_list=[]):
         for field in obj._meta.get_fields():
+            # skip reverse relations, parent link (reference_ptr) and generic relations (logs)
+            if (field.is_relation and field.auto_created) or isinstance(field, GenericRelation):
+                continue
+            # if import_field_list is present only import fields of the list
+            if import_field_list and field.name not in import_field_list:
+                continue
+
             field_value = getattr(obj, field.name, {})
 
             # check if field has multiples values (ex. ManyToManyField)
@@ -143,10 +225,8 @@ class ReferenceResource(CustomResource):
                     continue
 
             if field_value:
-                # if import_field_list is present check if field is the list
                 if import_field_list:
-                    if field.name in import_field_list:
-                        bundle.data[field.name] = copy(field_value)
+                    bundle.data[field.name] = copy(field_value)
                 # check if field is not already in bundle or has no value in bundle.data
                 elif field.name not in bundle.data or not bundle.data.get(field.name):
                     bundle.data[field.name] = copy(field_value)
@@ -154,16 +234,15 @@ class ReferenceResource(CustomResource):
         return bundle
 
     def dehydrate(self, bundle):
-        # retrive child class of reference (analytic or source) for use in ContentType query
-        child_class = bundle.obj.child_class()
-        c_type = ContentType.objects.get_for_model(child_class)
+        # related data of reference (analytic or source) is loaded in bulk for all page objects
+        loader = self.get_loader(bundle)
 
-        descriptors = Descriptor.objects.filter(object_id=bundle.obj.id, content_type=c_type, status=1)
-        thematic_areas = ResourceThematic.objects.filter(object_id=bundle.obj.id, content_type=c_type, status=1)
-        attachments = Attachment.objects.filter(object_id=bundle.obj.id, content_type=c_type)
-        alternate_ids = ReferenceAlternateID.objects.filter(reference_id=bundle.obj.id)
-        library_records = ReferenceLocal.objects.filter(source=bundle.obj.id)
-        complement_data = ReferenceComplement.objects.filter(source=bundle.obj.id)
+        descriptors = [d for d in loader.get_descriptors(bundle.obj) if d.status == 1]
+        thematic_areas = [t for t in loader.get_thematics(bundle.obj) if t.status == 1]
+        attachments = loader.get_attachments(bundle.obj)
+        alternate_ids = loader.get_alternate_ids(bundle.obj)
+        library_records = loader.get_library_records(bundle.obj)
+        complement_data = loader.get_complements(bundle.obj)
 
         # create lists for primary and secundary descriptors
         descriptors_primary = []
@@ -186,7 +265,9 @@ class ReferenceResource(CustomResource):
         bundle.data['descriptors_secondary'] = descriptors_secundary
         bundle.data['thematic_areas'] = [{'text': thematic.thematic_area.name} for thematic in thematic_areas]
         bundle.data['alternate_ids'] = [alt.alternate_id for alt in alternate_ids]
-        bundle.data['indexed_database'] = [database.acronym for database in bundle.obj.indexed_database.all()]
+        # indexed_database is prefetched with the child record (same relation of parent)
+        indexed_database = loader.get_child(bundle.obj).indexed_database.all()
+        bundle.data['indexed_database'] = [database.acronym for database in indexed_database]
 
         electronic_address = []
         for attach in attachments:
@@ -223,11 +304,13 @@ class ReferenceResource(CustomResource):
             local_databases = []
             for library in library_records:
                 for field in library._meta.get_fields():
+                    if field.name in ('source', 'id', 'cooperative_center_code'):
+                        continue
                     field_value = getattr(library, field.name, {})
                     if field.name == 'database':
                         local_db_list = [line.strip() for line in field_value.split('\n') if line.strip()]
                         local_databases.extend(local_db_list)
-                    elif field.name != 'source' and field.name != 'id' and field.name != 'cooperative_center_code':
+                    else:
                         bundle.data[field.name] = copy(field_value)
 
             if local_databases:
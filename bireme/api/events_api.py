@@ -5,10 +5,11 @@ from django.conf.urls import patterns, url, include
 from tastypie.resources import ModelResource
 from tastypie.utils import trailing_slash
 from tastypie import fields
+from tastypie_custom import KeysetPaginator
 
 from  events.models import Event
 
-import requests
+import search_service
 import urllib
 
 class EventResource(ModelResource):
@@ -16,6 +17,7 @@ class EventResource(ModelResource):
     class Meta:
         queryset = Event.objects.filter(status=1)
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         resource_name = 'event'
         filtering = {
             'thematic_area_id': 'exact',
@@ -57,17 +59,14 @@ class EventResource(ModelResource):
         else:
             fq = '(status:1 AND django_ct:events.event)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': lang,
                     'q': q , 'fq': fq,  'start': start, 'count': count, 'id' : id, 'sort': sort}
 
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
     def get_next(self, request, **kwargs):
         self.method_check(request, allowed=['get'])
@@ -87,17 +86,14 @@ class EventResource(ModelResource):
 
         q = 'start_date:[NOW TO *]'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': 'pt',
                     'q': q , 'fq': fq, 'sort': sort}
 
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
     def get_last_id(self, request, **kwargs):
         self.method_check(request, allowed=['get'])
@@ -16,10 +16,13 @@ class ISISSerializer(Serializer):
         return super(ISISSerializer, self).__init__(formats, content_types, datetime_formatting)
 
     def to_isis_id(self, data, options=None):
+        return ''.join(self.iter_isis_id(data, options))
+
+    def iter_isis_id(self, data, options=None):
+        """
+        Generator that yield each record of data in ISIS ID format (used for streaming exports)
+        """
         options = options or {}
-        context = {}
-        id_lines = []
-        record_lines = []
         data = self.to_simple(data, options)
 
         objects = data.get('objects', [])
@@ -27,7 +30,7 @@ class ISISSerializer(Serializer):
         for item in objects:
             # Add line that represent new record
             mfn_line = "!ID 00000\n"
-            id_lines.append(mfn_line)
+            id_lines = [mfn_line]
 
             record_lines = []
             for field_name in item:
@@ -81,7 +84,7 @@ class ISISSerializer(Serializer):
             id_lines.extend(record_lines)
             id_lines.append("\n")
 
-        return ''.join(id_lines)
+            yield ''.join(id_lines)
 
     def id_field(self, field, value):
         id_field = ''
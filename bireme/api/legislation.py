@@ -8,11 +8,12 @@ from tastypie.resources import ModelResource
 from tastypie.serializers import Serializer
 from tastypie.utils import trailing_slash
 from tastypie import fields
+from tastypie_custom import KeysetPaginator
 
 from main.models import Descriptor, ResourceThematic
 from leisref.models import Act
 
-import requests
+import search_service
 import urllib
 
 
@@ -21,6 +22,7 @@ class LeisrefResource(ModelResource):
     class Meta:
         queryset = Act.objects.filter(status=1)
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         serializer = Serializer(formats=['json', 'xml'])
         resource_name = 'leisref'
         filtering = {
@@ -54,16 +56,13 @@ class LeisrefResource(ModelResource):
         else:
             fq = '(status:1 AND django_ct:leisref.act)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main', 'op': op,'output': 'site', 'lang': lang,
                          'q': q, 'fq': fq,  'start': start, 'count': count, 'id': id, 'sort': sort}
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
     def dehydrate(self, bundle):
         c_type = ContentType.objects.get_for_model(bundle.obj)
@@ -1,7 +1,7 @@
 #! coding: utf-8
 import os
 import json
-import requests
+import search_service
 import math
 import re
 
@@ -67,14 +67,13 @@ def search(request):
     else:
         fq = '(status:1 AND django_ct:main.resource)'
 
-    # url
-    search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
     search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': 'pt', 
                 'q': q , 'fq': fq,  'start': start, 'count': count, 'id' : id,'sort': sort}
 
-    request_result = requests.post(search_url, data=search_params)
-    result = request_result.json()
+    try:
+        result = search_service.search(search_params)
+    except search_service.SearchServiceError as error:
+        return error.response
     total = result['diaServerResponse'][0]['response']['numFound']
 
     pages_count = 10
@@ -8,11 +8,12 @@ from tastypie.resources import ModelResource
 from tastypie.serializers import Serializer
 from tastypie.utils import trailing_slash
 from tastypie import fields
+from tastypie_custom import KeysetPaginator
 
 from multimedia.models import Media
 
 from  main.models import Descriptor, ResourceThematic
-import requests
+import search_service
 import urllib
 
 class MediaResource(ModelResource):
@@ -20,6 +21,7 @@ class MediaResource(ModelResource):
     class Meta:
         queryset = Media.objects.filter(status=1)
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         serializer = Serializer(formats=['json', 'xml'])
         resource_name = 'multimedia'
         filtering = {
@@ -60,16 +62,13 @@ class MediaResource(ModelResource):
         else:
             fq = '(status:1 AND django_ct:multimedia.media)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': lang,
                     'q': q , 'fq': fq,  'start': start, 'count': count, 'id' : id,'sort': sort}
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
 
     def dehydrate(self, bundle):
@@ -8,12 +8,13 @@ from tastypie.resources import ModelResource
 from tastypie.serializers import Serializer
 from tastypie.utils import trailing_slash
 from tastypie import fields
+from tastypie_custom import KeysetPaginator
 
 from oer.models import *
 from attachments.models import Attachment
 
 from  main.models import Descriptor, ResourceThematic
-import requests
+import search_service
 import urllib
 
 class OERResource(ModelResource):
@@ -29,6 +30,7 @@ class OERResource(ModelResource):
     class Meta:
         queryset = OER.objects.filter(status=1)
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         serializer = Serializer(formats=['json', 'xml'])
         resource_name = 'oer'
         filtering = {
@@ -71,18 +73,15 @@ class OERResource(ModelResource):
         else:
             fq = '(status:1 AND django_ct:oer.oer)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': lang,
                     'q': q , 'fq': fq,  'start': start, 'count': count, 'id' : id,'sort': sort}
 
         print search_params
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
 
     def dehydrate(self, bundle):
@@ -8,9 +8,10 @@ from tastypie.resources import ModelResource
 from tastypie.constants import ALL_WITH_RELATIONS
 from tastypie.utils import trailing_slash
 from tastypie import fields
+from tastypie_custom import KeysetPaginator
 from main.models import Resource, ResourceThematic, Descriptor, SourceType, SourceLanguage
 
-import requests
+import search_service
 import urllib
 
 class LinkResource(ModelResource):
@@ -18,6 +19,7 @@ class LinkResource(ModelResource):
     class Meta:
         queryset = Resource.objects.filter(status=1)
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         resource_name = 'resource'
         filtering = {
             'thematic_area_id': 'exact',
@@ -58,16 +60,13 @@ class LinkResource(ModelResource):
         else:
             fq = '(status:1 AND django_ct:main.resource)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main','op': op,'output': 'site', 'lang': lang,
                     'q': q , 'fq': fq,  'start': start, 'count': count, 'id' : id,'sort': sort}
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
 
     def dehydrate(self, bundle):
@@ -0,0 +1,138 @@
+#! coding: utf-8
+from django.conf import settings
+from django.http import HttpResponse
+
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from tastypie.exceptions import ImmediateHttpResponse
+
+import json
+import requests
+import threading
+import time
+
+
+def cache_key(url, params):
+    """
+    Return key of search result in cache (same parameters in any order share the result)
+    """
+    return (url, tuple(sorted((key, unicode(value)) for key, value in params.items())))
+
+
+class SearchServiceError(ImmediateHttpResponse):
+    """
+    Search service unavailable (error response, connection error or timeout) and no cached result.
+    API resources return the response (502 Bad Gateway or 504 Gateway Timeout) to clients.
+    """
+    def __init__(self, error):
+        status = 504 if isinstance(error, requests.Timeout) else 502
+        content = json.dumps({'error': 'search service unavailable'})
+        super(SearchServiceError, self).__init__(HttpResponse(content, status=status,
+                                                              content_type='application/json'))
+
+
+class SearchServiceClient(object):
+    """
+    Client of the search service (iahx-controller) shared by the API resources.
+
+    Requests are sent by a session that keep a pool of connections. Results are kept in a per-process
+    cache for `ttl` seconds. Expired results are still returned for `stale_ttl` seconds while a new
+    result is requested in background (stale-while-revalidate). If the service fails the last cached
+    result is returned, whatever its age. Cached results must not be modified.
+    """
+
+    def __init__(self, url=None, timeout=None, ttl=None, stale_ttl=None, max_entries=None, pool_size=10):
+        self._url = url
+        self.timeout = timeout or settings.SEARCH_SERVICE_TIMEOUT
+        self.ttl = settings.SEARCH_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = settings.SEARCH_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.max_entries = max_entries or settings.SEARCH_CACHE_MAX_ENTRIES
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.cache = OrderedDict()
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return self._url or "%siahx-controller/" % settings.SEARCH_SERVICE_URL
+
+    def search(self, params):
+        url = self.url
+        key = cache_key(url, params)
+
+        with self.lock:
+            entry = self.cache.pop(key, None)
+            if entry:
+                # most recently used entries are kept at the end
+                self.cache[key] = entry
+
+        if entry:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.refresh_in_background(url, key, params)
+                return entry[1]
+
+        try:
+            return self.update(url, key, params)
+        except (requests.RequestException, ValueError) as error:
+            if entry:
+                return entry[1]
+            raise SearchServiceError(error)
+
+    def fetch(self, url, params):
+        response = self.session.post(url, data=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        return response.json()
+
+    def update(self, url, key, params):
+        result = self.fetch(url, params)
+
+        with self.lock:
+            self.cache.pop(key, None)
+            self.cache[key] = (time.time(), result)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+        return result
+
+    def refresh_in_background(self, url, key, params):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        thread = threading.Thread(target=self.refresh, args=(url, key, params))
+        thread.daemon = True
+        thread.start()
+
+    def refresh(self, url, key, params):
+        try:
+            self.update(url, key, params)
+        except (requests.RequestException, ValueError):
+            # stale result is kept, refresh is tried again at next request
+            pass
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+search_client = SearchServiceClient()
+
+
+def search(params):
+    """
+    Return search service result (JSON) for params. Raise SearchServiceError if service is unavailable
+    """
+    return search_client.search(params)
@@ -1,9 +1,29 @@
+from django.conf import settings
+from django.conf.urls import url
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
 from tastypie.bundle import Bundle
+from tastypie.exceptions import BadRequest
 from tastypie.fields import ApiField, CharField
+from tastypie.paginator import Paginator
 from tastypie.resources import ModelResource
+from tastypie.utils import trailing_slash
+
+from datetime import timedelta
+
+from log.models import ChangeJournal
 
 from utils.fields import JSONField, MultipleAuxiliaryChoiceField
 
+import base64
+import json
+import urllib
+
 
 class JSONApiField(ApiField):
     """
@@ -33,10 +53,124 @@ class ListApiField(ApiField):
         return value
 
 
+class KeysetPaginator(Paginator):
+    """
+    Paginator that seeks the next page from the key of the last object of the current page (opaque
+    `cursor` parameter of the `next` link) instead of using OFFSET, so page N costs the same as page 1.
+
+    Objects are ordered by id, or by (updated_time, id) if the list is filtered by updated_time__gte/gt.
+    Requests with `offset` or `order_by` are paginated by offset as before. The total count is returned
+    at the first page and at cursor pages only if requested (count=true), count=false skip it at any page.
+    """
+
+    def use_keyset(self):
+        return (isinstance(self.objects, QuerySet) and 'offset' not in self.request_data and
+                'order_by' not in self.request_data)
+
+    def get_seek_fields(self):
+        field_names = [field.name for field in self.objects.model._meta.concrete_fields]
+        if 'updated_time' in field_names and ('updated_time__gte' in self.request_data or
+                                              'updated_time__gt' in self.request_data):
+            return ('updated_time', 'id')
+
+        return ('id',)
+
+    def include_count(self, first_page):
+        count = self.request_data.get('count', '')
+        if count:
+            return count.lower() not in ('false', '0')
+
+        return first_page
+
+    def encode_cursor(self, obj, seek_fields):
+        key = {}
+        for field in seek_fields:
+            value = getattr(obj, field)
+            key[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+
+        return base64.urlsafe_b64encode(json.dumps(key))
+
+    def decode_cursor(self, cursor, seek_fields):
+        try:
+            key = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if 'updated_time' in seek_fields:
+                key['updated_time'] = parse_datetime(key['updated_time'])
+            return [key[field] for field in seek_fields]
+        except (TypeError, ValueError, KeyError):
+            raise BadRequest("Invalid cursor '%s' provided." % cursor)
+
+    def seek(self, objects, seek_fields, cursor):
+        values = self.decode_cursor(cursor, seek_fields)
+        if len(seek_fields) == 1:
+            return objects.filter(id__gt=values[0])
+
+        updated_time, last_id = values
+        return objects.filter(Q(updated_time__gt=updated_time) | Q(updated_time=updated_time, id__gt=last_id))
+
+    def get_count(self):
+        # pagination by offset keep the count unless count=false
+        if not self.include_count(first_page=True):
+            return None
+
+        return super(KeysetPaginator, self).get_count()
+
+    def get_next(self, limit, offset, count):
+        if count is None:
+            # check if there are more objects without count
+            return self._generate_uri(limit, offset + limit) if self.objects[offset + limit:offset + limit + 1] else None
+
+        return super(KeysetPaginator, self).get_next(limit, offset, count)
+
+    def page(self):
+        if not self.use_keyset():
+            return super(KeysetPaginator, self).page()
+
+        limit = self.get_limit()
+        seek_fields = self.get_seek_fields()
+        cursor = self.request_data.get('cursor')
+
+        objects = self.objects.order_by(*seek_fields)
+        meta = {'limit': limit}
+        if self.include_count(first_page=not cursor):
+            meta['total_count'] = objects.count()
+
+        if cursor:
+            objects = self.seek(objects, seek_fields, cursor)
+
+        if not limit:
+            return {self.collection_name: objects, 'meta': meta}
+
+        # read one more object to know if there is a next page
+        page_objects = list(objects[:limit + 1])
+        meta['previous'] = None
+        meta['next'] = None
+        if len(page_objects) > limit:
+            page_objects = page_objects[:limit]
+            meta['next'] = self.generate_cursor_uri(self.encode_cursor(page_objects[-1], seek_fields))
+
+        return {self.collection_name: page_objects, 'meta': meta}
+
+    def generate_cursor_uri(self, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = self.request_data.copy()
+        request_params['cursor'] = cursor
+        try:
+            encoded_params = request_params.urlencode()
+        except AttributeError:
+            encoded_params = urllib.urlencode(request_params)
+
+        return '%s?%s' % (self.resource_uri, encoded_params)
+
+
 class CustomResource(ModelResource):
     """
     ModelResource subclass that handles looking up models by slugs rather than IDs.
     """
+    # number of records loaded by query in streaming exports
+    export_chunk_size = 500
+
     @classmethod
     def api_field_from_django_field(cls, f, default=CharField):
         """
@@ -48,3 +182,141 @@ class CustomResource(ModelResource):
             return ListApiField
 
         return super(CustomResource, cls).api_field_from_django_field(f, default)
+
+    def dispatch_list(self, request, **kwargs):
+        """
+        Full exports in ISIS ID format (format=isis_id&limit=0) are streamed. The default dispatch
+        only accept HttpResponse objects so the checks are done here and the stream returned directly
+        """
+        if self.is_stream_export(request):
+            self.method_check(request, allowed=['get'])
+            self.is_authenticated(request)
+            self.throttle_check(request)
+            self.log_throttled_access(request)
+
+            return self.get_list_stream(request, **kwargs)
+
+        return super(CustomResource, self).dispatch_list(request, **kwargs)
+
+    def prepend_urls(self):
+        return [
+            url(r"^(?P<resource_name>%s)/changes%s$" % (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('get_changes'), name="api_get_changes"),
+        ]
+
+    def get_changes(self, request, **kwargs):
+        """
+        Change feed: changes (insert/update/delete) of records after the sequence number `since`
+        with the current content of inserted/updated records. Clients store meta.next_since and
+        use it at the next request.
+
+        Sequence numbers are assigned at insert but become visible at commit, so a lower number can
+        appear after a higher one was served. Only changes older than CHANGE_FEED_COMMIT_LAG seconds
+        (the horizon, greater than the duration of any transaction) are returned.
+        """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        try:
+            since = int(request.GET.get('since', 0))
+            limit = int(request.GET.get('limit', self._meta.limit))
+        except ValueError:
+            raise BadRequest("Invalid since or limit provided. Please provide integers.")
+
+        if limit <= 0 or limit > self._meta.max_limit:
+            limit = self._meta.max_limit
+
+        horizon = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_COMMIT_LAG)
+        c_type = ContentType.objects.get_for_model(self._meta.object_class)
+        changes = list(ChangeJournal.objects.filter(content_type=c_type, id__gt=since, created_time__lte=horizon)
+                                            .order_by('id')[:limit])
+
+        changed_ids = set(change.object_id for change in changes if change.action != ChangeJournal.DELETE)
+        objects = list(self.get_object_list(request).filter(pk__in=changed_ids).order_by('pk')) if changed_ids else []
+
+        next_since = changes[-1].id if changes else since
+        next_uri = None
+        if len(changes) == limit:
+            request_params = request.GET.copy()
+            request_params['since'] = next_since
+            next_uri = '%s?%s' % (request.path, request_params.urlencode())
+
+        data = {
+            'meta': {'since': since, 'next_since': next_since, 'limit': limit, 'next': next_uri},
+            'changes': [{'sequence': change.id, 'action': change.get_action_display(), 'id': change.object_id,
+                         'time': change.created_time} for change in changes],
+            'objects': self.build_bundles(request, objects),
+        }
+
+        self.log_throttled_access(request)
+        return self.create_response(request, data)
+
+    def is_stream_export(self, request):
+        serializer = self._meta.serializer
+
+        return (request.GET.get('format') == 'isis_id' and request.GET.get('limit') == '0' and
+                'isis_id' in serializer.formats)
+
+    def get_list(self, request, **kwargs):
+        """
+        Same as ModelResource.get_list but dehydrate page objects using build_bundles
+        """
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        paginator = self._meta.paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_uri(),
+                                               limit=self._meta.limit, max_limit=self._meta.max_limit,
+                                               collection_name=self._meta.collection_name)
+        to_be_serialized = paginator.page()
+
+        page_objects = list(to_be_serialized[self._meta.collection_name])
+        to_be_serialized[self._meta.collection_name] = self.build_bundles(request, page_objects)
+        to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
+
+        return self.create_response(request, to_be_serialized)
+
+    def build_bundles(self, request, objects):
+        """
+        Return the dehydrated bundles of a list of objects. Resources can override to load
+        related data of all objects at once
+        """
+        bundles = []
+        for obj in objects:
+            bundle = self.build_bundle(obj=obj, request=request)
+            bundles.append(self.full_dehydrate(bundle, for_list=True))
+
+        return bundles
+
+    def get_list_stream(self, request, **kwargs):
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        content_type = self._meta.serializer.content_types['isis_id']
+
+        return StreamingHttpResponse(self.iter_isis_id(request, objects), content_type=content_type)
+
+    def iter_isis_id(self, request, objects):
+        """
+        Walk the filtered queryset in chunks ordered by id (keyset pagination) and yield
+        the records in ISIS ID format, keeping in memory only one chunk at time
+        """
+        last_id = 0
+
+        while True:
+            chunk = list(objects.filter(id__gt=last_id).order_by('id')[:self.export_chunk_size])
+            if not chunk:
+                break
+
+            for record in self.iter_chunk_isis_id(request, chunk):
+                yield record
+
+            last_id = chunk[-1].id
+
+    def iter_chunk_isis_id(self, request, objects):
+        """
+        Yield the records of a chunk of the export in ISIS ID format
+        """
+        bundles = self.build_bundles(request, objects)
+
+        return self._meta.serializer.iter_isis_id({'objects': bundles})
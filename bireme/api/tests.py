@@ -0,0 +1,430 @@
+# coding: utf-8
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from main.models import Descriptor, ResourceThematic, ThematicArea
+from biblioref.models import Reference, ReferenceSource, ReferenceAnalytic, ReferenceLocal, ReferenceComplement, \
+                             ReferenceAlternateID, ReferenceRender
+from database.models import Database
+from log.models import ChangeJournal
+
+from utils.tests import BaseTestCase
+from api.bibliographic import ReferenceResource
+from api.search_service import SearchServiceClient, SearchServiceError, search_client
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from datetime import timedelta
+
+import json
+import threading
+import time
+
+
+class BibliographicApiTest(BaseTestCase):
+    """
+    Tests for bibliographic API (api/bibliographic)
+    """
+
+    def setUp(self):
+        super(BibliographicApiTest, self).setUp()
+
+        self.database = Database.objects.create(acronym='LILACS', regional_index=True)
+        self.thematic = ThematicArea.objects.create(acronym='LISBR1.1', name='Teste')
+        self.source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                     title_serial='Rev. Enfermagem', volume_serial='10',
+                                                     issue_number='2', publication_date_normalized='20160501')
+
+    def create_analytics(self, total):
+        c_type = ContentType.objects.get_for_model(ReferenceAnalytic)
+
+        for count in range(total):
+            analytic = ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as',
+                                                        source=self.source,
+                                                        title=[{'text': 'Analytic %s' % count, '_i': 'pt'}])
+            analytic.indexed_database.add(self.database)
+
+            Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, text='malaria',
+                                      code='^d8462', status=1, primary=True)
+            Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, text='dengue',
+                                      code='^d3878', status=1)
+            ResourceThematic.objects.create(object_id=analytic.pk, content_type=c_type,
+                                            thematic_area=self.thematic, status=1)
+            ReferenceAlternateID.objects.create(reference=analytic, alternate_id='ALT-%s' % count)
+            ReferenceLocal.objects.create(source=analytic, database='LOCAL\nBR1.1', call_number=[{'text': 'XX'}])
+            ReferenceComplement.objects.create(source=analytic, conference_name='Congress %s' % count)
+
+    def count_list_queries(self, limit):
+        url = '/api/bibliographic/?format=json&limit=%s' % limit
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(context.captured_queries)
+
+    def test_list_number_of_queries(self):
+        """
+        Number of queries of a page is constant (don't depend of the number of records of page)
+        """
+        self.create_analytics(10)
+
+        # first request populate ContentType cache
+        self.count_list_queries(1)
+
+        queries_small_page = self.count_list_queries(2)
+        queries_large_page = self.count_list_queries(10)
+
+        self.assertEqual(queries_small_page, queries_large_page)
+
+    def test_list_content(self):
+        """
+        Related data loaded in bulk is present at output
+        """
+        self.create_analytics(2)
+
+        response = self.client.get('/api/bibliographic/?format=json&limit=10')
+
+        self.assertContains(response, '^d8462')
+        self.assertContains(response, 'ALT-1')
+        self.assertContains(response, 'Congress 1')
+        self.assertContains(response, 'Rev. Enfermagem')
+        self.assertContains(response, 'LILACS')
+
+    def test_isis_id_stream_export(self):
+        """
+        Full export in ISIS ID format (limit=0) is streamed in chunks with all records
+        """
+        self.create_analytics(5)
+
+        # force more than one chunk
+        chunk_size = ReferenceResource.export_chunk_size
+        ReferenceResource.export_chunk_size = 2
+        try:
+            response = self.client.get('/api/bibliographic/?format=isis_id&limit=0')
+            self.assertTrue(response.streaming)
+            content = ''.join(response.streaming_content)
+        finally:
+            ReferenceResource.export_chunk_size = chunk_size
+
+        # source + 5 analytics
+        self.assertEqual(content.count('!ID 00000'), 6)
+        self.assertIn('FI-ADMIN^i6^bLILACS', content)
+
+        # same records of the regular (non streaming) export
+        response = self.client.get('/api/bibliographic/?format=isis_id&limit=10')
+        self.assertEqual(response.content.count('!ID 00000'), 6)
+
+    def test_render_cache(self):
+        """
+        Renderings are stored at first export and removed on change of the reference or related rows
+        """
+        self.create_analytics(1)
+        analytic = ReferenceAnalytic.objects.get()
+
+        first = json.loads(self.client.get('/api/bibliographic/?format=json&limit=10').content)
+        self.assertEqual(self.valid_renders().count(), 2)
+
+        second = json.loads(self.client.get('/api/bibliographic/?format=json&limit=10').content)
+        self.assertEqual(first['objects'], second['objects'])
+
+        # stream export use stored ISIS ID records
+        content = ''.join(self.client.get('/api/bibliographic/?format=isis_id&limit=0').streaming_content)
+        self.assertIn('FI-ADMIN^i%s^bLILACS' % analytic.pk, content)
+
+        c_type = ContentType.objects.get_for_model(ReferenceAnalytic)
+        Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, text='zika', code='^d5555', status=1)
+        self.assertFalse(self.valid_renders().filter(reference=analytic.pk).exists())
+        self.assertTrue(self.valid_renders().filter(reference=self.source.pk).exists())
+
+        response = self.client.get('/api/bibliographic/?format=json&limit=10')
+        self.assertContains(response, '^d5555')
+
+        # analytics include fields of source
+        self.source.title_serial = 'Rev. Enfermagem Atual'
+        self.source.save()
+        self.assertEqual(self.valid_renders().count(), 0)
+
+        response = self.client.get('/api/bibliographic/?format=isis_id&limit=10')
+        self.assertEqual(response.content.count('Rev. Enfermagem Atual'), 2)
+
+    def valid_renders(self):
+        return ReferenceRender.objects.exclude(json='')
+
+    def test_render_invalidated_by_auxiliary_tables(self):
+        """
+        Renderings include names of thematic areas and acronyms of databases
+        """
+        self.create_analytics(1)
+
+        self.client.get('/api/bibliographic/?format=json&limit=10')
+        self.thematic.name = 'Saude Publica'
+        self.thematic.save()
+        self.assertEqual(list(self.valid_renders().values_list('reference', flat=True)), [self.source.pk])
+        self.assertContains(self.client.get('/api/bibliographic/?format=json&limit=10'), 'Saude Publica')
+
+        self.database.acronym = 'LILACS-Express'
+        self.database.save()
+        self.assertEqual(list(self.valid_renders().values_list('reference', flat=True)), [self.source.pk])
+        self.assertContains(self.client.get('/api/bibliographic/?format=json&limit=10'), 'LILACS-Express')
+
+        # references without rendering don't get an empty one
+        ReferenceRender.objects.all().delete()
+        self.thematic.save()
+        self.database.save()
+        self.assertFalse(ReferenceRender.objects.exists())
+
+    def test_render_changed_while_built(self):
+        """
+        Rendering of a reference changed after it was read is returned but not stored
+        """
+        self.create_analytics(1)
+        analytic = ReferenceAnalytic.objects.get()
+        c_type = ContentType.objects.get_for_model(ReferenceAnalytic)
+        self.client.get('/api/bibliographic/?format=json&limit=10')
+        self.source.save()
+
+        dehydrate_bundles = ReferenceResource.dehydrate_bundles
+
+        def dehydrate_and_change(resource, request, objects):
+            bundles = dehydrate_bundles(resource, request, objects)
+            # saved by other request
+            Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, text='zika', code='^d5555',
+                                      status=1)
+            return bundles
+
+        ReferenceResource.dehydrate_bundles = dehydrate_and_change
+        try:
+            response = self.client.get('/api/bibliographic/?format=json&limit=10')
+        finally:
+            ReferenceResource.dehydrate_bundles = dehydrate_bundles
+
+        self.assertNotContains(response, '^d5555')
+        self.assertEqual(list(self.valid_renders().values_list('reference', flat=True)), [self.source.pk])
+        self.assertContains(self.client.get('/api/bibliographic/?format=json&limit=10'), '^d5555')
+
+    def test_render_not_journaled(self):
+        """
+        Building and invalidating renderings are not changes of records
+        """
+        self.create_analytics(1)
+        journal_size = ChangeJournal.objects.count()
+
+        self.client.get('/api/bibliographic/?format=json&limit=10')
+        ReferenceRender.objects.all().update(json='')
+        self.client.get('/api/bibliographic/?format=json&limit=10')
+
+        self.assertEqual(ChangeJournal.objects.count(), journal_size)
+
+    def test_keyset_pagination(self):
+        """
+        Following the next cursor return all records once, with count only at first page
+        """
+        self.create_analytics(5)
+
+        ids = []
+        url = '/api/bibliographic/?format=json&limit=2'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            pages.append(data['meta'])
+            ids.extend(obj['id'] for obj in data['objects'])
+            url = data['meta']['next']
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages[0]['total_count'], 6)
+        self.assertNotIn('total_count', pages[1])
+        self.assertEqual(sorted(ids), sorted(Reference.objects.values_list('pk', flat=True)))
+
+        # offset pagination is kept for compatibility
+        response = self.client.get('/api/bibliographic/?format=json&limit=2&offset=4')
+        data = json.loads(response.content)
+        self.assertEqual(data['meta']['total_count'], 6)
+        self.assertEqual([obj['id'] for obj in data['objects']], sorted(ids)[4:])
+
+    @override_settings(CHANGE_FEED_COMMIT_LAG=0)
+    def test_change_feed(self):
+        """
+        Change feed return changes after the sequence number with the current content of records
+        """
+        self.create_analytics(1)
+        analytic = ReferenceAnalytic.objects.get()
+        other = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                               title_serial='Rev. Medicina')
+
+        data = json.loads(self.client.get('/api/bibliographic/changes/?format=json').content)
+        self.assertEqual(set(obj['id'] for obj in data['objects']), set([self.source.pk, analytic.pk, other.pk]))
+        self.assertIn({'id': analytic.pk, 'action': 'insert'},
+                      [{'id': change['id'], 'action': change['action']} for change in data['changes']])
+        since = data['meta']['next_since']
+
+        analytic.title = [{'text': 'Analytic updated', '_i': 'pt'}]
+        analytic.save()
+        other_id = other.pk
+        other.delete()
+
+        data = json.loads(self.client.get('/api/bibliographic/changes/?format=json&since=%s' % since).content)
+        actions = [(change['id'], change['action']) for change in data['changes']]
+        self.assertEqual(actions[0], (analytic.pk, 'update'))
+        self.assertIn((other_id, 'delete'), actions)
+        self.assertEqual([obj['id'] for obj in data['objects']], [analytic.pk])
+
+        # records of the page in ISIS ID format
+        response = self.client.get('/api/bibliographic/changes/?format=isis_id&since=%s&limit=1' % since)
+        self.assertEqual(response.content.count('!ID 00000'), 1)
+
+    def test_change_feed_overlapping_transactions(self):
+        """
+        Change with a lower sequence committed after a higher one is not skipped by the feed
+        """
+        c_type = ContentType.objects.get_for_model(Reference)
+        since = ChangeJournal.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        # transaction A get sequence since + 1 and transaction B since + 2, B commit first
+        ChangeJournal.objects.create(id=since + 2, content_type=c_type, object_id=self.source.pk,
+                                     action=ChangeJournal.UPDATE)
+
+        data = json.loads(self.client.get('/api/bibliographic/changes/?format=json&since=%s' % since).content)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(data['meta']['next_since'], since)
+
+        # A commit later
+        ChangeJournal.objects.create(id=since + 1, content_type=c_type, object_id=self.source.pk,
+                                     action=ChangeJournal.INSERT)
+        # after the commit lag both changes are returned in sequence
+        ChangeJournal.objects.filter(id__gt=since).update(created_time=timezone.now() - timedelta(seconds=120))
+
+        data = json.loads(self.client.get('/api/bibliographic/changes/?format=json&since=%s' % since).content)
+        self.assertEqual([change['sequence'] for change in data['changes']], [since + 1, since + 2])
+        self.assertEqual(data['meta']['next_since'], since + 2)
+
+
+class FakeSearchHandler(BaseHTTPRequestHandler):
+    """
+    Local fake of search service (iahx-controller). numFound is the number of requests received, the
+    service return errors while server.failing is set and answer after server.delay seconds
+    """
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+
+        if self.server.failing:
+            content = 'Internal Server Error'
+            self.send_response(500)
+        else:
+            content = json.dumps({'diaServerResponse': [{'response': {'numFound': self.server.requests, 'docs': []}}]})
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SearchServiceTest(BaseTestCase):
+    """
+    Tests for shared client and cache of search service (api/search_service)
+    """
+
+    def setUp(self):
+        super(SearchServiceTest, self).setUp()
+
+        self.server = HTTPServer(('127.0.0.1', 0), FakeSearchHandler)
+        self.server.requests = 0
+        self.server.failing = False
+        self.server.delay = 0
+        # client closes the connection of requests that time out
+        self.server.handle_error = lambda request, client_address: None
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        self.service_url = 'http://127.0.0.1:%s/' % self.server.server_port
+        search_client.clear()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        search_client.clear()
+
+    def num_found(self, result):
+        return result['diaServerResponse'][0]['response']['numFound']
+
+    def test_cached_result(self):
+        """
+        Same parameters (in any order) are sent only once while result is fresh
+        """
+        client = SearchServiceClient(url=self.service_url, ttl=60, stale_ttl=0)
+
+        client.search({'q': 'malaria', 'fq': 'status:1', 'start': 0})
+        result = client.search({'start': '0', 'fq': 'status:1', 'q': 'malaria'})
+        self.assertEqual(self.num_found(result), 1)
+
+        client.search({'q': 'dengue', 'fq': 'status:1', 'start': 0})
+        self.assertEqual(self.server.requests, 2)
+
+    def test_stale_while_revalidate(self):
+        """
+        Expired result is returned while a new result is requested in background
+        """
+        client = SearchServiceClient(url=self.service_url, ttl=0, stale_ttl=60)
+
+        self.assertEqual(self.num_found(client.search({'q': 'malaria'})), 1)
+        self.assertEqual(self.num_found(client.search({'q': 'malaria'})), 1)
+
+        # wait for background update
+        for count in range(50):
+            if not client.refreshing and self.server.requests == 2:
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(self.server.requests, 2)
+        client.ttl = 60
+        self.assertEqual(self.num_found(client.search({'q': 'malaria'})), 2)
+
+    def test_last_result_on_error(self):
+        """
+        Cached result is returned, whatever its age, while the service fails
+        """
+        client = SearchServiceClient(url=self.service_url, ttl=0, stale_ttl=0)
+        self.assertEqual(self.num_found(client.search({'q': 'malaria'})), 1)
+
+        self.server.failing = True
+        self.assertEqual(self.num_found(client.search({'q': 'malaria'})), 1)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_api_search_service_unavailable(self):
+        """
+        Search endpoints return 502 when the service fails and 504 on timeout (no cached result)
+        """
+        self.server.failing = True
+        with override_settings(SEARCH_SERVICE_URL=self.service_url):
+            response = self.client.get('/api/bibliographic/search/?format=json&q=malaria')
+            self.assertEqual(response.status_code, 502)
+
+            response = self.client.get('/api/lis-old/search/?expr=malaria')
+            self.assertEqual(response.status_code, 502)
+
+        self.server.failing = False
+        self.server.delay = 0.5
+        client = SearchServiceClient(url=self.service_url, timeout=0.1)
+        with self.assertRaises(SearchServiceError) as context:
+            client.search({'q': 'malaria'})
+        self.assertEqual(context.exception.response.status_code, 504)
+
+    def test_api_search_cached(self):
+        """
+        Search endpoints of API use the shared client
+        """
+        with override_settings(SEARCH_SERVICE_URL=self.service_url):
+            for count in range(2):
+                response = self.client.get('/api/bibliographic/search/?format=json&q=malaria')
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.server.requests, 1)
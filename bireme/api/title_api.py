@@ -11,12 +11,12 @@ from tastypie import fields
 from title.models import *
 from isis_serializer import ISISSerializer
 
-from tastypie_custom import CustomResource
+from tastypie_custom import CustomResource, KeysetPaginator
 
 from main.models import Descriptor
 from title.field_definitions import field_tag_map
 
-import requests
+import search_service
 import urllib
 import json
 
@@ -53,6 +53,7 @@ class TitleResource(CustomResource):
     class Meta:
         queryset = Title.objects.all()
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         serializer = ISISSerializer(formats=['json', 'xml', 'isis_id'], field_tag=field_tag_map)
         resource_name = 'title'
         filtering = {
@@ -65,7 +66,7 @@ class TitleResource(CustomResource):
         return [
             url(r"^(?P<resource_name>%s)/search%s$" % (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('get_search'), name="api_get_search"),
-        ]
+        ] + super(TitleResource, self).prepend_urls()
 
     def get_search(self, request, **kwargs):
         self.method_check(request, allowed=['get'])
@@ -87,16 +88,13 @@ class TitleResource(CustomResource):
         else:
             fq = '(status:1 AND django_ct:title.title*)'
 
-        # url
-        search_url = "%siahx-controller/" % settings.SEARCH_SERVICE_URL
-
         search_params = {'site': 'fi', 'col': 'main', 'op': op, 'output': 'site', 'lang': lang,
                          'q': q, 'fq': fq, 'start': start, 'count': count, 'id': id, 'sort': sort}
 
-        r = requests.post(search_url, data=search_params)
+        result = search_service.search(search_params)
 
         self.log_throttled_access(request)
-        return self.create_response(request, r.json())
+        return self.create_response(request, result)
 
     def dehydrate(self, bundle):
         c_type = ContentType.objects.get_for_model(bundle.obj)
@@ -1,5 +1,6 @@
 
 from django.contrib import admin
+from django.utils import timezone
 from utils.admin import GenericAdmin
 
 from models import *
@@ -11,6 +12,20 @@ class ReferenceAlternateIDAdmin(admin.ModelAdmin):
 class ReferenceDuplicateAdmin(admin.ModelAdmin):
     raw_id_fields = ("reference",)
 
+class DedupOutboxAdmin(admin.ModelAdmin):
+    list_display = ('dedup_id', 'status', 'attempts', 'next_attempt_time', 'updated_time', 'sent_time')
+    list_filter = ('status',)
+    search_fields = ('dedup_id', 'last_error')
+    raw_id_fields = ("reference",)
+    actions = ['retry']
+
+    def retry(self, request, queryset):
+        now = timezone.now()
+        total = queryset.exclude(status=DedupOutbox.SENT).update(status=DedupOutbox.PENDING, attempts=0,
+                                                                 next_attempt_time=now, updated_time=now)
+        self.message_user(request, "%d registrations returned to pending" % total)
+    retry.short_description = "Send again"
+
 
 admin.site.register(ReferenceSource)
 admin.site.register(ReferenceAnalytic)
@@ -18,4 +33,5 @@ admin.site.register(ReferenceComplement)
 admin.site.register(ReferenceAlternateID, ReferenceAlternateIDAdmin)
 admin.site.register(ReferenceLocal)
 admin.site.register(ReferenceDuplicate, ReferenceDuplicateAdmin)
+admin.site.register(DedupOutbox, DedupOutboxAdmin)
 admin.site.register(Reference)
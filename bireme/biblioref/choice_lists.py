@@ -0,0 +1,60 @@
+#! coding: utf-8
+from utils.choice_lists import choice_lists
+from utils.models import Country, CountryLocal
+from title.models import Title, IndexRange
+
+
+def title_choice(title):
+    return (title.shortened_title, "%s|%s" % (title.shortened_title, title.issn))
+
+
+def titles_of_editor(cc_code):
+    """
+    Serial titles of LILACS Express editor (editor_cc_code of title)
+    """
+    titles = Title.objects.filter(editor_cc_code=cc_code).exclude(indexer_cc_code='').order_by('shortened_title')
+
+    return [title_choice(title) for title in titles.only('shortened_title', 'issn')]
+
+
+def titles_of_indexer(cc_code):
+    """
+    Return tuple with serial titles indexed by the cooperative center (index range) and titles
+    indexed by other centers
+    """
+    titles_indexed_by_this_cc = Title.objects.filter(indexrange__indexer_cc_code=cc_code) \
+                                             .order_by('shortened_title').distinct()
+
+    # exclude titles without index range and titles of the cooperative center (listed above)
+    titles_indexed_by_others = Title.objects.exclude(indexrange__isnull=True) \
+                                            .exclude(indexrange__indexer_cc_code=cc_code)
+    # titles with at least one indexer_cc_code (diff from empty string)
+    titles_indexed_by_others = titles_indexed_by_others.filter(indexrange__indexer_cc_code__gt='').distinct() \
+                                                       .order_by('shortened_title')
+
+    return ([title_choice(title) for title in titles_indexed_by_this_cc.only('shortened_title', 'issn')],
+            [title_choice(title) for title in titles_indexed_by_others.only('shortened_title', 'issn')])
+
+
+def countries_by_region(language):
+    """
+    Return tuple with (id, name) of Latin America & Caribbean countries and of other countries sorted
+    by the name in language
+    """
+    country_list_latin_caribbean = []
+    country_list_other = []
+    for country in Country.objects.all():
+        if country.LA_Caribbean:
+            country_list_latin_caribbean.append((country.pk, unicode(country)))
+        else:
+            country_list_other.append((country.pk, unicode(country)))
+
+    country_list_latin_caribbean.sort(key=lambda c: c[1])
+    country_list_other.sort(key=lambda c: c[1])
+
+    return (country_list_latin_caribbean, country_list_other)
+
+
+choice_lists.register('serial_titles_of_editor', titles_of_editor, (Title,))
+choice_lists.register('serial_titles_of_indexer', titles_of_indexer, (Title, IndexRange))
+choice_lists.register('countries_by_region', countries_by_region, (Country, CountryLocal))
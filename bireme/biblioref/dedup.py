@@ -0,0 +1,129 @@
+#! coding: utf-8
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Count
+from django.utils import timezone
+
+from biblioref.models import DedupOutbox
+
+import json
+import requests
+
+# DeDup schema of journal articles (Sas)
+DEDUP_SAS_SCHEMA = ('lilacs_Sas', 'LILACS_Sas_Three')
+DEDUP_HEADERS = {'Content-Type': 'application/json'}
+DEDUP_TIMEOUT = 10
+
+# retry delay (seconds) double at each failure up to RETRY_MAX_DELAY. After MAX_ATTEMPTS the
+# registration is marked as failed and is only sent again if reset (send_dedup_queue --retry-failed)
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 6 * 60 * 60
+MAX_ATTEMPTS = 10
+
+
+def dedup_id(reference):
+    return "fiadmin-{0}".format(reference.id)
+
+
+def queue_registration(reference):
+    """
+    Add registration of journal article at DeDup outbox. There is one entry by reference (dedup_id),
+    a registration with new content (payload or URL) replace the previous one and a registration with
+    the same content keep its state (not sent again, retry schedule of pending registration is kept)
+    """
+    if not settings.DEDUP_PUT_URL:
+        return None
+
+    params = {"ano_publicacao": reference.source.publication_date_normalized[:4],
+              "titulo_artigo": reference.title[0]['text'], "titulo_revista": reference.source.title_serial}
+    payload = json.dumps(params, ensure_ascii=True)
+    ref_id = dedup_id(reference)
+    url = "{0}/{1}/{2}/{3}".format(settings.DEDUP_PUT_URL, DEDUP_SAS_SCHEMA[0], DEDUP_SAS_SCHEMA[1], ref_id)
+
+    entry = DedupOutbox.objects.filter(dedup_id=ref_id).first()
+    if not entry:
+        try:
+            with transaction.atomic():
+                return DedupOutbox.objects.create(dedup_id=ref_id, reference=reference, url=url, payload=payload)
+        except IntegrityError:
+            # created at same time by other request
+            entry = DedupOutbox.objects.get(dedup_id=ref_id)
+
+    # same content: keep state of registration (sent, or pending/failed with its retry schedule)
+    if entry.payload == payload and entry.url == url:
+        return entry
+
+    now = timezone.now()
+    DedupOutbox.objects.filter(dedup_id=ref_id).update(url=url, payload=payload, status=DedupOutbox.PENDING,
+                                                       version=F('version') + 1, attempts=0, last_error='',
+                                                       next_attempt_time=now, updated_time=now)
+
+    return DedupOutbox.objects.get(dedup_id=ref_id)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def send_pending(batch_size=100, session=None):
+    """
+    Send a batch of due registrations of DeDup outbox using one HTTP session (pooled connection).
+    Return number of registrations processed
+    """
+    entries = list(DedupOutbox.objects.filter(status=DedupOutbox.PENDING, next_attempt_time__lte=timezone.now())
+                                      .order_by('next_attempt_time', 'pk')[:batch_size])
+    if not entries:
+        return 0
+
+    session = session or requests.Session()
+
+    for entry in entries:
+        try:
+            response = session.post(entry.url, headers=DEDUP_HEADERS, data=entry.payload, timeout=DEDUP_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            registration_failed(entry, exc)
+        else:
+            # registrations changed while in transit stay pending (new version)
+            now = timezone.now()
+            DedupOutbox.objects.filter(pk=entry.pk, version=entry.version).update(
+                status=DedupOutbox.SENT, attempts=F('attempts') + 1, last_error='', sent_time=now, updated_time=now)
+
+    return len(entries)
+
+
+def registration_failed(entry, error):
+    attempts = entry.attempts + 1
+    now = timezone.now()
+    # update() don't set auto_now fields
+    changes = {'attempts': attempts, 'last_error': unicode(error)[:1000], 'updated_time': now}
+    if attempts >= MAX_ATTEMPTS:
+        changes['status'] = DedupOutbox.FAILED
+    else:
+        changes['next_attempt_time'] = now + retry_delay(attempts)
+
+    DedupOutbox.objects.filter(pk=entry.pk, version=entry.version).update(**changes)
+
+
+def retry_failed():
+    """
+    Return failed registrations to pending state. Return number of registrations
+    """
+    now = timezone.now()
+    return DedupOutbox.objects.filter(status=DedupOutbox.FAILED).update(status=DedupOutbox.PENDING, attempts=0,
+                                                                         next_attempt_time=now, updated_time=now)
+
+
+def outbox_summary():
+    """
+    Return dict with number of registrations by status and number of pending registrations due (key 'due')
+    """
+    counts = dict(DedupOutbox.objects.order_by().values_list('status').annotate(Count('pk')))
+
+    summary = dict((status, counts.get(status, 0)) for status, label in DedupOutbox.STATUS_CHOICES)
+    summary['due'] = DedupOutbox.objects.filter(status=DedupOutbox.PENDING,
+                                                next_attempt_time__lte=timezone.now()).count()
+
+    return summary
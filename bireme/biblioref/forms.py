@@ -15,14 +15,14 @@ from main.models import Descriptor
 from utils.forms import DescriptorRequired
 from utils.templatetags.app_filters import fieldtype
 from title.models import Title, IndexRange
-from utils.models import AuxCode
+from utils.aux_choices import aux_field_labels
 from attachments.models import Attachment
 from database.models import Database
 
 from models import *
+from dedup import queue_registration
+from choice_lists import choice_lists
 import json
-import simplejson
-import requests
 import re
 
 
@@ -87,33 +87,19 @@ class BiblioRefForm(BetterModelForm):
             self.fields['isbn'].widget = widgets.HiddenInput()
 
 
-        # load serial titles for serial analytic
+        # load serial titles for serial analytic (cached lists by cooperative center, see choice_lists)
         if self.document_type == 'S' and not self.reference_source:
-            title_objects = Title.objects.all()
-
             # populate choice title list based on user profile
             if self.user_role == 'editor_llxp':
                 # for LILACS Express editor return only serials with same editor_cc_code of current user
-                titles_from_this_editor = title_objects.filter(editor_cc_code=self.user_data['user_cc']).exclude(indexer_cc_code='')
-                titles_from_this_editor = titles_from_this_editor.order_by('shortened_title')
-                title_list = [(t.shortened_title, "%s|%s" % (t.shortened_title, t.issn)) for t in titles_from_this_editor]
+                title_list = list(choice_lists.get('serial_titles_of_editor', self.user_data['user_cc']))
             else:
                 # for regular users return a title list splited in two parts:
                 # 1- journals that is indexed by the user center code using index range relation model
-                cc_code = self.user_data['user_cc']
-                titles_indexed_by_this_cc = title_objects.filter(indexrange__indexer_cc_code=cc_code).order_by('shortened_title').distinct()
-
                 # 2- titles that has indexed by other centers
-                # -exclude titles that has not records in indexrange and then exclude titles from the current cc (alread listed in titles_indexed_by_this_cc)
-                titles_indexed_by_others = title_objects.exclude(indexrange__isnull=True).exclude(indexrange__indexer_cc_code=cc_code)
-                # -filter by titles thas has at least one indexer_cc_code (diff from empty string)
-                titles_indexed_by_others = titles_indexed_by_others.filter(indexrange__indexer_cc_code__gt='').distinct()
-                # -sort by short title
-                titles_indexed_by_others = titles_indexed_by_others.order_by('shortened_title')
-
+                title_list_indexer_code, title_list_other = choice_lists.get('serial_titles_of_indexer',
+                                                                             self.user_data['user_cc'])
                 title_list = []
-                title_list_indexer_code = [(t.shortened_title, "%s|%s" % (t.shortened_title, t.issn)) for t in titles_indexed_by_this_cc]
-                title_list_other = [(t.shortened_title, "%s|%s" % (t.shortened_title, t.issn)) for t in titles_indexed_by_others]
 
                 separator = u' ────────── '
                 label_indexed = separator + __('Indexed by your cooperative center') + separator
@@ -132,12 +118,9 @@ class BiblioRefForm(BetterModelForm):
         if 'publication_country' in self.fields:
             # divide list of countries in Latin America & Caribbean and Others
             country_list = [('', '')]
-            country_list_latin_caribbean = [(c.pk, unicode(c)) for c in Country.objects.filter(LA_Caribbean=True)]
-            country_list_other = [(c.pk, unicode(c)) for c in Country.objects.filter(LA_Caribbean=False)]
-
-            # sort list by translation name
-            country_list_latin_caribbean.sort(key=lambda c: c[1])
-            country_list_other.sort(key=lambda c: c[1])
+            # lists sorted by translation name
+            country_list_latin_caribbean, country_list_other = choice_lists.get('countries_by_region',
+                                                                                get_language())
 
             separator = "-----------"
             label_latin_caribbean = separator + __('Latin America & Caribbean') + separator
@@ -758,11 +741,7 @@ class BiblioRefForm(BetterModelForm):
                 self.add_error(field, _('Mandatory'))
             else:
                 if self.is_LILACS:
-                    allowed_values = []
-                    for controled_value in AuxCode.objects.filter(field=field):
-                        allowed_values.extend(controled_value.get_all_labels())
-
-                    if data not in allowed_values:
+                    if data not in aux_field_labels(field):
                         self.add_error(field, _('LILACS incompatible'))
 
         return data
@@ -840,7 +819,8 @@ class BiblioRefForm(BetterModelForm):
 
         return data
 
-    def save(self, *args, **kwargs):
+    def save(self, commit=True):
+        # derived fields (literature_type, treatment_level, reference_title) are set before the save
         obj = super(BiblioRefForm, self).save(commit=False)
 
         # if is a new analytic save reference source info
@@ -898,23 +878,17 @@ class BiblioRefForm(BetterModelForm):
         if self.document_type == 'Tm':
             obj.publisher = 's.n'
 
-        # save object
-        obj.save()
+        if commit:
+            obj.save()
+            self.update_dedup(obj)
+
+        return obj
 
-        # update DeDup service
+    def update_dedup(self, obj):
+        # registration at DeDup service is sent by send_dedup_queue command (see biblioref.dedup)
         if self.document_type == 'Sas':
-            dedup_params = {"ano_publicacao": obj.source.publication_date_normalized[:4],
-                            "titulo_artigo": obj.title[0]['text'], "titulo_revista": obj.source.title_serial}
-            json_data = json.dumps(dedup_params, ensure_ascii=True)
-            dedup_headers = {'Content-Type': 'application/json'}
-            ref_id = "fiadmin-{0}".format(obj.id)
-            dedup_url = "{0}/{1}/{2}/{3}".format(settings.DEDUP_PUT_URL, 'lilacs_Sas', 'LILACS_Sas_Three', ref_id)
-            try:
-                dedup_request = requests.post(dedup_url, headers=dedup_headers, data=json_data, timeout=5)
-            except:
-                pass
+            queue_registration(obj)
 
-        return obj
 
 class BiblioRefSourceForm(BiblioRefForm):
     class Meta:
@@ -1009,17 +983,9 @@ class DescriptorForm(forms.ModelForm):
         obj.status = 1
 
         obj.save()
-        # if is first center to index the reference save the code in indexer_cc_code
-        reference = Reference.objects.get(id=obj.object_id)
-        # check if reference already have indexer_cc_code info
-        if not reference.indexer_cc_code:
-            # get user profile cc code
-            user = obj.created_by
-            user_data = simplejson.loads(user.profile.data)
-            # fill reference field
-            reference.indexer_cc_code = user_data.get('cc','')
-            # update record
-            reference.save()
+        # indexer_cc_code of reference is set by BiblioRefUpdate.form_valid with the reference save
+
+        return obj
 
 # definition of inline formsets
 DescriptorFormSet = generic_inlineformset_factory(Descriptor, form=DescriptorForm,
@@ -0,0 +1,42 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from biblioref.models import Reference
+from biblioref.views import refs_changed_by_other_cc, refs_changed_by_other_user
+from utils.profile import get_user_cc
+
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and number of queries of the "changed by others" lists (dashboard) for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to check (ex. user with 10k+ references)')
+        parser.add_argument('-r', '--repeat', type=int, default=5, help='Number of executions of each function')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist' % options['username'])
+
+        user_cc = get_user_cc(user)
+        self.stdout.write('References created by user: %d' % Reference.objects.filter(created_by=user).count())
+        self.stdout.write('References of user cc (%s): %d' % (user_cc,
+                          Reference.objects.filter(cooperative_center_code=user_cc).count()))
+
+        for function in (refs_changed_by_other_user, refs_changed_by_other_cc):
+            timings = []
+            for count in range(options['repeat']):
+                with CaptureQueriesContext(connection) as context:
+                    start = time.time()
+                    result = function(user)
+                    timings.append(time.time() - start)
+
+            self.stdout.write('%s: %d references, %d queries, min %.1f ms, avg %.1f ms' % (
+                              function.__name__, len(result), len(context.captured_queries),
+                              min(timings) * 1000, sum(timings) / len(timings) * 1000))
@@ -0,0 +1,137 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from biblioref.models import ReferenceSource, ReferenceAnalytic
+from biblioref.similarity import build_index, find_duplicates, analytic_titles
+
+import random
+import time
+
+WORDS = (u'saúde', u'enfermagem', u'atenção', u'primária', u'avaliação', u'pacientes', u'hospital', u'crianças',
+         u'idosos', u'tratamento', u'diabetes', u'hipertensão', u'prevalência', u'fatores', u'risco', u'estudo',
+         u'qualidade', u'vida', u'mulheres', u'gestantes', u'cuidado', u'família', u'programa', u'controle',
+         u'tuberculose', u'dengue', u'malária', u'vacinação', u'mortalidade', u'infantil', u'análise', u'região',
+         u'municipal', u'sistema', u'serviços', u'profissionais', u'educação', u'prevenção', u'câncer', u'mama',
+         u'nutrição', u'obesidade', u'adolescentes', u'escolares', u'epidemiologia', u'vigilância', u'brasil',
+         u'revisão', u'sistemática', u'ensaio', u'clínico', u'randomizado', u'coorte', u'transversal', u'rural')
+
+
+class Command(BaseCommand):
+    help = 'Measure precision, recall and latency of the similarity index (possible duplicates) using ' \
+           'altered copies of analytic titles. Seeded records are removed (transaction rollback) at the end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=2000, help='Number of analytics to create')
+        parser.add_argument('--serials', type=int, default=50, help='Number of serial issues (sources) to create')
+        parser.add_argument('--queries', type=int, default=300, help='Number of altered titles searched')
+        parser.add_argument('--no-seed', action='store_true', default=False,
+                            help='Use current database content (titles are sampled from existing analytics)')
+        parser.add_argument('--seed', type=int, default=1, help='Seed of random generator')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+
+        with transaction.atomic():
+            if not options['no_seed']:
+                self.seed(options)
+
+            start = time.time()
+            for last_id in build_index():
+                pass
+            self.stdout.write('index build: %d analytics in %.1f s' % (ReferenceAnalytic.objects.count(),
+                                                                        time.time() - start))
+
+            self.benchmark(options['queries'])
+
+            # discard seeded records and rebuilt buckets
+            transaction.set_rollback(True)
+
+    def benchmark(self, total_queries):
+        analytic_ids = list(ReferenceAnalytic.objects.values_list('pk', flat=True))
+        sample_ids = self.random.sample(analytic_ids, min(total_queries, len(analytic_ids)))
+        sample = ReferenceAnalytic.objects.filter(pk__in=sample_ids).select_related('source')
+
+        timings = []
+        returned = found = 0
+        queries = 0
+        for analytic in sample:
+            titles = analytic_titles(analytic)
+            if not titles:
+                continue
+
+            title = self.alter_title(titles[0])
+            start = time.time()
+            duplicates = find_duplicates([title], serial=analytic.source.title_serial,
+                                         year=analytic.source.publication_date_normalized)
+            timings.append(time.time() - start)
+
+            queries += 1
+            returned += len(duplicates)
+            # other records with the same (altered) title in source data are counted as false positives
+            if analytic.pk in [duplicate.pk for duplicate, similarity in duplicates]:
+                found += 1
+
+        # titles not present at index
+        false_positives = 0
+        for count in range(queries):
+            title = self.random_title()
+            start = time.time()
+            false_positives += len(find_duplicates([title]))
+            timings.append(time.time() - start)
+
+        if not queries:
+            self.stdout.write('No analytics with title to search')
+            return
+
+        timings.sort()
+        precision = float(found) / (returned + false_positives) if returned + false_positives else 1.0
+        self.stdout.write('queries: %d altered titles, %d new titles' % (queries, queries))
+        self.stdout.write('recall: %.3f, precision: %.3f (%d returned, %d false positives of new titles)' % (
+                          float(found) / queries, precision, returned, false_positives))
+        self.stdout.write('latency: avg %.1f ms, p50 %.1f ms, p95 %.1f ms, max %.1f ms' % (
+                          sum(timings) / len(timings) * 1000, timings[len(timings) // 2] * 1000,
+                          timings[int(len(timings) * 0.95)] * 1000, timings[-1] * 1000))
+
+    def alter_title(self, title):
+        """
+        Copy of title with one typical difference of duplicated records
+        """
+        words = title.split()
+        change = self.random.choice(('case', 'typo', 'drop', 'swap', 'punctuation'))
+        if change == 'case':
+            return title.upper()
+        elif change == 'typo' and title:
+            pos = self.random.randrange(len(title))
+            return title[:pos] + title[pos + 1:]
+        elif change == 'drop' and len(words) > 4:
+            words.pop(self.random.randrange(len(words)))
+        elif change == 'swap' and len(words) > 1:
+            pos = self.random.randrange(len(words) - 1)
+            words[pos], words[pos + 1] = words[pos + 1], words[pos]
+        else:
+            return title.rstrip('.') + '.'
+
+        return u' '.join(words)
+
+    def random_title(self):
+        return u' '.join(self.random.sample(WORDS, self.random.randint(6, 12))).capitalize()
+
+    def seed(self, options):
+        start = time.time()
+        prefix = 'benchmark-%d' % int(start)
+
+        sources = []
+        for count in range(options['serials']):
+            year = 2000 + count % 15
+            sources.append(ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                          title_serial='%s serial %d' % (prefix, count % 10),
+                                                          volume_serial=str(count), issue_number='1',
+                                                          publication_date_normalized='%d0101' % year))
+
+        for count in range(options['records']):
+            ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as',
+                                             source=sources[count % len(sources)],
+                                             title=[{'text': self.random_title(), '_i': 'pt'}])
+
+        self.stdout.write('seed: %d analytics in %.1f s' % (options['records'], time.time() - start))
@@ -0,0 +1,29 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+
+from biblioref.models import ReferenceAnalytic
+from biblioref.similarity import build_index
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the similarity index (LSH buckets of titles) of analytics used to find possible duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of analytics processed on each batch')
+        parser.add_argument('--start-id', type=int, default=0, help='Resume from analytics with id above this value')
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+        total = ReferenceAnalytic.objects.filter(pk__gt=options['start_id']).count()
+
+        done = 0
+        for last_id in build_index(batch_size=options['batch_size'], start_id=options['start_id']):
+            done = min(done + options['batch_size'], total)
+            if verbosity >= 2:
+                self.stdout.write('%d of %d analytics indexed (last id %d)' % (done, total, last_id))
+
+        if verbosity >= 1:
+            self.stdout.write('Similarity index built for %d analytics' % total)
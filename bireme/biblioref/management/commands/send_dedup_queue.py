@@ -0,0 +1,61 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+
+from biblioref.models import DedupOutbox
+from biblioref.dedup import send_pending, retry_failed, outbox_summary
+
+import requests
+import time
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_INTERVAL = 30
+
+
+class Command(BaseCommand):
+    help = 'Send pending registrations of DeDup outbox to DeDup service, failed sends are retried with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of registrations sent on each batch')
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help='Keep running and check the outbox every --interval seconds')
+        parser.add_argument('-i', '--interval', type=int, default=DEFAULT_INTERVAL,
+                            help='Seconds to wait when there are no registrations due (with --loop)')
+        parser.add_argument('--retry-failed', action='store_true', default=False,
+                            help='Return registrations that reached the maximum of attempts to pending')
+        parser.add_argument('--status', action='store_true', default=False,
+                            help='Only show the number of registrations by status')
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        if options['status']:
+            self.show_status()
+            return
+
+        if options['retry_failed']:
+            total = retry_failed()
+            if verbosity >= 1:
+                self.stdout.write('%d failed registrations returned to pending' % total)
+
+        # same session (connection pool) for all batches
+        session = requests.Session()
+
+        while True:
+            total = send_pending(batch_size=options['batch_size'], session=session)
+            if total and verbosity >= 2:
+                self.stdout.write('%d registrations processed' % total)
+
+            if total < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        if verbosity >= 1:
+            self.show_status()
+
+    def show_status(self):
+        summary = outbox_summary()
+        for status, label in DedupOutbox.STATUS_CHOICES:
+            self.stdout.write('%s: %d' % (label, summary[status]))
+        self.stdout.write('Pending due: %d' % summary['due'])
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioref', '0026_reference_indexer_cc_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceRender',
+            fields=[
+                ('reference', models.OneToOneField(related_name='+', primary_key=True, serialize=False, to='biblioref.Reference')),
+                ('system_version', models.CharField(max_length=50, blank=True)),
+                ('json', models.TextField(blank=True)),
+                ('isis_id', models.TextField(blank=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bibliographic Record rendering',
+                'verbose_name_plural': 'Bibliographic Records rendering',
+            },
+        ),
+    ]
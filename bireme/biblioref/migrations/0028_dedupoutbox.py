@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioref', '0027_referencerender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DedupOutbox',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('dedup_id', models.CharField(unique=True, max_length=55, verbose_name='DeDup id')),
+                ('url', models.CharField(max_length=255, verbose_name='URL')),
+                ('payload', models.TextField(verbose_name='Payload')),
+                ('status', models.SmallIntegerField(default=0, verbose_name='Status', choices=[(0, 'Pending'), (1, 'Sent'), (2, 'Failed')])),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next attempt')),
+                ('last_error', models.TextField(verbose_name='Last error', blank=True)),
+                ('created_time', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_time', models.DateTimeField(auto_now=True, verbose_name='updated')),
+                ('sent_time', models.DateTimeField(null=True, verbose_name='Sent at', blank=True)),
+                ('reference', models.ForeignKey(related_name='+', on_delete=django.db.models.deletion.SET_NULL, verbose_name='Reference', to='biblioref.Reference', null=True)),
+            ],
+            options={
+                'verbose_name': 'DeDup registration',
+                'verbose_name_plural': 'DeDup registrations',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='dedupoutbox',
+            index_together=set([('status', 'next_attempt_time')]),
+        ),
+    ]
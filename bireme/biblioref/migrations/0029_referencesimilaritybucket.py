@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioref', '0028_dedupoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSimilarityBucket',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('reference', models.ForeignKey(related_name='+', to='biblioref.ReferenceAnalytic')),
+            ],
+            options={
+                'verbose_name': 'Similarity bucket',
+                'verbose_name_plural': 'Similarity buckets',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioref', '0029_referencesimilaritybucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='referencerender',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='referencerender',
+            name='reference',
+            field=models.OneToOneField(related_name='+', primary_key=True, db_constraint=False, serialize=False, to='biblioref.Reference'),
+        ),
+    ]
@@ -1,9 +1,14 @@
 #! coding: utf-8
 from django.utils.translation import ugettext_lazy as _, get_language
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.utils import timezone
 from django.contrib.contenttypes.generic import GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.admin.models import LogEntry
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from main.models import Descriptor, ResourceThematic, ThematicArea
+from attachments.models import Attachment
 from utils.fields import JSONField, AuxiliaryChoiceField, MultipleAuxiliaryChoiceField
 from utils.models import Generic, Country
 from log.models import AuditLog
@@ -373,3 +378,180 @@ class ReferenceDuplicate(models.Model):
     library_json = models.TextField(_('Library JSON'), blank=True)
     others_json = models.TextField(_('Other fields JSON'), blank=True)
     cooperative_center_code = models.CharField(_('Cooperative center'), max_length=55, blank=True)
+
+
+# Outbox of registrations of references at DeDup service (see biblioref.dedup)
+class DedupOutbox(models.Model):
+    class Meta:
+        verbose_name = _("DeDup registration")
+        verbose_name_plural = _("DeDup registrations")
+        index_together = [['status', 'next_attempt_time']]
+
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (SENT, _('Sent')),
+        (FAILED, _('Failed')),
+    )
+
+    # document id at DeDup (fiadmin-<reference id>), one registration by reference
+    dedup_id = models.CharField(_('DeDup id'), max_length=55, unique=True)
+    reference = models.ForeignKey(Reference, verbose_name=_("Reference"), null=True, related_name='+',
+                                  on_delete=models.SET_NULL)
+    url = models.CharField(_('URL'), max_length=255)
+    payload = models.TextField(_('Payload'))
+    status = models.SmallIntegerField(_('Status'), choices=STATUS_CHOICES, default=PENDING)
+    # incremented on each change of payload, avoid mark as sent a registration changed while in transit
+    version = models.PositiveIntegerField(default=1)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    next_attempt_time = models.DateTimeField(_('Next attempt'), default=timezone.now)
+    last_error = models.TextField(_('Last error'), blank=True)
+    created_time = models.DateTimeField(_("created at"), auto_now_add=True, editable=False)
+    updated_time = models.DateTimeField(_("updated"), auto_now=True, editable=False)
+    sent_time = models.DateTimeField(_('Sent at'), null=True, blank=True)
+
+    def __unicode__(self):
+        return u"%s (%s)" % (self.dedup_id, self.get_status_display())
+
+
+# LSH buckets of analytic titles used to find near duplicates (see biblioref.similarity)
+class ReferenceSimilarityBucket(models.Model):
+    class Meta:
+        verbose_name = _("Similarity bucket")
+        verbose_name_plural = _("Similarity buckets")
+
+    reference = models.ForeignKey(ReferenceAnalytic, related_name='+')
+    bucket = models.BigIntegerField(db_index=True)
+
+
+# Stored rendering of references at API (see ReferenceResource.get_renders)
+class ReferenceRender(models.Model):
+    class Meta:
+        verbose_name = _("Bibliographic Record rendering")
+        verbose_name_plural = _("Bibliographic Records rendering")
+
+    # without database constraint: invalidations of related rows deleted with the reference may leave
+    # an empty rendering of the deleted reference
+    reference = models.OneToOneField(Reference, primary_key=True, related_name='+', db_constraint=False)
+    # renderings of other system versions are rebuilt (system_version field is part of output)
+    system_version = models.CharField(max_length=50, blank=True)
+    json = models.TextField(blank=True)
+    isis_id = models.TextField(blank=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    # incremented at each invalidation, renderings are stored only if version is the same read before build
+    version = models.PositiveIntegerField(default=0)
+
+    def is_valid(self, system_version):
+        return bool(self.json) and self.system_version == system_version
+
+
+def invalidate_render(reference_ids):
+    """
+    Mark renderings of references as invalid. References without rendering get an empty one, so a
+    rendering built at same time by a request (with data read before the change) is not stored
+    """
+    reference_ids = set(reference_ids)
+    renders = ReferenceRender.objects.filter(reference__in=reference_ids)
+    invalidated = set(renders.values_list('reference_id', flat=True))
+    renders.update(version=F('version') + 1, json='', isis_id='')
+
+    missing = reference_ids - invalidated
+    if missing:
+        try:
+            with transaction.atomic():
+                ReferenceRender.objects.bulk_create([ReferenceRender(reference_id=reference_id)
+                                                     for reference_id in missing])
+        except IntegrityError:
+            # stored at same time by other request
+            ReferenceRender.objects.filter(reference__in=missing).update(version=F('version') + 1, json='',
+                                                                         isis_id='')
+
+
+def rendered_reference_ids(instance):
+    """
+    Return ids of references whose rendering include data of instance
+    """
+    if isinstance(instance, Reference):
+        reference_ids = [instance.pk]
+        # analytics include fields of source
+        if isinstance(instance, ReferenceSource):
+            reference_ids.extend(ReferenceAnalytic.objects.filter(source=instance.pk).values_list('pk', flat=True))
+        return reference_ids
+    elif isinstance(instance, (ReferenceComplement, ReferenceLocal)):
+        return [instance.source_id]
+    elif isinstance(instance, ReferenceAlternateID):
+        return [instance.reference_id]
+    elif isinstance(instance, (Descriptor, ResourceThematic, Attachment)):
+        if instance.content_type_id and instance.object_id:
+            model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+            if model and issubclass(model, Reference):
+                return [instance.object_id]
+
+    return []
+
+
+def auxiliary_rendered_references(instance):
+    """
+    Return queryset with ids of references whose rendering include the name of thematic area or the
+    acronym of indexed database (instance) or None for other models
+    """
+    if isinstance(instance, ThematicArea):
+        c_types = ContentType.objects.get_for_models(Reference, ReferenceSource, ReferenceAnalytic).values()
+        return ResourceThematic.objects.filter(thematic_area=instance.pk, content_type__in=c_types) \
+                                       .values('object_id')
+    elif isinstance(instance, Database):
+        return Reference.objects.filter(indexed_database=instance.pk).values('pk')
+
+    return None
+
+
+def reference_render_changed(sender, instance, **kwargs):
+    # renderings of deleted references are deleted with them
+    if kwargs.get('signal') is post_delete and isinstance(instance, Reference):
+        return
+
+    references = auxiliary_rendered_references(instance)
+    if references is not None:
+        # auxiliary rows may be used by a large number of references: existing renderings are invalidated
+        # with one UPDATE (subquery), references without rendering don't get an empty one
+        ReferenceRender.objects.filter(reference__in=references).update(version=F('version') + 1, json='',
+                                                                         isis_id='')
+        return
+
+    reference_ids = rendered_reference_ids(instance)
+    if reference_ids:
+        invalidate_render(reference_ids)
+
+
+def reference_databases_changed(sender, instance, action, pk_set, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # changes from database side, pk_set is not available at clear
+        if pk_set:
+            invalidate_render(pk_set)
+    else:
+        invalidate_render([instance.pk])
+
+
+post_save.connect(reference_render_changed, dispatch_uid='biblioref_render_saved')
+post_delete.connect(reference_render_changed, dispatch_uid='biblioref_render_deleted')
+m2m_changed.connect(reference_databases_changed, sender=Reference.indexed_database.through,
+                    dispatch_uid='biblioref_render_databases')
+# relations with deleted database are removed without m2m_changed signal
+pre_delete.connect(reference_render_changed, sender=Database, dispatch_uid='biblioref_render_database_deleted')
+
+
+def reference_similarity_changed(sender, instance, raw=False, **kwargs):
+    # fixtures are indexed by build_similarity_index command
+    if raw:
+        return
+
+    from biblioref.similarity import index_reference
+    index_reference(instance)
+
+
+post_save.connect(reference_similarity_changed, sender=ReferenceAnalytic, dispatch_uid='biblioref_similarity_saved')
@@ -0,0 +1,72 @@
+#! coding: utf-8
+from django.contrib.contenttypes.models import ContentType
+
+from main.models import Descriptor, ResourceThematic
+from attachments.models import Attachment
+from utils.prefetch import bulk_generic_related, bulk_related
+
+from models import *
+
+
+class ReferenceBulkLoader(object):
+    """
+    Load the child records (analytic/source) and related rows (descriptors, thematic areas,
+    attachments, alternate ids, library and complement records) of a group of references
+    with a fixed number of IN queries, independent of the number of references.
+    """
+
+    def __init__(self, references):
+        references = list(references)
+        analytic_ids = [ref.pk for ref in references if 'a' in ref.treatment_level]
+        source_ids = [ref.pk for ref in references if 'a' not in ref.treatment_level]
+        reference_ids = analytic_ids + source_ids
+
+        self.analytics = ReferenceAnalytic.objects.select_related('source', 'source__publication_country',
+                                                                  'created_by', 'updated_by') \
+                                                  .prefetch_related('indexed_database').in_bulk(analytic_ids)
+
+        self.sources = ReferenceSource.objects.select_related('publication_country', 'created_by', 'updated_by') \
+                                              .prefetch_related('indexed_database').in_bulk(source_ids)
+
+        self.ctype_analytic = ContentType.objects.get_for_model(ReferenceAnalytic).pk
+        self.ctype_source = ContentType.objects.get_for_model(ReferenceSource).pk
+        ids_by_ctype = {self.ctype_analytic: analytic_ids, self.ctype_source: source_ids}
+
+        self.descriptors = bulk_generic_related(Descriptor, ids_by_ctype)
+        self.thematics = bulk_generic_related(ResourceThematic, ids_by_ctype, select_related=('thematic_area',))
+        self.attachments = bulk_generic_related(Attachment, ids_by_ctype)
+
+        self.alternate_ids = bulk_related(ReferenceAlternateID, 'reference', reference_ids)
+        self.library_records = bulk_related(ReferenceLocal, 'source', reference_ids)
+        self.complements = bulk_related(ReferenceComplement, 'source', reference_ids,
+                                        select_related=('conference_country',))
+
+    def get_child(self, reference):
+        if 'a' in reference.treatment_level:
+            return self.analytics[reference.pk]
+        else:
+            return self.sources[reference.pk]
+
+    def generic_key(self, reference):
+        if 'a' in reference.treatment_level:
+            return (self.ctype_analytic, reference.pk)
+        else:
+            return (self.ctype_source, reference.pk)
+
+    def get_descriptors(self, reference):
+        return self.descriptors.get(self.generic_key(reference), [])
+
+    def get_thematics(self, reference):
+        return self.thematics.get(self.generic_key(reference), [])
+
+    def get_attachments(self, reference):
+        return self.attachments.get(self.generic_key(reference), [])
+
+    def get_alternate_ids(self, reference):
+        return self.alternate_ids.get(reference.pk, [])
+
+    def get_library_records(self, reference):
+        return self.library_records.get(reference.pk, [])
+
+    def get_complements(self, reference):
+        return self.complements.get(reference.pk, [])
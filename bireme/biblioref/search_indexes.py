@@ -1,17 +1,83 @@
 from django.conf import settings
 from haystack import indexes
 from haystack.exceptions import SkipDocument
-from main.models import Descriptor, Keyword, SourceLanguage, SourceType, ResourceThematic
-from biblioref.models import Reference, ReferenceSource, ReferenceAnalytic, ReferenceLocal
-from attachments.models import Attachment
-from django.contrib.contenttypes.models import ContentType
+from biblioref.models import ReferenceSource, ReferenceAnalytic, ReferenceLocal
 from utils.models import AuxCode
+from utils.indexing import BatchPrepareMixin
+from utils.prefetch import bulk_related
 
 import datetime
 import json
 import re
 
-class ReferenceAnalyticIndex(indexes.SearchIndex, indexes.Indexable):
+
+class ReferenceBatchMixin(BatchPrepareMixin):
+    batch_generic_related = ('descriptors', 'thematics', 'attachments')
+
+    def load_batch(self, objects):
+        data = super(ReferenceBatchMixin, self).load_batch(objects)
+        data['library_records'] = bulk_related(ReferenceLocal, 'source', [obj.pk for obj in objects])
+
+        language_codes = set()
+        for obj in objects:
+            if obj.text_language:
+                language_codes.update(obj.text_language)
+
+        data['text_language'] = {}
+        if language_codes:
+            aux_codes = AuxCode.objects.filter(field='text_language', code__in=language_codes)
+            data['text_language'] = dict((aux_code.code, aux_code) for aux_code in aux_codes)
+
+        return data
+
+    def prepare_publication_language(self, obj):
+        lang_list = []
+        if obj.text_language:
+            text_language = self.get_batch(obj)['text_language']
+            for code in obj.text_language:
+                aux_code = text_language.get(code)
+                if aux_code:
+                    lang_translations = "|".join(aux_code.get_translations())
+                    lang_list.append(lang_translations)
+
+            return lang_list
+
+    def prepare_database(self, obj):
+        db_list = []
+        for library in self.get_batch_related('library_records', obj):
+            local_db_list = [line.strip() for line in library.database.split('\r\n') if line.strip()]
+            db_list.extend(local_db_list)
+
+        return db_list
+
+    def prepare_link(self, obj):
+        electronic_address = []
+        if obj.electronic_address:
+            electronic_address = self.get_field_values(obj.electronic_address, '_u')
+
+        for attach in self.get_batch_related('attachments', obj):
+            view_url = "%sdocument/view/%s" % (settings.SITE_URL,  attach.short_url)
+            electronic_address.append(view_url)
+
+        if electronic_address:
+            return electronic_address
+
+    def prepare_thematic_area(self, obj):
+        return [rt.thematic_area.acronym for rt in self.get_batch_related('thematics', obj)]
+
+    def prepare_thematic_area_display(self, obj):
+        return ["|".join( rt.thematic_area.get_translations() ) for rt in self.get_batch_related('thematics', obj)]
+
+    def prepare_mj(self, obj):
+        # used for filter / populate with primary descriptors
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.primary]
+
+    def prepare_mh(self, obj):
+        # used for search and record presentation / populate with all descriptors (mh)
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj)]
+
+
+class ReferenceAnalyticIndex(ReferenceBatchMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     reference_title = indexes.MultiValueField(null=True)
     author = indexes.MultiValueField(null=True)
@@ -45,21 +111,6 @@ class ReferenceAnalyticIndex(indexes.SearchIndex, indexes.Indexable):
         if obj.individual_author:
             return self.get_field_values(obj.individual_author)
 
-    def prepare_link(self, obj):
-        electronic_address = []
-        if obj.electronic_address:
-            electronic_address = self.get_field_values(obj.electronic_address, '_u')
-
-        attachments = Attachment.objects.filter(object_id=obj.id,
-                                                content_type=ContentType.objects.get_for_model(obj))
-
-        for attach in attachments:
-            view_url = "%sdocument/view/%s" % (settings.SITE_URL,  attach.short_url)
-            electronic_address.append(view_url)
-
-        if electronic_address:
-            return electronic_address
-
     def prepare_reference_abstract(self, obj):
         if obj.abstract:
             return self.get_field_values(obj.abstract)
@@ -71,29 +122,9 @@ class ReferenceAnalyticIndex(indexes.SearchIndex, indexes.Indexable):
                                                obj.source.publication_date_normalized[:4])
         return source
 
-    def prepare_publication_language(self, obj):
-        lang_list = []
-        if obj.text_language:
-            for code in obj.text_language:
-                aux_code = AuxCode.objects.get(field='text_language', code=code)
-                lang_translations = "|".join(aux_code.get_translations())
-                lang_list.append(lang_translations)
-
-            return lang_list
-
     def prepare_indexed_database(self, obj):
         return [occ.acronym for occ in obj.indexed_database.all()]
 
-    def prepare_database(self, obj):
-        db_list = []
-        library_records = ReferenceLocal.objects.filter(source=obj.id)
-        if library_records:
-            for library in library_records:
-                local_db_list = [line.strip() for line in library.database.split('\r\n') if line.strip()]
-                db_list.extend(local_db_list)
-
-        return [occ for occ in db_list]
-
     def prepare_journal(self, obj):
         return obj.source.title_serial
 
@@ -104,20 +135,6 @@ class ReferenceAnalyticIndex(indexes.SearchIndex, indexes.Indexable):
     def prepare_publication_year(self, obj):
         return obj.source.publication_date_normalized[:4]
 
-    def prepare_thematic_area(self, obj):
-        return [rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
-    def prepare_thematic_area_display(self, obj):
-        return ["|".join( rt.thematic_area.get_translations() ) for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
-    def prepare_mj(self, obj):
-        # used for filter / populate with primary descriptors
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), primary=True)]
-
-    def prepare_mh(self, obj):
-        # used for search and record presentation / populate with all descriptors (mh)
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
     def prepare_created_date(self, obj):
         if obj.created_time:
             return obj.created_time.strftime('%Y%m%d')
@@ -135,10 +152,11 @@ class ReferenceAnalyticIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()).select_related('source') \
+                                       .prefetch_related('indexed_database')
 
 
-class RefereceSourceIndex(indexes.SearchIndex, indexes.Indexable):
+class RefereceSourceIndex(ReferenceBatchMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     reference_title = indexes.MultiValueField(null=True)
     author = indexes.MultiValueField(null=True)
@@ -185,48 +203,13 @@ class RefereceSourceIndex(indexes.SearchIndex, indexes.Indexable):
 
         return author_list
 
-    def prepare_link(self, obj):
-        electronic_address = []
-        if obj.electronic_address:
-            electronic_address = self.get_field_values(obj.electronic_address, '_u')
-
-        attachments = Attachment.objects.filter(object_id=obj.id,
-                                                content_type=ContentType.objects.get_for_model(obj))
-
-        for attach in attachments:
-            view_url = "%sdocument/view/%s" % (settings.SITE_URL,  attach.short_url)
-            electronic_address.append(view_url)
-
-        if electronic_address:
-            return electronic_address
-
     def prepare_reference_abstract(self, obj):
         if obj.abstract:
             return self.get_field_values(obj.abstract)
 
-    def prepare_publication_language(self, obj):
-        lang_list = []
-        if obj.text_language:
-            for code in obj.text_language:
-                aux_code = AuxCode.objects.get(field='text_language', code=code)
-                lang_translations = "|".join(aux_code.get_translations())
-                lang_list.append(lang_translations)
-
-            return lang_list
-
     def prepare_indexed_database(self, obj):
         return [occ.acronym for occ in obj.indexed_database.all()]
 
-    def prepare_database(self, obj):
-        db_list = []
-        library_records = ReferenceLocal.objects.filter(source=obj.id)
-        if library_records:
-            for library in library_records:
-                local_db_list = [line.strip() for line in library.database.split('\r\n') if line.strip()]
-                db_list.extend(local_db_list)
-
-        return [occ for occ in db_list]
-
     def prepare_publication_type(self, obj):
         # avoid indexing article source (onyl analytics)
         if obj.literature_type[0] == 'S':
@@ -242,20 +225,6 @@ class RefereceSourceIndex(indexes.SearchIndex, indexes.Indexable):
     def prepare_publication_year(self, obj):
         return obj.publication_date_normalized[:4]
 
-    def prepare_thematic_area(self, obj):
-        return [rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
-    def prepare_thematic_area_display(self, obj):
-        return ["|".join( rt.thematic_area.get_translations() ) for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
-    def prepare_mj(self, obj):
-        # used for filter / populate with primary descriptors
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), primary=True)]
-
-    def prepare_mh(self, obj):
-        # used for search and record presentation / populate with all descriptors (mh)
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj))]
-
     def prepare_created_date(self, obj):
         if obj.created_time:
             return obj.created_time.strftime('%Y%m%d')
@@ -264,7 +233,6 @@ class RefereceSourceIndex(indexes.SearchIndex, indexes.Indexable):
         if obj.updated_time:
             return obj.updated_time.strftime('%Y%m%d')
 
-
     def get_field_values(self, field, attribute = 'text'):
         value_list = field
         if type(field) != list:
@@ -274,4 +242,5 @@ class RefereceSourceIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()).select_related('publication_country') \
+                                       .prefetch_related('indexed_database')
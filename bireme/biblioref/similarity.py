@@ -0,0 +1,197 @@
+#! coding: utf-8
+from django.db import connection
+from django.db.models import Count
+
+from biblioref.models import ReferenceAnalytic, ReferenceSimilarityBucket
+
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+import zlib
+
+# MinHash signature of NUM_PERMUTATIONS values split in LSH_BANDS bands. Titles with Jaccard similarity
+# of trigrams above ~0.5 share at least one band with high probability ((1/bands) ** (1/rows))
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# minimum similarity of candidates reported as possible duplicates
+TITLE_THRESHOLD = 0.7
+SERIAL_THRESHOLD = 0.5
+
+# maximum number of candidates verified by check. Generic titles (ex. Editorial) share the same buckets
+# with thousands of analytics, only the candidates sharing more buckets are verified
+MAX_CANDIDATES = 100
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(20180101)
+PERMUTATIONS = [(_random.randint(1, _MERSENNE_PRIME - 1), _random.randint(0, _MERSENNE_PRIME - 1))
+                for count in range(NUM_PERMUTATIONS)]
+
+
+def normalize_text(text):
+    """
+    Lower case text without accents, punctuation and repeated spaces
+    """
+    if not text:
+        return u''
+    if not isinstance(text, unicode):
+        text = text.decode('utf-8')
+
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = u''.join(char for char in text if not unicodedata.combining(char))
+
+    return u' '.join(re.findall(r'\w+', text, re.UNICODE))
+
+
+def shingles(text):
+    """
+    Set of character trigrams of normalized text
+    """
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return set([text]) if text else set()
+
+    return set(text[pos:pos + SHINGLE_SIZE] for pos in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def jaccard(set_a, set_b):
+    if not set_a or not set_b:
+        return 0.0
+
+    return float(len(set_a & set_b)) / len(set_a | set_b)
+
+
+def minhash(shingle_set):
+    hashes = [zlib.crc32(shingle.encode('utf-8')) & 0xffffffff for shingle in shingle_set]
+
+    return [min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def lsh_buckets(shingle_set):
+    """
+    Return set of LSH bucket keys (signed 64 bits) of a shingle set, one by band
+    """
+    if not shingle_set:
+        return set()
+
+    signature = minhash(shingle_set)
+    buckets = set()
+    for band in range(LSH_BANDS):
+        band_values = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.md5('%d:%s' % (band, ','.join(str(value) for value in band_values))).digest()
+        buckets.add(struct.unpack('<q', digest[:8])[0])
+
+    return buckets
+
+
+def analytic_titles(analytic):
+    """
+    Return list with the text of each language of analytic title
+    """
+    titles = analytic.title if isinstance(analytic.title, list) else []
+
+    return [title['text'] for title in titles if isinstance(title, dict) and title.get('text')]
+
+
+def title_buckets(titles):
+    buckets = set()
+    for title in titles:
+        buckets.update(lsh_buckets(shingles(title)))
+
+    return buckets
+
+
+def index_reference(analytic):
+    """
+    Update buckets of analytic. Only added/removed buckets are written (unchanged titles cost one query)
+    """
+    buckets = title_buckets(analytic_titles(analytic))
+    current = dict(ReferenceSimilarityBucket.objects.filter(reference=analytic.pk).values_list('bucket', 'pk'))
+
+    removed_ids = [pk for bucket, pk in current.items() if bucket not in buckets]
+    if removed_ids:
+        delete_buckets('id', removed_ids)
+
+    ReferenceSimilarityBucket.objects.bulk_create(ReferenceSimilarityBucket(reference_id=analytic.pk, bucket=bucket)
+                                                  for bucket in buckets if bucket not in current)
+
+
+def delete_buckets(column, ids):
+    # buckets are derived rows without relations: delete with one query, without loading the rows and
+    # sending delete signals (QuerySet.delete() load the rows when there are delete signal receivers)
+    if not ids:
+        return
+
+    table = connection.ops.quote_name(ReferenceSimilarityBucket._meta.db_table)
+    cursor = connection.cursor()
+    cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (table, connection.ops.quote_name(column),
+                                                         ', '.join(['%s'] * len(ids))), list(ids))
+
+
+def build_index(batch_size=1000, start_id=0):
+    """
+    Generator that (re)build the buckets of all analytics in id order, yield last id of each batch
+    """
+    last_id = start_id
+    while True:
+        analytics = list(ReferenceAnalytic.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+        if not analytics:
+            break
+
+        analytic_ids = [analytic.pk for analytic in analytics]
+        delete_buckets('reference_id', analytic_ids)
+        ReferenceSimilarityBucket.objects.bulk_create(
+            ReferenceSimilarityBucket(reference_id=analytic.pk, bucket=bucket)
+            for analytic in analytics for bucket in title_buckets(analytic_titles(analytic)))
+
+        last_id = analytic_ids[-1]
+        yield last_id
+
+
+def find_duplicates(titles, serial='', year='', exclude_id=None, limit=10):
+    """
+    Return list of (analytic, title similarity) of analytics with similar title, same publication year
+    and similar serial title, ordered by similarity. Candidates are selected by the LSH buckets of the
+    titles (one indexed query), up to MAX_CANDIDATES ordered by number of shared buckets, and verified
+    with the exact trigram similarity
+    """
+    title_shingles = [shingles(title) for title in titles if title]
+    buckets = set()
+    for shingle_set in title_shingles:
+        buckets.update(lsh_buckets(shingle_set))
+    if not buckets:
+        return []
+
+    candidates = ReferenceSimilarityBucket.objects.filter(bucket__in=buckets)
+    if exclude_id:
+        candidates = candidates.exclude(reference=exclude_id)
+    candidates = candidates.values_list('reference_id').annotate(shared=Count('pk')) \
+                           .order_by('-shared', '-reference_id')[:MAX_CANDIDATES]
+    candidate_ids = set(reference_id for reference_id, shared in candidates)
+    if not candidate_ids:
+        return []
+
+    serial_shingles = shingles(serial)
+    year = (year or '')[:4]
+
+    duplicates = []
+    analytics = ReferenceAnalytic.objects.filter(pk__in=candidate_ids).select_related('source')
+    for analytic in analytics:
+        analytic_year = (analytic.source.publication_date_normalized or '')[:4]
+        if year and analytic_year and year != analytic_year:
+            continue
+        if serial_shingles and jaccard(serial_shingles, shingles(analytic.source.title_serial)) < SERIAL_THRESHOLD:
+            continue
+
+        similarity = max([jaccard(shingle_set, shingles(title))
+                          for shingle_set in title_shingles for title in analytic_titles(analytic)] or [0.0])
+        if similarity >= TITLE_THRESHOLD:
+            duplicates.append((analytic, similarity))
+
+    duplicates.sort(key=lambda duplicate: (-duplicate[1], duplicate[0].pk))
+
+    return duplicates[:limit]
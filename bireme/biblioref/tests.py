@@ -2,14 +2,32 @@
 
 from django.test.client import Client
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.admin.models import LogEntry, CHANGE
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.utils import timezone
 
 from main.models import Descriptor, ResourceThematic, ThematicArea
-from title.models import Title
-from utils.models import AuxCode
+from title.models import Title, IndexRange
+from utils.models import AuxCode, SearchIndexQueue
 from database.models import Database
 
 from utils.tests import BaseTestCase
 from models import *
+from search_indexes import ReferenceAnalyticIndex
+from dedup import queue_registration, send_pending
+import similarity
+from similarity import find_duplicates
+from choice_lists import choice_lists
+from log.models import LogReview, ChangeJournal
+from views import refs_changed_by_other_cc, refs_changed_by_other_user
+
+import json
+import re
+import requests
+import threading
 
 form_data = {}
 
@@ -378,3 +396,425 @@ class BiblioRefTest(BaseTestCase):
         post_data['electronic_address'] = '[{"_u": "http://fulltext.org", "_i": "pt", "_q": "pdf", "_y": "PDF" }]'
         response = self.client.post('/bibliographic/edit-analytic/2', post_data)
         self.assertRedirects(response, '/bibliographic/analytics?source=1')
+
+
+    def test_edit_single_save(self):
+        """
+        Edit of analytic save the reference once and queue one index update after commit. The number
+        of queries of edit don't depend of descriptors and thematic areas already saved in the reference
+        """
+        self.login_documentalist()
+
+        source = ReferenceSource.objects.create(status=-1, literature_type='S', treatment_level='',
+                                                title_serial='Rev. Enfermagem', volume_serial='10',
+                                                issue_number='2', publication_date_normalized='20150501',
+                                                reference_title='Rev. Enfermagem; 10 (2), 2015')
+
+        def create_analytic():
+            return ReferenceAnalytic.objects.create(status=-1, literature_type='S', treatment_level='as',
+                                                    source=source, title=[{'text': 'Analitica', '_i': 'pt'}])
+
+        post_data = dict(form_data['Sas'])
+        post_data.update(blank_formsets)
+        post_data.update(primary_descriptor)
+        post_data['status'] = '-1'
+        post_data['referencecomplement_set-0-conference_name'] = 'Congresso de Enfermagem'
+        post_data['referencecomplement_set-0-conference_date'] = '2016'
+        post_data['referencecomplement_set-0-conference_normalized_date'] = '20160000'
+        post_data['referencecomplement_set-0-conference_city'] = 'Recife'
+
+        def edit_analytic(analytic):
+            response = self.client.post('/bibliographic/edit-analytic/%s' % analytic.pk, post_data)
+            self.assertRedirects(response, '/bibliographic/analytics?source=%s' % source.pk)
+
+        # first edit load the per-process caches (choice lists, auxiliary tables, content types)
+        edit_analytic(create_analytic())
+
+        analytic = create_analytic()
+        SearchIndexQueue.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as context:
+            edit_analytic(analytic)
+
+        queries = [query['sql'] for query in context.captured_queries]
+        reference_updates = [sql for sql in queries if re.match(r'UPDATE\W+biblioref_reference\W', sql)]
+        self.assertEqual(len(reference_updates), 1)
+
+        # search for pending entry (UPDATE) and INSERT of one entry
+        queue_writes = [sql for sql in queries if 'searchindexqueue' in sql and not sql.startswith('SELECT')]
+        self.assertEqual(len(queue_writes), 2)
+        self.assertEqual(SearchIndexQueue.objects.filter(object_id=analytic.pk).count(), 1)
+
+        # derived fields saved with the reference
+        analytic = ReferenceAnalytic.objects.get(pk=analytic.pk)
+        self.assertEqual(analytic.literature_type, 'SC')
+        self.assertEqual(analytic.indexer_cc_code, 'BR1.1')
+        self.assertEqual(analytic.reference_title, u'Rev. Enfermagem; 10 (2), 2015 | Primeira analítica')
+
+        # same edit of analytic with descriptors and thematic areas run the same queries
+        indexed_analytic = create_analytic()
+        c_type = ContentType.objects.get_for_model(ReferenceAnalytic)
+        for count in range(5):
+            Descriptor.objects.create(object_id=indexed_analytic.pk, content_type=c_type, status=1,
+                                      text='descritor %s' % count, code='^d%s' % count)
+            thematic = ThematicArea.objects.create(acronym='LISBR1.%s' % count, name='Tema %s' % count)
+            ResourceThematic.objects.create(object_id=indexed_analytic.pk, content_type=c_type,
+                                            thematic_area=thematic)
+        # same queue state of first edit (no pending entry of the analytic)
+        SearchIndexQueue.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as context:
+            edit_analytic(indexed_analytic)
+
+        indexed_queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(len(indexed_queries), len(queries))
+        self.assertEqual(len([sql for sql in indexed_queries if re.match(r'UPDATE\W+biblioref_reference\W', sql)]), 1)
+        self.assertEqual(len([sql for sql in indexed_queries
+                              if 'searchindexqueue' in sql and not sql.startswith('SELECT')]), 2)
+
+
+class BiblioRefIndexTest(BaseTestCase):
+    """
+    Tests for search index of bibliographic references
+    """
+
+    def setUp(self):
+        super(BiblioRefIndexTest, self).setUp()
+
+        AuxCode.objects.create(code='pt', field='text_language', language='pt', label='Português')
+        self.thematic = ThematicArea.objects.create(acronym='LISBR1.1', name='Teste')
+        self.source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                     title_serial='Rev. Enfermagem', volume_serial='10',
+                                                     issue_number='2', publication_date_normalized='20160501')
+        self.index = ReferenceAnalyticIndex()
+
+    def create_analytics(self, total):
+        c_type = ContentType.objects.get_for_model(ReferenceAnalytic)
+
+        for count in range(total):
+            analytic = ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as',
+                                                        source=self.source, text_language=['pt'],
+                                                        title=[{'text': 'Analytic %s' % count, '_i': 'pt'}])
+
+            Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, code='^d8462', primary=True)
+            Descriptor.objects.create(object_id=analytic.pk, content_type=c_type, code='^d3878')
+            ResourceThematic.objects.create(object_id=analytic.pk, content_type=c_type,
+                                            thematic_area=self.thematic)
+            ReferenceLocal.objects.create(source=analytic, database='LOCAL\r\nBR1.1')
+
+    def prepare_documents(self, limit):
+        objects = list(self.index.index_queryset()[:limit])
+        self.index.prepare_batch(objects)
+        documents = [self.index.full_prepare(obj) for obj in objects]
+        self.index.clear_batch()
+
+        return documents
+
+    def test_batch_number_of_queries(self):
+        """
+        Number of queries to prepare a batch don't depend of the number of documents
+        """
+        self.create_analytics(6)
+
+        # populate ContentType and translation caches
+        self.prepare_documents(1)
+
+        with CaptureQueriesContext(connection) as small_batch:
+            self.prepare_documents(2)
+        with CaptureQueriesContext(connection) as large_batch:
+            self.prepare_documents(6)
+
+        self.assertEqual(len(small_batch.captured_queries), len(large_batch.captured_queries))
+
+    def test_batch_by_thread(self):
+        """
+        Batch prepared by index in one thread is not cleared by updates of other thread
+        """
+        self.create_analytics(2)
+        objects = list(self.index.index_queryset())
+        self.index.prepare_batch(objects)
+
+        other_thread = threading.Thread(target=self.index.clear_batch)
+        other_thread.start()
+        other_thread.join()
+
+        with self.assertNumQueries(0):
+            batch = self.index.get_batch(objects[0])
+        self.assertEqual(len(batch['descriptors']), 2)
+        self.index.clear_batch()
+
+    def test_batch_content(self):
+        """
+        Documents prepared in batch are equal to documents prepared one by one
+        """
+        self.create_analytics(2)
+
+        batch_documents = self.prepare_documents(2)
+        single_documents = [self.index.full_prepare(obj) for obj in self.index.index_queryset()]
+
+        self.assertEqual(batch_documents, single_documents)
+        self.assertEqual(batch_documents[0]['mj'], ['^d8462'])
+        self.assertEqual(batch_documents[0]['database'], ['LOCAL', 'BR1.1'])
+        self.assertEqual(batch_documents[0]['thematic_area'], ['LISBR1.1'])
+
+
+class ChangedByOthersTest(BaseTestCase):
+    """
+    Tests for list of references changed by other users/cooperative centers
+    """
+
+    def setUp(self):
+        super(ChangedByOthersTest, self).setUp()
+
+        self.login_documentalist()
+        self.login_editor()
+        self.login_editor_llxp()
+
+        self.doc = User.objects.get(username='doc')
+        self.editor = User.objects.get(username='editor')
+        self.editor_llxp = User.objects.get(username='editor_llxp')
+        self.c_type = ContentType.objects.get_for_model(ReferenceSource)
+
+    def create_references(self, total):
+        references = []
+        for count in range(total):
+            references.append(ReferenceSource.objects.create(status=0, literature_type='M', treatment_level='m',
+                                                             cooperative_center_code='BR1.1', created_by=self.doc,
+                                                             title_monographic=[{'text': 'Ref %s' % count}]))
+
+        return references
+
+    def log_change(self, user, reference):
+        return LogEntry.objects.create(user=user, content_type=self.c_type, object_id=str(reference.pk),
+                                       object_repr='ref', action_flag=CHANGE)
+
+    def test_changed_by_others(self):
+        """
+        Tests reviewed changes and changes of current user (or same cc) are not listed
+        """
+        ref1, ref2, ref3 = self.create_references(3)
+
+        self.log_change(self.editor, ref1)
+        self.log_change(self.doc, ref1)
+        self.log_change(self.editor_llxp, ref2)
+        reviewed_log = self.log_change(self.editor_llxp, ref3)
+        LogReview.objects.create(log=reviewed_log, status=1)
+
+        changed_by_user = refs_changed_by_other_user(self.doc)
+        self.assertEqual(sorted(changed_by_user.keys()), [str(ref1.pk), str(ref2.pk)])
+        self.assertEqual(changed_by_user[str(ref1.pk)].user, self.editor)
+
+        # changes made by editor of same cooperative center are not listed
+        changed_by_cc = refs_changed_by_other_cc(self.doc)
+        self.assertEqual(changed_by_cc.keys(), [str(ref2.pk)])
+
+    def test_number_of_queries(self):
+        """
+        Number of queries don't depend of the number of references and logs
+        """
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                refs_changed_by_other_user(self.doc)
+                refs_changed_by_other_cc(self.doc)
+
+            return len(context.captured_queries)
+
+        for reference in self.create_references(2):
+            self.log_change(self.editor_llxp, reference)
+        queries_few_refs = count_queries()
+
+        for reference in self.create_references(10):
+            self.log_change(self.editor_llxp, reference)
+        queries_many_refs = count_queries()
+
+        self.assertEqual(queries_few_refs, queries_many_refs)
+
+
+class FakeDedupSession(object):
+    """
+    HTTP session that record the posts and return the configured status code
+    """
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.posts = []
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        self.posts.append((url, data))
+        response = requests.Response()
+        response.status_code = self.status_code
+        return response
+
+
+@override_settings(DEDUP_PUT_URL='http://dedup.test/services/put')
+class DedupOutboxTest(BaseTestCase):
+    """
+    Tests for outbox of DeDup registrations (biblioref.dedup)
+    """
+
+    def setUp(self):
+        super(DedupOutboxTest, self).setUp()
+
+        source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                title_serial='Rev. Enfermagem', publication_date_normalized='20150501')
+        self.analytic = ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as',
+                                                         source=source, title=[{'text': 'Analitica', '_i': 'pt'}])
+
+    def test_registration_retry(self):
+        queue_registration(self.analytic)
+        queue_registration(self.analytic)
+        entry = DedupOutbox.objects.get()
+        self.assertEqual(entry.dedup_id, 'fiadmin-%s' % self.analytic.pk)
+        self.assertTrue(entry.url.endswith('/lilacs_Sas/LILACS_Sas_Three/fiadmin-%s' % self.analytic.pk))
+
+        # failure schedule a new attempt with backoff
+        self.assertEqual(send_pending(session=FakeDedupSession(status_code=503)), 1)
+        entry = DedupOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), (DedupOutbox.PENDING, 1))
+        self.assertGreater(entry.next_attempt_time, timezone.now())
+        self.assertIn('503', entry.last_error)
+        self.assertEqual(send_pending(session=FakeDedupSession()), 0)
+
+        # save of reference with same content keep the backoff
+        queue_registration(self.analytic)
+        pending = DedupOutbox.objects.get()
+        self.assertEqual((pending.attempts, pending.next_attempt_time, pending.version),
+                         (entry.attempts, entry.next_attempt_time, entry.version))
+
+        DedupOutbox.objects.update(next_attempt_time=timezone.now())
+        session = FakeDedupSession()
+        self.assertEqual(send_pending(session=session), 1)
+        self.assertEqual(len(session.posts), 1)
+        self.assertEqual(DedupOutbox.objects.get().status, DedupOutbox.SENT)
+
+        # same content is not sent again, changes are
+        queue_registration(self.analytic)
+        self.assertEqual(DedupOutbox.objects.get().status, DedupOutbox.SENT)
+
+        self.analytic.title = [{'text': 'Analitica revisada', '_i': 'pt'}]
+        queue_registration(self.analytic)
+        entry = DedupOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts, entry.version), (DedupOutbox.PENDING, 0, 2))
+
+    def test_registration_not_journaled(self):
+        """
+        Outbox entries are not changes of the reference (change journal)
+        """
+        journal_size = ChangeJournal.objects.count()
+
+        queue_registration(self.analytic)
+        DedupOutbox.objects.get().delete()
+
+        self.assertEqual(ChangeJournal.objects.count(), journal_size)
+
+
+class SimilarityIndexTest(BaseTestCase):
+    """
+    Tests for local index of possible duplicates (biblioref.similarity)
+    """
+
+    def setUp(self):
+        super(SimilarityIndexTest, self).setUp()
+
+        self.source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                     title_serial='Rev. Enfermagem',
+                                                     publication_date_normalized='20150501')
+        self.analytic = ReferenceAnalytic.objects.create(
+            status=1, literature_type='S', treatment_level='as', source=self.source,
+            title=[{'text': u'Avaliação da atenção primária em saúde no município de Recife', '_i': 'pt'}])
+        ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as', source=self.source,
+                                         title=[{'text': u'Prevalência de diabetes em idosos', '_i': 'pt'}])
+
+    def test_find_duplicates(self):
+        duplicates = find_duplicates([u'AVALIACAO DA ATENCAO PRIMARIA EM SAUDE NO MUNICIPIO DE RECIFE.'],
+                                     serial='Rev. Enfermagem', year='2015')
+        self.assertEqual([analytic.pk for analytic, similarity in duplicates], [self.analytic.pk])
+
+        # other year, other title or the record itself
+        self.assertEqual(find_duplicates([u'Avaliação da atenção primária em saúde no município de Recife'],
+                                         year='2010'), [])
+        self.assertEqual(find_duplicates([u'Mortalidade infantil na região norte']), [])
+        self.assertEqual(find_duplicates([u'Avaliação da atenção primária em saúde no município de Recife'],
+                                         exclude_id=self.analytic.pk), [])
+
+        # index is updated on save
+        self.analytic.title = [{'text': u'Vigilância da tuberculose em populações indígenas', '_i': 'pt'}]
+        self.analytic.save()
+        self.assertEqual(find_duplicates([u'Avaliação da atenção primária em saúde no município de Recife']), [])
+        self.assertEqual(len(find_duplicates([u'Vigilancia da tuberculose em populacoes indigenas'])), 1)
+
+    def test_candidates_limit(self):
+        """
+        Only the candidates sharing more buckets are verified (generic titles)
+        """
+        for count in range(5):
+            ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as', source=self.source,
+                                             title=[{'text': u'Editorial', '_i': 'pt'}])
+        ReferenceAnalytic.objects.create(status=1, literature_type='S', treatment_level='as', source=self.source,
+                                         title=[{'text': u'Editorial: Revista de Enfermagem', '_i': 'pt'}])
+
+        max_candidates = similarity.MAX_CANDIDATES
+        similarity.MAX_CANDIDATES = 3
+        try:
+            with CaptureQueriesContext(connection) as context:
+                duplicates = find_duplicates([u'Editorial'])
+        finally:
+            similarity.MAX_CANDIDATES = max_candidates
+
+        self.assertEqual(len(duplicates), 3)
+        self.assertEqual([analytic_similarity for analytic, analytic_similarity in duplicates], [1.0, 1.0, 1.0])
+        # buckets and candidates
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_check_duplication_view(self):
+        self.login_documentalist()
+
+        response = self.client.get('/bibliographic/check-duplication', {
+            'title': u'Avaliação da atenção primária em saúde no município do Recife', 'source': self.source.pk})
+        data = json.loads(response.content)
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['result'][0]['id'], 'fiadmin-%s' % self.analytic.pk)
+
+        response = self.client.get('/bibliographic/check-duplication', {'title': 'Avaliação', 'source': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/bibliographic/check-duplication', {'title': 'Avaliação', 'id': '1;2'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChoiceListsTest(BaseTestCase):
+    """
+    Tests for cached choice lists of serial titles and countries (biblioref.choice_lists)
+    """
+
+    def test_serial_titles_of_indexer(self):
+        title = Title.objects.create(id_number='1', record_type='KS', treatment_level='K', status='1',
+                                     title='Revista de Enfermagem', shortened_title='Rev. Enfermagem',
+                                     issn='0000-0001')
+        IndexRange.objects.create(title=title, indexer_cc_code='BR1.1')
+
+        self.assertEqual(choice_lists.get('serial_titles_of_indexer', 'BR1.1'),
+                         ([('Rev. Enfermagem', 'Rev. Enfermagem|0000-0001')], []))
+
+        with CaptureQueriesContext(connection) as context:
+            choice_lists.get('serial_titles_of_indexer', 'BR1.1')
+        self.assertEqual(len(context.captured_queries), 0)
+
+        # change of index range invalidate the lists
+        other = Title.objects.create(id_number='2', record_type='KS', treatment_level='K', status='1',
+                                     title='Revista de Medicina', shortened_title='Rev. Medicina', issn='0000-0002')
+        IndexRange.objects.create(title=other, indexer_cc_code='BR2.1')
+
+        self.assertEqual(choice_lists.get('serial_titles_of_indexer', 'BR1.1')[1],
+                         [('Rev. Medicina', 'Rev. Medicina|0000-0002')])
+
+    def test_countries_by_region(self):
+        Country.objects.create(code='BR', name='Brasil', LA_Caribbean=True)
+        Country.objects.create(code='AR', name='Argentina', LA_Caribbean=True)
+        Country.objects.create(code='ES', name='Espanha', LA_Caribbean=False)
+
+        latin_caribbean, other = choice_lists.get('countries_by_region', 'pt-br')
+        self.assertEqual([name for pk, name in latin_caribbean], ['Argentina', 'Brasil'])
+        self.assertEqual([name for pk, name in other], ['Espanha'])
+
+        with CaptureQueriesContext(connection) as context:
+            choice_lists.get('countries_by_region', 'pt-br')
+        self.assertEqual(len(context.captured_queries), 0)
@@ -16,4 +16,5 @@ urlpatterns = [
     url(r'^delete/(?P<pk>\d+)/?$', BiblioRefDeleteView.as_view(), name='delete_biblioref'),
 
     url(r'^duplicates/(?P<reference_id>\d+)/', view_duplicates, name='view_duplicates'),
+    url(r'^check-duplication/?$', check_duplication, name='check_duplication_biblioref'),
 ]
@@ -1,27 +1,33 @@
 #! coding: utf-8
 from collections import defaultdict
 from django.core.urlresolvers import reverse_lazy
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.utils.translation import ugettext as _
 from django.views.generic.list import ListView
 from django.views.generic.edit import FormView, CreateView, UpdateView, DeleteView
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.db.models import Q
+from django.contrib.admin.models import LogEntry, CHANGE
 
 from django.shortcuts import render_to_response
 from django.views.decorators.csrf import csrf_exempt
+from django.contrib.auth.decorators import login_required
 
 from field_definitions import FIELDS_BY_DOCUMENT_TYPE
 
 from utils.views import ACTIONS
 from cross_validation import check_for_publication
 from utils.context_processors import additional_user_info
+from utils.profile import get_user_cc, get_users_cc
 from attachments.models import Attachment
 from main.models import Descriptor
 from title.models import Title
 from database.models import Database
 from help.models import get_help_fields
 from utils.views import LoginRequiredView
+from utils.indexing import index_on_commit
+from similarity import find_duplicates, analytic_titles
 from forms import *
 
 import json
@@ -98,11 +104,11 @@ class BiblioRefGenericListView(LoginRequiredView, ListView):
             object_list = object_list.filter(created_by=self.request.user)
         # filter by cooperative center
         elif self.actions['filter_owner'] == 'center':
-            user_cc = self.request.user.profile.get_attribute('cc')
+            user_cc = get_user_cc(self.request.user)
             object_list = object_list.filter(cooperative_center_code=user_cc)
         # filter by titles of responsibility of current user CC
         elif self.actions['filter_owner'] == 'indexed':
-            user_cc = self.request.user.profile.get_attribute('cc')
+            user_cc = get_user_cc(self.request.user)
             titles_indexed = [t.shortened_title for t in Title.objects.filter(indexrange__indexer_cc_code=user_cc)]
             if titles_indexed:
                 filter_title_qs = Q()
@@ -204,43 +210,49 @@ class BiblioRefUpdate(LoginRequiredView):
         if (form_valid and formset_descriptor_valid and formset_attachment_valid and
            formset_complement_valid and valid_for_publication):
 
-                self.object = form.save()
+                # one transaction with a single save of reference and one index update after commit
+                with index_on_commit():
+                    self.object = form.save(commit=False)
 
-                # Check if is present conference or project complement
-                complement_conference = formset_complement.cleaned_data[0].get('conference_name')
-                complement_project = (formset_complement.cleaned_data[0].get('project_name') or
-                                      formset_complement.cleaned_data[0].get('project_number'))
+                    # Check if is present conference or project complement
+                    complement_conference = formset_complement.cleaned_data[0].get('conference_name')
+                    complement_project = (formset_complement.cleaned_data[0].get('project_name') or
+                                          formset_complement.cleaned_data[0].get('project_number'))
 
-                # Update information at literature_type field
-                if complement_conference:
-                    self.object.literature_type += 'C'
-                elif 'C' in self.object.literature_type:
-                    self.object.literature_type = self.object.literature_type.replace('C', '')
+                    # Update information at literature_type field
+                    if complement_conference:
+                        self.object.literature_type += 'C'
+                    elif 'C' in self.object.literature_type:
+                        self.object.literature_type = self.object.literature_type.replace('C', '')
 
-                if complement_project:
-                    self.object.literature_type += 'P'
-                elif 'P' in self.object.literature_type:
-                    self.object.literature_type = self.object.literature_type.replace('P', '')
+                    if complement_project:
+                        self.object.literature_type += 'P'
+                    elif 'P' in self.object.literature_type:
+                        self.object.literature_type = self.object.literature_type.replace('P', '')
+
+                    # if is first center to index the reference save the code in indexer_cc_code
+                    if not self.object.indexer_cc_code and self.has_descriptor_changes(formset_descriptor):
+                        self.object.indexer_cc_code = get_user_cc(self.request.user)
 
-                if (complement_conference or complement_project):
                     self.object.save()
+                    # save many-to-many relation fields
+                    form.save_m2m()
+
+                    formset_descriptor.instance = self.object
+                    formset_descriptor.save()
 
-                formset_descriptor.instance = self.object
-                formset_descriptor.save()
+                    formset_attachment.instance = self.object
+                    formset_attachment.save()
 
-                formset_attachment.instance = self.object
-                formset_attachment.save()
+                    formset_library.instance = self.object
+                    formset_library.save()
 
-                formset_library.instance = self.object
-                formset_library.save()
+                    formset_complement.instance = self.object
+                    formset_complement.save()
 
-                formset_complement.instance = self.object
-                formset_complement.save()
+                    # DeDup outbox is written in the same transaction of the record
+                    form.update_dedup(self.object)
 
-                # update solr index
-                form.save()
-                # save many-to-many relation fields
-                form.save_m2m()
                 return HttpResponseRedirect(self.get_success_url())
         else:
             # if not valid for publication return status to original (previous) value
@@ -263,6 +275,13 @@ class BiblioRefUpdate(LoginRequiredView):
             # force use of form_valid method to run all validations
             return self.form_valid(form)
 
+    def has_descriptor_changes(self, formset_descriptor):
+        for descriptor_form in formset_descriptor.forms:
+            if descriptor_form.has_changed() and not formset_descriptor._should_delete_form(descriptor_form):
+                return True
+
+        return False
+
     def get_form_kwargs(self):
         kwargs = super(BiblioRefUpdate, self).get_form_kwargs()
         document_type = ''
@@ -538,78 +557,106 @@ def view_duplicates(request, reference_id):
                                                                   'other': other,
                                                                   })
 
+@login_required
+def check_duplication(request):
+    """
+    Return analytics with title similar to title parameter in the same serial/year of source parameter
+    (local similarity index, see biblioref.similarity). Output use the format of DeDup service
+    """
+    title = request.GET.get('title', '')
+    source_id = request.GET.get('source', '')
+    exclude_id = request.GET.get('id', '')
+    if not all(value.isdigit() for value in (source_id, exclude_id) if value):
+        return HttpResponseBadRequest('invalid source or id parameter')
+
+    reference_source = ReferenceSource.objects.filter(pk=source_id).first() if source_id else None
+    exclude_id = int(exclude_id) if exclude_id else None
+
+    serial = reference_source.title_serial if reference_source else ''
+    year = reference_source.publication_date_normalized[:4] if reference_source else ''
+
+    result = []
+    for analytic, similarity in find_duplicates([title], serial=serial, year=year, exclude_id=exclude_id):
+        titles = analytic_titles(analytic)
+        result.append({'id': 'fiadmin-%s' % analytic.pk, 'titulo_artigo': titles[0] if titles else '',
+                       'titulo_revista': analytic.source.title_serial,
+                       'ano_publicacao': analytic.source.publication_date_normalized[:4],
+                       'similarity': round(similarity, 2)})
+
+    data = json.dumps({'total': len(result), 'result': result})
+
+    return HttpResponse(data, content_type='application/json')
+
+
+def cast_to_text(column):
+    """
+    SQL expression that convert a integer column to text (used to compare with LogEntry.object_id)
+    """
+    if connection.vendor == 'mysql':
+        return 'CAST(%s AS CHAR)' % column
+    else:
+        return 'CAST(%s AS TEXT)' % column
+
+
+def unreviewed_change_logs(current_user):
+    """
+    Return queryset of change logs of references made by other users that was not reviewed yet (no logreview)
+    """
+    ref_ctypes = ContentType.objects.get_for_models(ReferenceAnalytic, ReferenceSource).values()
+
+    return LogEntry.objects.filter(content_type__in=ref_ctypes, action_flag=CHANGE, logreview__isnull=True) \
+                           .exclude(user=current_user).order_by('-id')
+
+
 def refs_changed_by_other_cc(current_user):
     """
     Return dictionary with id of reference and log object changed by other cooperative centers
     """
-    current_user_cc = current_user.profile.get_attribute('cc')
+    current_user_cc = get_user_cc(current_user)
     result_list = defaultdict(list)
 
     # get last references of current user cooperative center
-    refs_from_cc = Reference.objects.filter(cooperative_center_code=current_user_cc).order_by('-id')[:100]
-
-    for reference in refs_from_cc:
-        # get correct class (source our analytic)
-        c_type = reference.get_content_type_id
-        # filter by logs of current reference, change type and made by other users
-        log_list = LogEntry.objects.filter(object_id=reference.id, content_type=c_type, action_flag=2) \
-                                   .exclude(user=current_user).order_by('-id')
-
-        if log_list:
-            # exclude from list all changes that was already reviewed (logreview is created)
-            log_list = log_list.exclude(logreview__isnull=False)
-
-        # create list of log users of same cc
-        exclude_user_list = []
-        for log in log_list:
-            log_user_cc = log.user.profile.get_attribute('cc')
-            if log_user_cc == current_user_cc:
-                exclude_user_list.append(log.user)
-        # exclude from log list users from same cc as current user
-        if exclude_user_list:
-            log_list = log_list.exclude(user__in=exclude_user_list)
-
-        if log_list:
-            # group result by id (one line for each reference)
-            for log in log_list:
-                result_list[log.object_id] = log
+    refs_from_cc = Reference.objects.filter(cooperative_center_code=current_user_cc).order_by('-id')
+    ref_ids = [str(ref_id) for ref_id in refs_from_cc.values_list('id', flat=True)[:100]]
+    if not ref_ids:
+        return result_list
+
+    log_list = list(unreviewed_change_logs(current_user).filter(object_id__in=ref_ids))
+
+    # exclude changes made by users of same cc as current user
+    users_cc = get_users_cc(set(log.user_id for log in log_list))
+
+    # group result by id (one line for each reference)
+    for log in log_list:
+        if users_cc.get(log.user_id) != current_user_cc:
+            result_list[log.object_id] = log
 
     return result_list
 
+
 def refs_changed_by_other_user(current_user):
     """
     Return dictionary with id of reference and log object changed by other user
     """
-    log_list = []
     result_list = defaultdict(list)
 
-    # get references created by current user
-    refs_from_user = Reference.objects.filter(created_by=current_user)
-    for reference in refs_from_user:
-        # get correct class (source our analytic)
-        c_type = reference.get_content_type_id
-        # filter by logs of current reference, change type and made by other users
-        changed_by_other_user = LogEntry.objects.filter(object_id=reference.id, content_type=c_type, action_flag=2) \
-                                                .exclude(user=current_user).order_by('-id')
-        if changed_by_other_user:
-            # exclude from list all changes that was already reviewed (logreview is created)
-            changed_by_other_user = changed_by_other_user.exclude(logreview__isnull=False)
-
-        log_list.extend(changed_by_other_user)
-
-    # group result (one line for each reference)
-    if log_list:
-        # group result by id (one line for each reference)
-        for log in log_list:
-            result_list[log.object_id] = log
+    # logs of references created by current user
+    refs_from_user = "SELECT %s FROM %s WHERE created_by_id = %%s" % (cast_to_text('id'), Reference._meta.db_table)
+    log_list = unreviewed_change_logs(current_user).extra(
+        where=["%s.object_id IN (%s)" % (LogEntry._meta.db_table, refs_from_user)],
+        params=[current_user.pk]
+    )
 
+    # group result by id (one line for each reference)
+    for log in log_list:
+        result_list[log.object_id] = log
 
     return result_list
 
 
 def refs_llxp_for_indexing(current_user):
 
-    user_cc = current_user.profile.get_attribute('cc')
+    user_cc = get_user_cc(current_user)
 
     # first filter by LLXP records
     ref_list = Reference.objects.filter(status=0)
@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _, get_language
 
 from utils.models import Generic
+from utils.translation_cache import cached_translation
 from utils.fields import MultipleAuxiliaryChoiceField
 
 LANGUAGES_CHOICES = (
@@ -25,9 +26,9 @@ class Database(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = DatabaseLocal.objects.filter(database=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(DatabaseLocal, 'database', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
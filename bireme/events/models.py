@@ -4,6 +4,7 @@ from django.db import models
 from django.utils import timezone
 
 from utils.models import Generic, Country
+from utils.translation_cache import cached_translations, cached_translation
 from main.choices import LANGUAGES_CHOICES
 from main.models import ResourceThematic
 from error_reporting.models import ErrorReport
@@ -23,18 +24,18 @@ class EventType(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = EventTypeLocal.objects.filter(event_type=self.id)
+        translation = cached_translations(EventTypeLocal, 'event_type', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = EventTypeLocal.objects.filter(event_type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(EventTypeLocal, 'event_type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -1,12 +1,10 @@
 import datetime
 from haystack import indexes
-from main.models import Descriptor, Keyword, SourceLanguage, SourceType, ResourceThematic
-from events.models import Event, EventType
+from events.models import Event
+from utils.indexing import BatchPrepareMixin
 
-from django.contrib.contenttypes.models import ContentType
 
-
-class EventIndex(indexes.SearchIndex, indexes.Indexable):
+class EventIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     link = indexes.CharField(model_attr='link', null=True)
@@ -29,30 +27,32 @@ class EventIndex(indexes.SearchIndex, indexes.Indexable):
     status = indexes.IntegerField(model_attr='status')
     not_regional_event = indexes.CharField(model_attr='not_regional_event')
 
+    batch_generic_related = ('descriptors', 'keywords', 'thematics')
+
     def get_model(self):
         return Event
 
 
     def prepare_official_language(self, obj):
-        return [ source_language.acronym for source_language in SourceLanguage.objects.filter(event=obj.id) ]
+        return [ source_language.acronym for source_language in obj.official_language.all() ]
 
     def prepare_official_language_display(self, obj):
-        return [ "|".join( source_language.get_translations() ) for source_language in SourceLanguage.objects.filter(event=obj.id) ]
+        return [ "|".join( source_language.get_translations() ) for source_language in obj.official_language.all() ]
 
     def prepare_event_type(self, obj):
-        return [ "|".join( event_type.get_translations() ) for event_type in EventType.objects.filter(event=obj.id) ]
+        return [ "|".join( event_type.get_translations() ) for event_type in obj.event_type.all() ]
 
     def prepare_thematic_area(self, obj):
-        return [ rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return [ rt.thematic_area.acronym for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_thematic_area_display(self, obj):
-        return [ "|".join( rt.thematic_area.get_translations() ) for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return [ "|".join( rt.thematic_area.get_translations() ) for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_descriptor(self, obj):
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.status == 1]
 
     def prepare_keyword(self, obj):
-        return [keyword.text for keyword in Keyword.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [keyword.text for keyword in self.get_batch_related('keywords', obj) if keyword.status == 1]
 
     def prepare_contact_info(self, obj):
         if obj.contact_info:
@@ -70,4 +70,5 @@ class EventIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()) \
+                                       .prefetch_related('official_language', 'event_type')
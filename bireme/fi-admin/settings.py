@@ -186,6 +186,7 @@ INSTALLED_APPS = (
     'institution',
     'oer',
     'reports',
+    'report_stats',
     'utils',
     'attachments',
     'help',
@@ -228,16 +229,32 @@ LOGGING = {
 
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.solr_backend.SolrEngine',
+        'ENGINE': 'utils.indexing.BatchSolrEngine',
         'URL': 'http://localhost:8080/solr/fi'
     },
 }
 
-# Haystack signal for automatic update of Solr index when the model is saved/updated
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+# Haystack signal for automatic update of Solr index when the model is saved/updated.
+# Changes are queued and sent to Solr by the command: manage.py process_index_queue --loop
+HAYSTACK_SIGNAL_PROCESSOR = 'utils.indexing.QueuedSignalProcessor'
+
+# Read reports from summary tables of report_stats app. The tables are kept updated on save of records
+# but start empty: build them with manage.py rebuild_report_stats before enabling
+REPORT_STATS_ENABLED = False
+
+# changes feed of API (/api/<resource>/changes/) return only changes older than CHANGE_FEED_COMMIT_LAG seconds,
+# so changes of transactions still open when the feed is read are not skipped
+CHANGE_FEED_COMMIT_LAG = 60
 
 SEARCH_SERVICE_URL = 'http://srv.bvsalud.org/'
 
+# search service client (api.search_service): timeout of requests and cache of results. Results are fresh
+# for SEARCH_CACHE_TTL seconds and returned while updated in background for more SEARCH_CACHE_STALE_TTL seconds
+SEARCH_SERVICE_TIMEOUT = 10
+SEARCH_CACHE_TTL = 60
+SEARCH_CACHE_STALE_TTL = 300
+SEARCH_CACHE_MAX_ENTRIES = 1000
+
 DECS_LOOKUP_SERVICE = 'http://search.bvsalud.org/portal/decs-locator/?mode=dataentry'
 
 RECAPTCHA_PRIVATE_KEY = ''
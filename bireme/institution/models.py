@@ -4,6 +4,7 @@ from django.db import models
 
 from main.choices import LANGUAGES_CHOICES
 from utils.models import Generic, Country
+from utils.translation_cache import cached_translations, cached_translation
 from log.models import AuditLog
 
 STATUS_CHOICES = (
@@ -25,18 +26,18 @@ class Type(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = TypeLocal.objects.filter(type=self.id)
+        translation = cached_translations(TypeLocal, 'type', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = TypeLocal.objects.filter(type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(TypeLocal, 'type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
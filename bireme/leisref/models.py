@@ -3,6 +3,7 @@ from django.utils.translation import ugettext_lazy as _, get_language
 from django.db import models
 
 from utils.models import Generic
+from utils.translation_cache import cached_translations, cached_translation
 from main.choices import LANGUAGES_CHOICES
 from main.models import SourceLanguage
 from log.models import AuditLog
@@ -29,18 +30,18 @@ class ActCountryRegion(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActCountryRegionLocal.objects.filter(act_region=self.id)
+        translation = cached_translations(ActCountryRegionLocal, 'act_region', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActCountryRegionLocal.objects.filter(act_region=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActCountryRegionLocal, 'act_region', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -69,18 +70,18 @@ class ActType(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActTypeLocal.objects.filter(act_type=self.id)
+        translation = cached_translations(ActTypeLocal, 'act_type', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActTypeLocal.objects.filter(act_type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActTypeLocal, 'act_type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -109,18 +110,18 @@ class ActScope(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActScopeLocal.objects.filter(act_scope=self.id)
+        translation = cached_translations(ActScopeLocal, 'act_scope', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActScopeLocal.objects.filter(act_scope=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActScopeLocal, 'act_scope', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -149,18 +150,18 @@ class ActOrganIssuer(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActOrganIssuerLocal.objects.filter(organ_issuer=self.id)
+        translation = cached_translations(ActOrganIssuerLocal, 'organ_issuer', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActOrganIssuerLocal.objects.filter(organ_issuer=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActOrganIssuerLocal, 'organ_issuer', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -189,18 +190,18 @@ class ActSource(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActSourceLocal.objects.filter(act_source=self.id)
+        translation = cached_translations(ActSourceLocal, 'act_source', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActSourceLocal.objects.filter(act_source=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActSourceLocal, 'act_source', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -232,9 +233,9 @@ class ActRelationType(Generic):
     def get_label_translations(self, field):
         translation_list = ["%s~%s" % (self.language, getattr(self, field))]
 
-        translation = ActRelationTypeLocal.objects.filter(relation_type=self.id)
+        translation = cached_translations(ActRelationTypeLocal, 'relation_type', self.id, label_field=field)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, getattr(trans, field)) for trans in translation]
+            other_languages = ["%s~%s" % (language, label) for language, label in translation]
             translation_list.extend(other_languages)
 
         return translation_list
@@ -247,9 +248,9 @@ class ActRelationType(Generic):
 
     def get_label(self, field):
         lang_code = get_language()
-        translation = ActRelationTypeLocal.objects.filter(relation_type=self.id, language=lang_code)
-        if translation:
-            return getattr(translation[0], field)
+        translation = cached_translation(ActRelationTypeLocal, 'relation_type', self.id, lang_code, label_field=field)
+        if translation is not None:
+            return translation
         else:
             return getattr(self, field)
 
@@ -287,18 +288,18 @@ class ActState(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActStateLocal.objects.filter(act_state=self.id)
+        translation = cached_translations(ActStateLocal, 'act_state', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActStateLocal.objects.filter(act_state=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActStateLocal, 'act_state', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -326,18 +327,18 @@ class ActCity(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActCityLocal.objects.filter(act_city=self.id)
+        translation = cached_translations(ActCityLocal, 'act_city', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActCityLocal.objects.filter(act_city=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActCityLocal, 'act_city', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -366,18 +367,18 @@ class ActCollection(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ActCollectionLocal.objects.filter(act_collection=self.id)
+        translation = cached_translations(ActCollectionLocal, 'act_collection', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ActCollectionLocal.objects.filter(act_collection=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ActCollectionLocal, 'act_collection', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -405,9 +406,9 @@ class Database(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = DatabaseLocal.objects.filter(database=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(DatabaseLocal, 'database', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -1,14 +1,13 @@
 import datetime
 from haystack import indexes
-from main.models import Descriptor, ResourceThematic
 from models import *
-from attachments.models import Attachment
 from django.conf import settings
 
-from django.contrib.contenttypes.models import ContentType
+from utils.indexing import BatchPrepareMixin
+from utils.prefetch import bulk_related
 
 
-class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
+class LeisRefIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     status = indexes.IntegerField(model_attr='status')
@@ -38,9 +37,23 @@ class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
     descriptor = indexes.MultiValueField()
     updated_date = indexes.CharField()
 
+    batch_generic_related = ('descriptors', 'thematics', 'attachments')
+
     def get_model(self):
         return Act
 
+    def load_batch(self, objects):
+        data = super(LeisRefIndex, self).load_batch(objects)
+        act_ids = [obj.pk for obj in objects]
+
+        data['relationship_active'] = bulk_related(ActRelationship, 'act_related', act_ids,
+                                                   select_related=('relation_type', 'act_referred__act_type'))
+        data['relationship_passive'] = bulk_related(ActRelationship, 'act_referred', act_ids,
+                                                    select_related=('relation_type', 'act_related'))
+        data['urls'] = bulk_related(ActURL, 'act', act_ids)
+
+        return data
+
     def prepare_scope_region(self, obj):
         if obj.scope_region:
             translations = obj.scope_region.get_translations()
@@ -95,7 +108,7 @@ class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
 
     def prepare_relationship_active(self, obj):
         active_relationships = []
-        act_list = ActRelationship.objects.filter(act_related=obj.pk)
+        act_list = self.get_batch_related('relationship_active', obj)
         for act in act_list:
             label_present = "|".join(act.relation_type.get_label_present_translations())
             ref_type = "|".join(act.act_referred.act_type.get_translations())
@@ -110,7 +123,7 @@ class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
 
     def prepare_relationship_passive(self, obj):
         passive_relationships = []
-        act_list = ActRelationship.objects.filter(act_referred=obj.pk)
+        act_list = self.get_batch_related('relationship_passive', obj)
         for act in act_list:
             label_past = "|".join(act.relation_type.get_label_past_translations())
             act_type = "|".join(obj.act_type.get_translations())
@@ -122,21 +135,19 @@ class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
         return passive_relationships
 
     def prepare_thematic_area(self, obj):
-        return [rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return [rt.thematic_area.acronym for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_thematic_area_display(self, obj):
-        return ["|".join(rt.thematic_area.get_translations()) for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return ["|".join(rt.thematic_area.get_translations()) for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_descriptor(self, obj):
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.status == 1]
 
     def prepare_fulltext(self, obj):
-        c_type = ContentType.objects.get_for_model(obj)
-
         view_attachement_url = "{0}document/view/".format(settings.SITE_URL)
 
-        url_list = ["{0}|{1}".format(u.language, u.url) for u in ActURL.objects.filter(act=obj)]
-        att_list = ["{0}|{1}".format(a.language, "{0}{1}".format(view_attachement_url, a.short_url)) for a in Attachment.objects.filter(object_id=obj.id, content_type=c_type)]
+        url_list = ["{0}|{1}".format(u.language, u.url) for u in self.get_batch_related('urls', obj)]
+        att_list = ["{0}|{1}".format(a.language, "{0}{1}".format(view_attachement_url, a.short_url)) for a in self.get_batch_related('attachments', obj)]
 
         url_list.extend(att_list)
 
@@ -152,4 +163,7 @@ class LeisRefIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()) \
+                                       .select_related('scope_region', 'act_type', 'scope', 'scope_state', 'scope_city',
+                                                       'source_name', 'organ_issuer', 'language') \
+                                       .prefetch_related('act_collection', 'indexed_database')
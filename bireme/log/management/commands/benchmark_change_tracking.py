@@ -0,0 +1,53 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+from django.forms.models import model_to_dict
+
+from biblioref.models import Reference
+
+import time
+
+
+def legacy_snapshot(instance):
+    # snapshot previously taken at __init__ of Generic and AuditLog (twice for Reference)
+    return model_to_dict(instance, fields=[field.name for field in instance._meta.fields])
+
+
+class Command(BaseCommand):
+    help = 'Measure per-row cost of loading references with change tracking, compared with the ' \
+           'previous model_to_dict snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--rows', type=int, default=10000, help='Number of references to load')
+        parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of executions')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        # database rows are read once, instances are created from them to measure only instantiation
+        fields = [field.attname for field in Reference._meta.concrete_fields]
+        values = list(Reference.objects.order_by('pk').values_list(*fields)[:rows])
+        if not values:
+            self.stdout.write('No references found')
+            return
+
+        timings = []
+        for count in range(repeat):
+            start = time.time()
+            instances = [Reference.from_db('default', fields, row) for row in values]
+            timings.append(time.time() - start)
+        current = min(timings)
+
+        timings = []
+        for count in range(repeat):
+            start = time.time()
+            for instance in instances:
+                legacy_snapshot(instance)
+                legacy_snapshot(instance)
+            timings.append(time.time() - start)
+        legacy = current + min(timings)
+
+        total = len(values)
+        self.stdout.write('%d references' % total)
+        self.stdout.write('current tracker: %.1f us/row' % (current / total * 1000000))
+        self.stdout.write('model_to_dict snapshot (before): %.1f us/row' % (legacy / total * 1000000))
@@ -0,0 +1,94 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db.models import signals
+from django.test import RequestFactory
+
+from main.models import ThematicArea
+from log import middleware as whodid
+
+import threading
+import time
+
+
+# static receivers connected by log.middleware
+STATIC_RECEIVERS = (
+    (signals.pre_save, 'mark_whodid', 'whodid_pre_save'),
+    (signals.m2m_changed, 'tracking_m2m', 'whodid_m2m_changed'),
+    (signals.pre_delete, 'mark_whodel', 'whodid_pre_delete'),
+    (signals.post_save, 'mark_whoadd', 'whodid_post_save'),
+)
+
+
+def connect_per_request(middleware, request):
+    # previous behavior: receivers connected and disconnected by each write request
+    dispatch_uid = (middleware.__class__, request)
+    signals.pre_save.connect(middleware.mark_whodid, dispatch_uid=dispatch_uid, weak=False)
+    signals.m2m_changed.connect(middleware.tracking_m2m, dispatch_uid=dispatch_uid, weak=False)
+    signals.pre_delete.connect(middleware.mark_whodel, dispatch_uid=dispatch_uid, weak=False)
+    signals.post_save.connect(middleware.mark_whoadd, dispatch_uid=dispatch_uid, weak=False)
+
+
+def disconnect_per_request(middleware, request):
+    dispatch_uid = (middleware.__class__, request)
+    for signal in (signals.pre_save, signals.m2m_changed, signals.pre_delete, signals.post_save):
+        signal.disconnect(dispatch_uid=dispatch_uid)
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput of WhodidMiddleware for concurrent write requests (no database access), ' \
+           'comparing static receivers with receivers connected per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-t', '--threads', type=int, default=8, help='Number of concurrent threads')
+        parser.add_argument('-n', '--requests', type=int, default=2000, help='Number of requests by thread')
+        parser.add_argument('-s', '--saves', type=int, default=5, help='Number of pre_save signals by request')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.user = User(username='benchmark')
+
+        self.benchmark('static')
+
+        # measure previous behavior without the static receivers
+        for signal, method, dispatch_uid in STATIC_RECEIVERS:
+            signal.disconnect(dispatch_uid=dispatch_uid)
+        try:
+            self.benchmark('connect per request')
+        finally:
+            for signal, method, dispatch_uid in STATIC_RECEIVERS:
+                signal.connect(getattr(whodid._whodid, method), dispatch_uid=dispatch_uid, weak=False)
+
+    def benchmark(self, mode):
+        middleware = whodid.WhodidMiddleware()
+        factory = RequestFactory()
+        requests = self.options['requests']
+        saves = self.options['saves']
+
+        def worker():
+            for count in range(requests):
+                request = factory.post('/')
+                request.user = self.user
+                middleware.process_request(request)
+                if mode != 'static':
+                    connect_per_request(middleware, request)
+
+                for save in range(saves):
+                    instance = ThematicArea(name='benchmark')
+                    signals.pre_save.send(sender=ThematicArea, instance=instance, raw=False, using='default',
+                                          update_fields=None)
+
+                if mode != 'static':
+                    disconnect_per_request(middleware, request)
+                middleware.process_response(request, None)
+
+        threads = [threading.Thread(target=worker) for count in range(self.options['threads'])]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        total = requests * len(threads)
+        self.stdout.write('%s: %d requests in %.2f s (%.0f requests/s)' % (mode, total, elapsed, total / elapsed))
@@ -1,44 +1,148 @@
 """Add user created_by and modified_by foreign key refs to any model automatically.
    Almost entirely taken from https://github.com/Atomidata/django-audit-log/blob/master/audit_log/middleware.py"""
+from django.db import transaction
 from django.db.models import signals
 from django.utils.functional import curry
 from django.utils import timezone
+from django.utils.encoding import smart_text
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
 from log.models import AuditLog
+from utils.profile import get_user_cc
+
+from functools import wraps
 
 import threading
 import json
 
-# create a thread local variable to save user
+# create thread local variables to save user and request (set only while a write request is processed)
 _user = threading.local()
+_request = threading.local()
 _m2mfield = threading.local()
+_audit = threading.local()
+
+
+def get_current_request():
+    return getattr(_request, 'value', None)
+
+
+def set_current_request(request):
+    if hasattr(request, 'user') and request.user.is_authenticated():
+        _user.value = request.user
+    else:
+        _user.value = None
+    _request.value = request
+    _audit.buffer = AuditBuffer()
+
+
+def clear_current_request():
+    _user.value = None
+    _request.value = None
+    _audit.buffer = None
+
+
+def get_audit_buffer():
+    return getattr(_audit, 'buffer', None)
+
+
+def flush_audit_log():
+    '''
+    Save the buffered log entries of the current request. Called by units of work (see
+    utils.indexing.index_on_commit) before the transaction is committed, so entries are saved
+    only with the changes they describe
+    '''
+    audit_buffer = get_audit_buffer()
+    if audit_buffer:
+        audit_buffer.flush()
+
+
+def discard_audit_log():
+    '''
+    Discard the buffered log entries of changes made inside the transaction (rolled back)
+    '''
+    audit_buffer = get_audit_buffer()
+    if audit_buffer:
+        audit_buffer.discard()
+
+
+def atomic_depth():
+    # number of atomic blocks (transaction and savepoints) active at the default connection
+    connection = transaction.get_connection()
+    return len(connection.savepoint_ids) + connection.in_atomic_block
+
+
+class AuditBuffer(object):
+    '''
+    Log entries of a write request, saved with one query. Entries of changes made inside a transaction
+    are saved at the end of the transaction by the unit of work or when the response is returned, and
+    discarded if the transaction is rolled back. Entries of changes made outside of a transaction
+    (autocommit) are always saved, even if the request fails later.
+    '''
+    def __init__(self):
+        self.entries = []
+        self.transaction_entries = []
+        self.base_depth = atomic_depth()
+
+    def add(self, user_id, content_type_id, object_id, object_repr, change_message, action_flag):
+        entry = LogEntry(action_time=timezone.now(), user_id=user_id, content_type_id=content_type_id,
+                         object_id=smart_text(object_id), object_repr=object_repr[:200],
+                         change_message=change_message, action_flag=action_flag)
+
+        if atomic_depth() > self.base_depth:
+            self.transaction_entries.append(entry)
+        else:
+            self.entries.append(entry)
+
+    def flush(self):
+        entries = self.entries + self.transaction_entries
+        if entries:
+            LogEntry.objects.bulk_create(entries)
+            self.entries = []
+            self.transaction_entries = []
+
+    def discard(self):
+        self.transaction_entries = []
+
+
+def during_write_request(receiver):
+    '''
+    Run signal receiver only if the current thread is processing a write request
+    '''
+    @wraps(receiver)
+    def wrapper(self, *args, **kwargs):
+        if get_current_request() is not None:
+            return receiver(self, *args, **kwargs)
+    return wrapper
 
 
 # FIX https://djangosnippets.org/snippets/2179/
 # http://stackoverflow.com/questions/862522/django-populate-user-id-when-saving-a-model/862870
 class WhodidMiddleware(object):
+    '''
+    Set the user and request of write requests for the signal receivers connected (once) at module load
+    '''
 
     def process_request(self, request):
-        if not request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
-            if hasattr(request, 'user') and request.user.is_authenticated():
-                _user.value = request.user
-            else:
-                _user.value = None
+        # clear state left by a request where process_response was not called
+        clear_current_request()
 
-            signals.pre_save.connect(self.mark_whodid,  dispatch_uid=(self.__class__, request,), weak=False)
-            signals.m2m_changed.connect(self.tracking_m2m, dispatch_uid=(self.__class__, request,), weak=False)
-            signals.pre_delete.connect(self.mark_whodel,  dispatch_uid=(self.__class__, request,), weak=False)
-            signals.post_save.connect(self.mark_whoadd,  dispatch_uid=(self.__class__, request,), weak=False)
+        if not request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            set_current_request(request)
 
     def process_response(self, request, response):
-        signals.pre_save.disconnect(dispatch_uid=(self.__class__, request,))
-        signals.pre_delete.disconnect(dispatch_uid=(self.__class__, request,))
-        signals.m2m_changed.disconnect(dispatch_uid=(self.__class__, request,))
-        signals.post_save.disconnect(dispatch_uid=(self.__class__, request,))
+        flush_audit_log()
+
+        clear_current_request()
         return response
 
+    def process_exception(self, request, exception):
+        # changes made inside transactions of the failed request were rolled back, changes made
+        # outside of a transaction were committed and are logged
+        discard_audit_log()
+        flush_audit_log()
+
+    @during_write_request
     def mark_whodel(self, sender, instance, **kwargs):
         user = self.get_current_user()
         # mark instance as deleted and call mark_whodid function
@@ -46,6 +150,7 @@ class WhodidMiddleware(object):
         self.mark_whodid(sender, instance, **kwargs)
 
     # necessary for track ManyToManyField changes
+    @during_write_request
     def tracking_m2m(self, sender, instance, action, reverse, model, pk_set, **kwargs):
 
         field_name = sender._meta.model_name.split('_', 1)[1]
@@ -73,13 +178,10 @@ class WhodidMiddleware(object):
                                 'new_value': new_values}]
                 field_change_json = json.dumps(field_change, encoding="utf-8", ensure_ascii=False)
 
-                LogEntry.objects.log_action(user_id=user.id,
-                                            content_type_id=log_object_ct_id,
-                                            object_id=log_object_id,
-                                            object_repr=log_repr,
-                                            change_message=field_change_json,
-                                            action_flag=CHANGE)
+                get_audit_buffer().add(user.id, log_object_ct_id, log_object_id, log_repr,
+                                       field_change_json, CHANGE)
 
+    @during_write_request
     def mark_whodid(self, sender, instance, **kwargs):
         user = self.get_current_user()
         if 'created_by' in instance._meta.get_all_field_names() and not instance.created_by:
@@ -92,66 +194,55 @@ class WhodidMiddleware(object):
 
         # automatically add user cooperative center if present at field names and is not set
         if 'cooperative_center_code' in instance._meta.get_all_field_names() and not instance.cooperative_center_code:
-            instance.cooperative_center_code = user.profile.get_attribute('cc')
+            instance.cooperative_center_code = get_user_cc(user)
 
-        # trace and log changes
-        if isinstance(instance, AuditLog):
-            new_object = True if not instance.pk else False
-            has_changes = getattr(instance, 'changed_fields', False)
+        # trace and log changes (new objects are logged after save, when the pk is known)
+        if isinstance(instance, AuditLog) and instance.pk:
             was_deleted = getattr(instance, 'was_deleted', False)
-            inline_model = getattr(instance, 'content_object', False)
-            related_model = getattr(instance, 'get_parent', False)
-
-            # log if new, changed or deleted
-            if new_object or has_changes or was_deleted:
-                fields_change = self.get_changes_in_json(instance, new_object, was_deleted)
-
-                if inline_model:
-                    log_object_ct_id = instance.content_type.pk
-                    log_object_id = instance.content_object.pk
-                    log_repr = str(instance.content_object)
-                elif related_model:
-                    log_object_ct_id = ContentType.objects.get_for_model(instance.get_parent()).pk
-                    log_object_id = instance.get_parent().pk
-                    log_repr = str(instance.get_parent())
-                else:
-                    log_object_ct_id = ContentType.objects.get_for_model(instance).pk
-                    log_object_id = instance.pk
-                    log_repr = str(instance)
-
-                # set default change type to CHANGE
-                log_change_type = CHANGE
-                # check if is not a inline model
-                if not inline_model:
-                    if new_object:
-                        log_change_type = ADDITION
-                    elif was_deleted:
-                        log_change_type = DELETION
-
-                # only create log entry for not empty change message
-                if fields_change:
-                    LogEntry.objects.log_action(user_id=user.id,
-                                                content_type_id=log_object_ct_id,
-                                                object_id=log_object_id,
-                                                object_repr=log_repr,
-                                                change_message=fields_change,
-                                                action_flag=log_change_type)
+            if was_deleted or instance.has_changed:
+                self.log_changes(instance, False, was_deleted)
 
+    @during_write_request
     def mark_whoadd(self, sender, instance, created, **kwargs):
         '''
-        Update log record after save instance to add missing object_id
+        Log creation of instance
         '''
-        user = self.get_current_user()
         if isinstance(instance, AuditLog) and created:
-            # filter by log without object_id from the current user and action_flag = ADDITION
-            log = LogEntry.objects.filter(object_id='None', object_repr=str(instance), action_flag=1,
-                                          user_id=user.id)
-            if log:
-                # get last log
-                log = log[0]
-                # update log with instance pk
-                log.object_id = instance.id
-                log.save()
+            self.log_changes(instance, True, False)
+
+    def log_changes(self, instance, new_object, was_deleted):
+        user = self.get_current_user()
+        inline_model = getattr(instance, 'content_object', False)
+        related_model = getattr(instance, 'get_parent', False)
+
+        fields_change = self.get_changes_in_json(instance, new_object, was_deleted)
+        # only create log entry for not empty change message
+        if not fields_change:
+            return
+
+        if inline_model:
+            log_object_ct_id = instance.content_type.pk
+            log_object_id = instance.content_object.pk
+            log_repr = str(instance.content_object)
+        elif related_model:
+            log_object_ct_id = ContentType.objects.get_for_model(instance.get_parent()).pk
+            log_object_id = instance.get_parent().pk
+            log_repr = str(instance.get_parent())
+        else:
+            log_object_ct_id = ContentType.objects.get_for_model(instance).pk
+            log_object_id = instance.pk
+            log_repr = str(instance)
+
+        # set default change type to CHANGE
+        log_change_type = CHANGE
+        # check if is not a inline model
+        if not inline_model:
+            if new_object:
+                log_change_type = ADDITION
+            elif was_deleted:
+                log_change_type = DELETION
+
+        get_audit_buffer().add(user.id, log_object_ct_id, log_object_id, log_repr, fields_change, log_change_type)
 
     def get_changes_in_json(self, instance, new_object, was_deleted):
         field_change = []
@@ -168,31 +259,20 @@ class WhodidMiddleware(object):
             field_change.append({'label': 'deleted', 'field_name': obj_name,
                                  'previous_value': unicode(instance), 'new_value': ''})
         else:
-            # get previous attributes values of object
-            obj = obj_model.objects.get(pk=instance.id)
-
-            for field_name in instance.changed_fields:
-                field_type = obj_model._meta.get_field(field_name).get_internal_type()
-
-                if instance.id:
-                    if field_type == 'ForeignKey':
-                        previous_value = unicode(getattr(obj, field_name))
-                    elif field_type == 'FileField':
-                        # filename
-                        previous_value = obj.__dict__.get(field_name).name
-                    else:
-                        previous_value = obj.__dict__.get(field_name)
-                else:
-                    previous_value = ''
-
+            # previous attributes values are taken from the snapshot of instance (see utils.models.ChangeTracker)
+            for field_name, (previous_value, new_value) in instance.diff.items():
+                field = obj_model._meta.get_field(field_name)
+                field_type = field.get_internal_type()
 
                 if field_type == 'ForeignKey':
+                    previous_obj = field.rel.to._default_manager.filter(pk=previous_value).first() \
+                                   if previous_value is not None else None
+                    previous_value = unicode(previous_obj)
                     new_value = unicode(getattr(instance, field_name))
                 elif field_type == 'FileField':
                     # filename
-                    new_value = obj.__dict__.get(field_name).name
-                else:
-                    new_value = instance.__dict__.get(field_name)
+                    previous_value = getattr(previous_value, 'name', previous_value)
+                    new_value = getattr(new_value, 'name', new_value)
 
                 # convert JSON to compare properly
                 if isinstance(previous_value, basestring) and previous_value[0:2] == '[{':
@@ -221,3 +301,11 @@ class WhodidMiddleware(object):
             return _user.value
         else:
             return None
+
+
+# static receivers (connect/disconnect at each request lock the signal registry and clear its caches)
+_whodid = WhodidMiddleware()
+signals.pre_save.connect(_whodid.mark_whodid, dispatch_uid='whodid_pre_save', weak=False)
+signals.m2m_changed.connect(_whodid.tracking_m2m, dispatch_uid='whodid_m2m_changed', weak=False)
+signals.pre_delete.connect(_whodid.mark_whodel, dispatch_uid='whodid_pre_delete', weak=False)
+signals.post_save.connect(_whodid.mark_whoadd, dispatch_uid='whodid_post_save', weak=False)
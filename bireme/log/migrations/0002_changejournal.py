@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('log', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeJournal',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(max_length=1, verbose_name='Action', choices=[('I', 'insert'), ('U', 'update'), ('D', 'delete')])),
+                ('created_time', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'change journal',
+                'verbose_name_plural': 'change journal',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='changejournal',
+            index_together=set([('content_type', 'id')]),
+        ),
+    ]
@@ -1,58 +1,143 @@
+from django.apps import apps
 from django.db import models
-from utils.models import Generic
+from django.db.models.signals import post_save, post_delete
+from utils.models import Generic, ChangeTracker
 from django.contrib.admin.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import ugettext_lazy as _
-from django.forms.models import model_to_dict
 
 REVISION_CHOICES = (
     (-1, _('Not approved')),
     (1, _('Approved')),
 )
 
-class AuditLog(object):
+class AuditLog(ChangeTracker):
     '''
     Class used to mark wich models audit log of changes will be recorded
     '''
-    def __init__(self, *args, **kwargs):
-        super(AuditLog, self).__init__(*args, **kwargs)
-        self.__initial = self._dict
 
-    @property
-    def diff(self):
-        d1 = self.__initial
-        d2 = self._dict
-        diffs = [(k, (v, d2[k])) for k, v in d1.items() if v != d2[k]]
-        return dict(diffs)
 
-    @property
-    def has_changed(self):
-        return bool(self.diff)
+class LogReview(Generic):
 
-    @property
-    def changed_fields(self):
-        return self.diff.keys()
+    class Meta:
+        verbose_name = "Log Review"
+        verbose_name_plural = "Log Reviews"
 
-    def get_field_diff(self, field_name):
-        """
-        Returns a diff for field if it's changed and None otherwise.
-        """
-        return self.diff.get(field_name, None)
+    log = models.ForeignKey(LogEntry)
+    status = models.SmallIntegerField(_('Status'), choices=REVISION_CHOICES, null=True)
 
-    @property
-    def _dict(self):
-        return model_to_dict(self, fields=[field.name for field in
-                             self._meta.fields])
 
-    def save(self, *args, **kwargs):
-        super(AuditLog, self).save(*args, **kwargs)
-        self.__initial = self._dict
+# models with changes recorded at change journal. Changes of subclasses are recorded as the base model
+JOURNAL_MODELS = ('biblioref.Reference', 'title.Title')
+# inline models whose changes are recorded as update of the record: field with the record or 'generic'
+# for generic relations. Same related rows of the API renderings of references (see
+# biblioref.models.rendered_reference_ids) and inlines of title form. Other models are not journaled.
+JOURNAL_INLINE_MODELS = {
+    'biblioref.ReferenceComplement': 'source',
+    'biblioref.ReferenceLocal': 'source',
+    'biblioref.ReferenceAlternateID': 'reference',
+    'main.Descriptor': 'generic',
+    'main.ResourceThematic': 'generic',
+    'main.Keyword': 'generic',
+    'attachments.Attachment': 'generic',
+    'title.OnlineResources': 'title',
+    'title.TitleVariance': 'title',
+    'title.BVSSpecialty': 'title',
+    'title.IndexRange': 'title',
+    'title.Audit': 'title',
+}
 
 
-class LogReview(Generic):
+class ChangeJournal(models.Model):
+    """
+    Append-only journal of inserted, updated and deleted records. The id is the sequence number
+    used by clients of the change feed (api changes endpoint) to fetch the changes after it.
+    """
 
     class Meta:
-        verbose_name = "Log Review"
-        verbose_name_plural = "Log Reviews"
+        verbose_name = _("change journal")
+        verbose_name_plural = _("change journal")
+        index_together = [['content_type', 'id']]
 
-    log = models.ForeignKey(LogEntry)
-    status = models.SmallIntegerField(_('Status'), choices=REVISION_CHOICES, null=True)
+    INSERT = 'I'
+    UPDATE = 'U'
+    DELETE = 'D'
+    ACTION_CHOICES = (
+        (INSERT, 'insert'),
+        (UPDATE, 'update'),
+        (DELETE, 'delete'),
+    )
+
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(_("Action"), max_length=1, choices=ACTION_CHOICES)
+    created_time = models.DateTimeField(_("created at"), auto_now_add=True, editable=False)
+
+    def __unicode__(self):
+        return u"%s %s.%s (%s)" % (self.id, self.content_type_id, self.object_id, self.action)
+
+
+# journal target of each model: (journaled model, attribute with object id), 'generic' or None
+_journal_targets = {}
+
+
+def journal_model(model):
+    for label in JOURNAL_MODELS:
+        journaled = apps.get_model(label)
+        if model and issubclass(model, journaled):
+            return journaled
+
+    return None
+
+
+def journal_target(sender):
+    if sender not in _journal_targets:
+        target = None
+        journaled = journal_model(sender)
+        inline_field = JOURNAL_INLINE_MODELS.get('%s.%s' % (sender._meta.app_label, sender._meta.object_name))
+        if journaled:
+            target = (journaled, 'pk')
+        elif inline_field == 'generic':
+            target = 'generic'
+        elif inline_field:
+            field = sender._meta.get_field(inline_field)
+            target = (journal_model(field.rel.to), field.attname)
+
+        _journal_targets[sender] = target
+
+    return _journal_targets[sender]
+
+
+def record_change(sender, instance, action):
+    target = journal_target(sender)
+    if not target:
+        return
+
+    if target == 'generic':
+        if not instance.content_type_id or not instance.object_id:
+            return
+        journaled = journal_model(ContentType.objects.get_for_id(instance.content_type_id).model_class())
+        object_id = instance.object_id
+        # changes of related rows are updates of the record
+        action = ChangeJournal.UPDATE
+    else:
+        journaled, attname = target
+        object_id = getattr(instance, attname)
+        if attname != 'pk':
+            action = ChangeJournal.UPDATE
+
+    if journaled and object_id:
+        ChangeJournal.objects.create(content_type=ContentType.objects.get_for_model(journaled),
+                                     object_id=object_id, action=action)
+
+
+def journal_saved(sender, instance, created, **kwargs):
+    record_change(sender, instance, ChangeJournal.INSERT if created else ChangeJournal.UPDATE)
+
+
+def journal_deleted(sender, instance, **kwargs):
+    record_change(sender, instance, ChangeJournal.DELETE)
+
+
+post_save.connect(journal_saved, dispatch_uid='log_change_journal_saved')
+post_delete.connect(journal_deleted, dispatch_uid='log_change_journal_deleted')
@@ -0,0 +1,153 @@
+# coding: utf-8
+from django.contrib.auth.models import User
+from django.contrib.admin.models import LogEntry, ADDITION, CHANGE
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import signals
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from main.models import Resource, Descriptor, ThematicArea
+from biblioref.models import ReferenceSource, ReferenceComplement, ReferenceDuplicate
+from title.models import Title, IndexRange, IndexCode
+from log.models import ChangeJournal
+from log.middleware import WhodidMiddleware
+from utils.indexing import index_on_commit
+
+import json
+
+from utils.tests import BaseTestCase
+
+
+class ChangeJournalTest(BaseTestCase):
+    """
+    Tests for change journal of bibliographic and title records
+    """
+    def journal_since(self, since):
+        return [(change.content_type.model, change.object_id, change.action)
+                for change in ChangeJournal.objects.filter(id__gt=since).order_by('id')]
+
+    def last_id(self):
+        return ChangeJournal.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def test_inline_changes(self):
+        """
+        Changes of inline rows are recorded as update of the record
+        """
+        source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                title_serial='Rev. Enfermagem')
+        title = Title.objects.create(id_number='1', record_type='KS', treatment_level='K', status='1',
+                                     title='Rev. Enfermagem', shortened_title='Rev. Enfermagem')
+        since = self.last_id()
+
+        ReferenceComplement.objects.create(source=source, conference_name='Congresso de Enfermagem')
+        Descriptor.objects.create(object_id=source.pk, content_type=ContentType.objects.get_for_model(source),
+                                  code='^d8462')
+        IndexRange.objects.create(title=title, index_code=IndexCode.objects.create(code='LL', name='LILACS'))
+
+        self.assertEqual(self.journal_since(since), [('reference', source.pk, ChangeJournal.UPDATE),
+                                                     ('reference', source.pk, ChangeJournal.UPDATE),
+                                                     ('title', title.pk, ChangeJournal.UPDATE)])
+
+    def test_other_related_models_not_journaled(self):
+        """
+        Models related to records that are not inlines (duplicates, caches, queues) are not journaled
+        """
+        source = ReferenceSource.objects.create(status=1, literature_type='S', treatment_level='',
+                                                title_serial='Rev. Enfermagem')
+        since = self.last_id()
+
+        ReferenceDuplicate.objects.create(reference=source, metadata_json='{}')
+        self.assertEqual(self.journal_since(since), [])
+
+
+class WhodidMiddlewareTest(BaseTestCase):
+    """
+    Tests for static signal receivers of WhodidMiddleware
+    """
+    def test_user_set_only_during_write_request(self):
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+        middleware = WhodidMiddleware()
+        receivers = len(signals.pre_save.receivers)
+
+        request = RequestFactory().post('/')
+        request.user = user
+        middleware.process_request(request)
+        thematic = ThematicArea.objects.create(acronym='LISBR1.1', name='Enfermagem')
+        middleware.process_response(request, None)
+
+        self.assertEqual(thematic.created_by, user)
+        self.assertEqual(len(signals.pre_save.receivers), receivers)
+
+        thematic = ThematicArea.objects.create(acronym='LISBR1.2', name='Medicina')
+        self.assertEqual(thematic.created_by, None)
+
+    def test_log_entries_written_at_response(self):
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+        middleware = WhodidMiddleware()
+        object_ct = ContentType.objects.get_for_model(Resource)
+
+        request = RequestFactory().post('/')
+        request.user = user
+        middleware.process_request(request)
+        resource = Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                           originator='BIREME', cooperative_center_code='BR1.1')
+        resource.title = 'Recurso de teste alterado'
+        resource.save()
+        self.assertEqual(LogEntry.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as context:
+            middleware.process_response(request, None)
+        self.assertEqual(len(context.captured_queries), 1)
+
+        logs = LogEntry.objects.filter(content_type=object_ct, object_id=str(resource.pk)).order_by('id')
+        self.assertEqual([log.action_flag for log in logs], [ADDITION, CHANGE])
+        change = json.loads(logs[1].change_message)
+        self.assertEqual(change, [{'field_name': 'title', 'previous_value': 'Recurso de teste',
+                                   'new_value': 'Recurso de teste alterado'}])
+
+    def test_log_entries_written_in_transaction(self):
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+        middleware = WhodidMiddleware()
+
+        request = RequestFactory().post('/')
+        request.user = user
+        middleware.process_request(request)
+        with index_on_commit():
+            Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                    originator='BIREME', cooperative_center_code='BR1.1')
+            self.assertEqual(LogEntry.objects.count(), 0)
+        self.assertEqual(LogEntry.objects.count(), 1)
+
+        # entries of a rolled back block are not written
+        try:
+            with index_on_commit():
+                Resource.objects.create(status=0, title='Recurso removido', link='http://bvsalud.org',
+                                        originator='BIREME', cooperative_center_code='BR1.1')
+                raise ValueError
+        except ValueError:
+            pass
+        middleware.process_response(request, None)
+        self.assertEqual(LogEntry.objects.count(), 1)
+
+    def test_log_entries_on_exception(self):
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+        middleware = WhodidMiddleware()
+
+        request = RequestFactory().post('/')
+        request.user = user
+        middleware.process_request(request)
+        # change saved outside of a transaction (autocommit) is logged
+        resource = Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                           originator='BIREME', cooperative_center_code='BR1.1')
+        try:
+            with transaction.atomic():
+                Resource.objects.create(status=0, title='Recurso removido', link='http://bvsalud.org',
+                                        originator='BIREME', cooperative_center_code='BR1.1')
+                raise ValueError
+        except ValueError as exception:
+            middleware.process_exception(request, exception)
+        # response middleware also run for the error response
+        middleware.process_response(request, None)
+
+        self.assertEqual(list(LogEntry.objects.values_list('object_id', flat=True)), [str(resource.pk)])
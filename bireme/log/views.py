@@ -5,6 +5,7 @@ from django.shortcuts import render_to_response, redirect
 from django.contrib.admin.models import LogEntry
 from django.views.generic.edit import UpdateView
 from utils.views import LoginRequiredView
+from utils.profile import get_user_cc
 from django.template import RequestContext
 
 from models import LogReview
@@ -32,16 +33,9 @@ def review_log(request, type, ctype_id, obj_id):
         # exclude changes made by the current user
         log_list = log_list.exclude(user=current_user)
     elif type == 'cc':
-        current_user_cc = current_user.profile.get_attribute('cc')
+        current_user_cc = get_user_cc(current_user)
         # exclude from log list users from same cc as current user
-        exclude_user_list = []
-        for log in log_list:
-            log_user_cc = log.user.profile.get_attribute('cc')
-            if log_user_cc == current_user_cc:
-                exclude_user_list.append(log.user)
-
-        if exclude_user_list:
-            log_list = log_list.exclude(user__in=exclude_user_list)
+        log_list = log_list.exclude(user__cooperative_center__cc=current_user_cc)
 
     if log_list:
         reference_type = log_list[0].content_type.model
@@ -10,6 +10,7 @@ from datetime import datetime
 from django.db import models
 
 from utils.models import Generic, Country
+from utils.translation_cache import cached_translations, cached_translation
 from error_reporting.models import ErrorReport
 
 from main import choices
@@ -31,18 +32,18 @@ class SourceType(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = SourceTypeLocal.objects.filter(source_type=self.id)
+        translation = cached_translations(SourceTypeLocal, 'source_type', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = SourceTypeLocal.objects.filter(source_type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(SourceTypeLocal, 'source_type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -71,18 +72,18 @@ class SourceLanguage(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = SourceLanguageLocal.objects.filter(source_language=self.id)
+        translation = cached_translations(SourceLanguageLocal, 'source_language', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = SourceLanguageLocal.objects.filter(source_language=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(SourceLanguageLocal, 'source_language', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -110,18 +111,18 @@ class ThematicArea(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = ThematicAreaLocal.objects.filter(thematic_area=self.id)
+        translation = cached_translations(ThematicAreaLocal, 'thematic_area', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = ThematicAreaLocal.objects.filter(thematic_area=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(ThematicAreaLocal, 'thematic_area', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
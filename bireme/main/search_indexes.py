@@ -1,11 +1,10 @@
 import datetime
 from haystack import indexes
-from main.models import Resource, Descriptor, Keyword, SourceLanguage, SourceType, ResourceThematic
+from main.models import Resource
+from utils.indexing import BatchPrepareMixin
 
-from django.contrib.contenttypes.models import ContentType
 
-
-class ResourceIndex(indexes.SearchIndex, indexes.Indexable):
+class ResourceIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     link = indexes.MultiValueField()
@@ -26,6 +25,8 @@ class ResourceIndex(indexes.SearchIndex, indexes.Indexable):
     created_date = indexes.CharField()
     updated_date = indexes.CharField()
 
+    batch_generic_related = ('descriptors', 'keywords', 'thematics')
+
     def get_model(self):
         return Resource
 
@@ -39,32 +40,29 @@ class ResourceIndex(indexes.SearchIndex, indexes.Indexable):
         return [line.strip() for line in obj.author.split('\n') if line.strip()]
 
     def prepare_source_language(self, obj):
-        return [ source_language.acronym for source_language in SourceLanguage.objects.filter(resource=obj.id) ]
+        return [ source_language.acronym for source_language in obj.source_language.all() ]
 
     def prepare_source_language_display(self, obj):
-        return [ "|".join( source_language.get_translations() ) for source_language in SourceLanguage.objects.filter(resource=obj.id) ]
+        return [ "|".join( source_language.get_translations() ) for source_language in obj.source_language.all() ]
 
     def prepare_source_type(self, obj):
-        return [ source_type.acronym for source_type in SourceType.objects.filter(resource=obj.id) ]
+        return [ source_type.acronym for source_type in obj.source_type.all() ]
 
     def prepare_source_type_display(self, obj):
-        return [ "|".join( source_type.get_translations() ) for source_type in SourceType.objects.filter(resource=obj.id) ]
+        return [ "|".join( source_type.get_translations() ) for source_type in obj.source_type.all() ]
 
     def prepare_thematic_area(self, obj):
-        return [ rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, 
-                    content_type=ContentType.objects.get_for_model(obj), status=1) ]
+        return [ rt.thematic_area.acronym for rt in self.get_batch_related('thematics', obj) if rt.status == 1 ]
 
     def prepare_thematic_area_display(self, obj):
-        return [ "|".join( rt.thematic_area.get_translations() ) for rt in ResourceThematic.objects.filter(object_id=obj.id, 
-                    content_type=ContentType.objects.get_for_model(obj), status=1) ]
+        return [ "|".join( rt.thematic_area.get_translations() ) for rt in self.get_batch_related('thematics', obj)
+                    if rt.status == 1 ]
 
     def prepare_descriptor(self, obj):
-        return [ descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, 
-                    content_type=ContentType.objects.get_for_model(obj), status=1) ]
+        return [ descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.status == 1 ]
 
     def prepare_keyword(self, obj):
-        return [ keyword.text for keyword in Keyword.objects.filter(object_id=obj.id, 
-                    content_type=ContentType.objects.get_for_model(obj), status=1) ]
+        return [ keyword.text for keyword in self.get_batch_related('keywords', obj) if keyword.status == 1 ]
 
     def prepare_created_date(self, obj):
         if obj.created_time:        
@@ -77,4 +75,5 @@ class ResourceIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
\ No newline at end of file
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()) \
+                                       .prefetch_related('source_language', 'source_type')
\ No newline at end of file
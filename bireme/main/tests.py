@@ -1,6 +1,8 @@
 # coding: utf-8
 from django.test.client import Client
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from utils.models import Country
 
@@ -285,3 +287,27 @@ class ResourceTest(BaseTestCase):
        
         self.assertRedirects(response, '/languages')
         self.assertContains(response, "Inglês")
+
+    def test_source_type_translation_cache(self):
+        """
+        Tests translations of auxiliary models are read from cache and refreshed on change
+        """
+        source_type = SourceType.objects.get(acronym='database')
+        SourceTypeLocal.objects.create(source_type=source_type, language='en', name='Database')
+
+        translation.activate('en')
+        self.assertEqual(unicode(source_type), 'Database')
+
+        # translation table already loaded
+        with CaptureQueriesContext(connection) as context:
+            unicode(source_type)
+            source_type.get_translations()
+        self.assertEqual(len(context.captured_queries), 0)
+
+        source_type_local = SourceTypeLocal.objects.get(source_type=source_type)
+        source_type_local.name = 'Data base'
+        source_type_local.save()
+        self.assertEqual(unicode(source_type), 'Data base')
+        self.assertIn('en^Data base', source_type.get_translations())
+
+        translation.deactivate()
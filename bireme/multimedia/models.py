@@ -4,6 +4,7 @@ from django.db import models
 from django.utils import timezone
 
 from utils.models import Generic, Country
+from utils.translation_cache import cached_translations, cached_translation
 from main.choices import LANGUAGES_CHOICES
 
 from django.contrib.contenttypes.generic import GenericRelation
@@ -24,18 +25,18 @@ class MediaType(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.name.strip())]
-        translation = MediaTypeLocal.objects.filter(media_type=self.id)
+        translation = cached_translations(MediaTypeLocal, 'media_type', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = MediaTypeLocal.objects.filter(media_type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(MediaTypeLocal, 'media_type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
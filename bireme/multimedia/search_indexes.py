@@ -1,11 +1,9 @@
 import datetime
 from haystack import indexes
-from main.models import Descriptor, Keyword, SourceLanguage, SourceType, ResourceThematic
-from models import Media, MediaType
+from models import Media
+from utils.indexing import BatchPrepareMixin
 
-from django.contrib.contenttypes.models import ContentType
-
-class MediaIndex(indexes.SearchIndex, indexes.Indexable):
+class MediaIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     title_translated = indexes.CharField(model_attr='title_translated')
@@ -33,6 +31,8 @@ class MediaIndex(indexes.SearchIndex, indexes.Indexable):
     updated_date = indexes.CharField()
     status = indexes.IntegerField(model_attr='status')
 
+    batch_generic_related = ('descriptors', 'keywords', 'thematics')
+
     def get_model(self):
         return Media
 
@@ -45,16 +45,16 @@ class MediaIndex(indexes.SearchIndex, indexes.Indexable):
     '''
 
     def prepare_media_type(self, obj):
-        return [ media_type.acronym for media_type in MediaType.objects.filter(media=obj.id) ]
+        return [ obj.media_type.acronym ]
 
     def prepare_media_type_filter(self, obj):
-        return [ "|".join( media_type.get_translations() ) for media_type in MediaType.objects.filter(media=obj.id) ]
+        return [ "|".join( obj.media_type.get_translations() ) ]
 
     def prepare_language(self, obj):
-        return [ source_language.acronym for source_language in SourceLanguage.objects.filter(media=obj.id) ]
+        return [ source_language.acronym for source_language in obj.language.all() ]
 
     def prepare_language_display(self, obj):
-        return [ "|".join( source_language.get_translations() ) for source_language in SourceLanguage.objects.filter(media=obj.id) ]
+        return [ "|".join( source_language.get_translations() ) for source_language in obj.language.all() ]
 
     def prepare_authors(self, obj):
         return [line.strip() for line in obj.authors.split('\n') if line.strip()]
@@ -63,16 +63,16 @@ class MediaIndex(indexes.SearchIndex, indexes.Indexable):
         return [line.strip() for line in obj.contributors.split('\n') if line.strip()]
 
     def prepare_thematic_area(self, obj):
-        return [ rt.thematic_area.acronym for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return [ rt.thematic_area.acronym for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_thematic_area_display(self, obj):
-        return [ "|".join( rt.thematic_area.get_translations() ) for rt in ResourceThematic.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj)) ]
+        return [ "|".join( rt.thematic_area.get_translations() ) for rt in self.get_batch_related('thematics', obj) ]
 
     def prepare_descriptor(self, obj):
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.status == 1]
 
     def prepare_keyword(self, obj):
-        return [keyword.text for keyword in Keyword.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [keyword.text for keyword in self.get_batch_related('keywords', obj) if keyword.status == 1]
 
     def prepare_created_date(self, obj):
         if obj.created_time:
@@ -84,7 +84,8 @@ class MediaIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()) \
+                                       .select_related('media_type').prefetch_related('language')
 
 '''    
     def prepare_media_type(self, obj):
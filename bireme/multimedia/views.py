@@ -14,6 +14,7 @@ from utils.views import ACTIONS
 from utils.views import LoginRequiredView, SuperUserRequiredView, GenericUpdateWithOneFormset
 from utils.forms import is_valid_for_publication
 from utils.context_processors import additional_user_info
+from utils.profile import users_of_cc
 
 from main.models import ThematicArea
 from help.models import get_help_fields
@@ -73,12 +74,9 @@ class MultimediaListView(LoginRequiredView, ListView):
         user_data = additional_user_info(self.request)
 
         thematic_list = ThematicArea.objects.all().order_by('name')
-        user_list = User.objects.filter(is_superuser=False).order_by('username')
         # mantain in user filter list only users from the same CCS (CC's in the network) as request.user
-        for user in user_list:
-            user_cc = user.profile.get_attribute('cc')
-            if user_cc == user_data['user_cc'] or user_cc in user_data['ccs']:
-                user_filter_list.append(user)
+        user_filter_list = users_of_cc([user_data['user_cc']] + list(user_data['ccs'])) \
+                               .filter(is_superuser=False).order_by('username')
 
         cc_filter_list = user_data['ccs']
         # remove duplications from list
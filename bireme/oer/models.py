@@ -5,6 +5,7 @@ from django.db import models
 from log.models import AuditLog
 from main.models import SourceLanguage
 from utils.models import Generic
+from utils.translation_cache import cached_translations, cached_translation
 from main.choices import LANGUAGES_CHOICES
 from utils.fields import JSONField
 
@@ -29,9 +30,9 @@ class Type(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = TypeLocal.objects.filter(oer_type=self.id)
+        translation = cached_translations(TypeLocal, 'oer_type', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
@@ -39,9 +40,9 @@ class Type(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = TypeLocal.objects.filter(oer_type=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(TypeLocal, 'oer_type', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -68,18 +69,18 @@ class License(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = LicenseLocal.objects.filter(license=self.id)
+        translation = cached_translations(LicenseLocal, 'license', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = LicenseLocal.objects.filter(license=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(LicenseLocal, 'license', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -106,18 +107,18 @@ class CourseType(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = CourseTypeLocal.objects.filter(coursetype=self.id)
+        translation = cached_translations(CourseTypeLocal, 'coursetype', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = CourseTypeLocal.objects.filter(coursetype=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(CourseTypeLocal, 'coursetype', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -145,18 +146,18 @@ class TecResourceType(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = TecResourceTypeLocal.objects.filter(tecresourcetype=self.id)
+        translation = cached_translations(TecResourceTypeLocal, 'tecresourcetype', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = TecResourceTypeLocal.objects.filter(tecresourcetype=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(TecResourceTypeLocal, 'tecresourcetype', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -184,18 +185,18 @@ class Format(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = FormatLocal.objects.filter(format=self.id)
+        translation = cached_translations(FormatLocal, 'format', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = FormatLocal.objects.filter(format=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(FormatLocal, 'format', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -222,9 +223,9 @@ class InteractivityType(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = InteractivityTypeLocal.objects.filter(interatype=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(InteractivityTypeLocal, 'interatype', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -251,9 +252,9 @@ class InteractivityLevel(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = InteractivityLevelLocal.objects.filter(interactivitylevel=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(InteractivityLevelLocal, 'interactivitylevel', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -282,9 +283,9 @@ class Difficulty(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = DifficultyLocal.objects.filter(difficulty=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(DifficultyLocal, 'difficulty', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -311,18 +312,18 @@ class Audience(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = AudienceLocal.objects.filter(audience=self.id)
+        translation = cached_translations(AudienceLocal, 'audience', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = AudienceLocal.objects.filter(audience=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(AudienceLocal, 'audience', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -350,9 +351,9 @@ class LearningResourceType(Generic):
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = LearningResourceTypeLocal.objects.filter(coursetype=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(LearningResourceTypeLocal, 'coursetype', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -380,18 +381,18 @@ class LearningContext(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = LearningContextLocal.objects.filter(learningcontext=self.id)
+        translation = cached_translations(LearningContextLocal, 'learningcontext', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = LearningContextLocal.objects.filter(learningcontext=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(LearningContextLocal, 'learningcontext', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -419,18 +420,18 @@ class Structure(Generic):
 
     def get_translations(self):
         translation_list = ["%s~%s" % (self.language, self.name.strip())]
-        translation = StructureLocal.objects.filter(structure=self.id)
+        translation = cached_translations(StructureLocal, 'structure', self.id)
         if translation:
-            other_languages = ["%s~%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s~%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = StructureLocal.objects.filter(structure=self.id, language=lang_code)
-        if translation:
-            return translation[0].name
+        translation = cached_translation(StructureLocal, 'structure', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -540,9 +541,9 @@ class RelationType(Generic):
 
     def get_label(self, field):
         lang_code = get_language()
-        translation = RelationTypeLocal.objects.filter(relation_type=self.id, language=lang_code)
-        if translation:
-            return getattr(translation[0], field)
+        translation = cached_translation(RelationTypeLocal, 'relation_type', self.id, lang_code, label_field=field)
+        if translation is not None:
+            return translation
         else:
             return getattr(self, field)
 
@@ -1,15 +1,15 @@
 import datetime
 from haystack import indexes
-from main.models import Descriptor, Keyword, SourceLanguage, ResourceThematic
-from attachments.models import Attachment
 from django.conf import settings
 from models import *
 
+from utils.indexing import BatchPrepareMixin
+from utils.prefetch import bulk_related
+
 import json
 
-from django.contrib.contenttypes.models import ContentType
 
-class OERIndex(indexes.SearchIndex, indexes.Indexable):
+class OERIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     learning_objectives = indexes.CharField(model_attr='learning_objectives')
@@ -34,9 +34,17 @@ class OERIndex(indexes.SearchIndex, indexes.Indexable):
     updated_date = indexes.CharField()
     status = indexes.IntegerField(model_attr='status')
 
+    batch_generic_related = ('descriptors', 'attachments')
+
     def get_model(self):
         return OER
 
+    def load_batch(self, objects):
+        data = super(OERIndex, self).load_batch(objects)
+        data['urls'] = bulk_related(OERURL, 'oer', [obj.pk for obj in objects])
+
+        return data
+
     def prepare_author(self, obj):
         if obj.creator:
             return self.get_field_values(obj.creator)
@@ -98,9 +106,9 @@ class OERIndex(indexes.SearchIndex, indexes.Indexable):
         return fixed_code
 
     def prepare_descriptor(self, obj):
-        descriptor_list = Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)
+        descriptor_list = self.get_batch_related('descriptors', obj)
 
-        return [self.fix_subfield_mark(descriptor.code) for descriptor in descriptor_list]
+        return [self.fix_subfield_mark(descriptor.code) for descriptor in descriptor_list if descriptor.status == 1]
 
     def prepare_keywords(self, obj):
         separator = '\n'
@@ -112,14 +120,11 @@ class OERIndex(indexes.SearchIndex, indexes.Indexable):
     def prepare_link(self, obj):
         electronic_address = []
 
-        urls = [oer.url for oer in OERURL.objects.filter(oer=obj.id)]
+        urls = [oer.url for oer in self.get_batch_related('urls', obj)]
         if urls:
             electronic_address.extend(urls)
 
-        attachments = Attachment.objects.filter(object_id=obj.id,
-                                                content_type=ContentType.objects.get_for_model(obj))
-
-        for attach in attachments:
+        for attach in self.get_batch_related('attachments', obj):
             view_url = "%sdocument/view/%s" % (settings.SITE_URL,  attach.short_url)
             electronic_address.append(view_url)
 
@@ -143,4 +148,6 @@ class OERIndex(indexes.SearchIndex, indexes.Indexable):
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now())
+        return self.get_model().objects.filter(created_time__lte=datetime.datetime.now()) \
+                                       .select_related('type', 'language', 'structure', 'learning_context', 'license') \
+                                       .prefetch_related('course_type', 'tec_resource_type', 'format', 'audience')
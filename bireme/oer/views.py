@@ -14,6 +14,7 @@ from pkg_resources import resource_filename
 from utils.views import ACTIONS, get_class
 from utils.forms import is_valid_for_publication
 from utils.context_processors import additional_user_info
+from utils.profile import get_user_cc
 from attachments.models import Attachment
 from main.models import Descriptor
 from help.models import get_help_fields
@@ -77,7 +78,7 @@ class OERGenericListView(LoginRequiredView, ListView):
             object_list = object_list.filter(created_by=self.request.user)
         # filter by cooperative center
         elif self.actions['filter_owner'] == 'center':
-            user_cc = self.request.user.profile.get_attribute('cc')
+            user_cc = get_user_cc(self.request.user)
             object_list = object_list.filter(cooperative_center_code=user_cc)
 
         return object_list
@@ -286,7 +287,7 @@ class OERDeleteView(LoginRequiredView, DeleteView):
     def get_object(self, queryset=None):
         obj = super(OERDeleteView, self).get_object()
         # check if cooperative center of the object is the same of the user
-        user_cc = self.request.user.profile.get_attribute('cc')
+        user_cc = get_user_cc(self.request.user)
         if not obj.cooperative_center_code == user_cc:
             return HttpResponse('Unauthorized', status=401)
 
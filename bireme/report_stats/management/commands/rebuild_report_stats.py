@@ -0,0 +1,73 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from collections import Counter
+
+from main.models import ResourceThematic
+from report_stats.models import STATS_MODELS, ReportStat, ReportStatObject, stat_keys
+
+import simplejson
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild report statistics tables from source records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of records read by query')
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options.get('verbosity', 1))
+        self.batch_size = options['batch_size']
+
+        for model, has_thematics in STATS_MODELS:
+            self.rebuild_model(model, has_thematics)
+
+    @transaction.atomic
+    def rebuild_model(self, model, has_thematics):
+        c_type = ContentType.objects.get_for_model(model)
+        ReportStat.objects.filter(content_type=c_type).delete()
+        ReportStatObject.objects.filter(content_type=c_type).delete()
+
+        totals = Counter()
+        records = 0
+        last_id = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_id).order_by('pk')
+                                     .values_list('pk', 'cooperative_center_code', 'status',
+                                                  'created_time')[:self.batch_size])
+            if not rows:
+                break
+
+            last_id = rows[-1][0]
+            thematics = {}
+            if has_thematics:
+                thematic_list = ResourceThematic.objects.filter(content_type=c_type,
+                                                                object_id__in=[row[0] for row in rows]) \
+                                                        .order_by('pk').values_list('object_id', 'thematic_area_id')
+                for object_id, thematic_id in thematic_list:
+                    thematics.setdefault(object_id, []).append(thematic_id)
+
+            stat_objects = []
+            for object_id, cc, status, created_time in rows:
+                keys = stat_keys(cc, status, created_time, thematic_ids=thematics.get(object_id, []))
+                totals.update(keys)
+                stat_objects.append(ReportStatObject(content_type=c_type, object_id=object_id,
+                                                     keys=simplejson.dumps(keys)))
+
+            ReportStatObject.objects.bulk_create(stat_objects)
+            records += len(rows)
+
+        ReportStat.objects.bulk_create(
+            ReportStat(content_type=c_type, cooperative_center_code=cc, status=status, thematic_area_id=thematic_id,
+                       year=year, month=month, records=total)
+            for (cc, status, thematic_id, year, month), total in totals.items()
+        )
+
+        if self.verbosity >= 1:
+            self.stdout.write('%s.%s: %d records, %d statistic rows' % (model._meta.app_label,
+                              model._meta.model_name, records, len(totals)))
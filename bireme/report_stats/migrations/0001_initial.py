@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0004_auto_20170504_1544'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportStat',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('cooperative_center_code', models.CharField(max_length=55, verbose_name='Cooperative center', blank=True)),
+                ('status', models.SmallIntegerField(null=True, verbose_name='Status')),
+                ('year', models.PositiveSmallIntegerField(null=True, verbose_name='Year')),
+                ('month', models.PositiveSmallIntegerField(null=True, verbose_name='Month')),
+                ('records', models.IntegerField(default=0, verbose_name='Records')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+                ('thematic_area', models.ForeignKey(related_name='+', to='main.ThematicArea', null=True)),
+            ],
+            options={
+                'verbose_name': 'report statistic',
+                'verbose_name_plural': 'report statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportStatObject',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.PositiveIntegerField()),
+                ('keys', models.TextField(blank=True)),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'report statistic object',
+                'verbose_name_plural': 'report statistic objects',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='reportstatobject',
+            unique_together=set([('content_type', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='reportstat',
+            index_together=set([('content_type', 'cooperative_center_code', 'status', 'thematic_area', 'year', 'month')]),
+        ),
+    ]
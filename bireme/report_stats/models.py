@@ -0,0 +1,172 @@
+#! coding: utf-8
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from django.contrib.contenttypes.models import ContentType
+
+from collections import Counter
+
+from main.models import Resource, ResourceThematic, ThematicArea
+from events.models import Event
+from multimedia.models import Media
+from biblioref.models import Reference
+
+import simplejson
+
+# attempts to update statistics of a record when its ReportStatObject is created at same time by other transaction
+REFRESH_ATTEMPTS = 3
+
+# models summarized at report statistics (model, has thematic areas)
+STATS_MODELS = (
+    (Reference, False),
+    (Resource, True),
+    (Event, True),
+    (Media, True),
+)
+
+
+class ReportStat(models.Model):
+    """
+    Number of records of a source model by cooperative center, status, thematic area and year/month
+    of creation. Rows without thematic area count all records, rows with thematic area count the
+    records classified with it (used only when reports are grouped or filtered by thematic area).
+    """
+
+    class Meta:
+        verbose_name = _("report statistic")
+        verbose_name_plural = _("report statistics")
+        index_together = [['content_type', 'cooperative_center_code', 'status', 'thematic_area', 'year', 'month']]
+
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    cooperative_center_code = models.CharField(_('Cooperative center'), max_length=55, blank=True)
+    status = models.SmallIntegerField(_('Status'), null=True)
+    thematic_area = models.ForeignKey(ThematicArea, null=True, related_name='+')
+    year = models.PositiveSmallIntegerField(_('Year'), null=True)
+    month = models.PositiveSmallIntegerField(_('Month'), null=True)
+    records = models.IntegerField(_('Records'), default=0)
+
+    def __unicode__(self):
+        return u"%s %s %s %s %s/%s: %s" % (self.content_type_id, self.cooperative_center_code, self.status,
+                                          self.thematic_area_id, self.month, self.year, self.records)
+
+
+class ReportStatObject(models.Model):
+    """
+    Statistic keys counted for each record. Used to compute the difference when a record changes.
+    """
+
+    class Meta:
+        verbose_name = _("report statistic object")
+        verbose_name_plural = _("report statistic objects")
+        unique_together = [['content_type', 'object_id']]
+
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+    keys = models.TextField(blank=True)
+
+    def get_keys(self):
+        return [tuple(key) for key in simplejson.loads(self.keys)] if self.keys else []
+
+
+def stats_model(model):
+    """
+    Return (summarized model, has thematic areas) for model or subclass of a summarized model
+    """
+    for summarized_model, has_thematics in STATS_MODELS:
+        if issubclass(model, summarized_model):
+            return summarized_model, has_thematics
+
+    return None, False
+
+
+def stat_keys(cooperative_center_code, status, created_time, thematic_ids=()):
+    """
+    Return list of statistic keys (cc, status, thematic area, year, month) of a record
+    """
+    year = month = None
+    if created_time:
+        # same values of date truncation by database (UTC)
+        if timezone.is_aware(created_time):
+            created_time = timezone.localtime(created_time, timezone.utc)
+        year, month = created_time.year, created_time.month
+
+    cc = cooperative_center_code or ''
+    keys = [(cc, status, None, year, month)]
+    keys.extend((cc, status, thematic_id, year, month) for thematic_id in thematic_ids)
+
+    return keys
+
+
+def update_stat(c_type_id, key, delta):
+    cc, status, thematic_id, year, month = key
+    stats = ReportStat.objects.filter(content_type_id=c_type_id, cooperative_center_code=cc, status=status,
+                                      thematic_area_id=thematic_id, year=year, month=month)
+
+    if not stats.update(records=F('records') + delta) and delta > 0:
+        ReportStat.objects.create(content_type_id=c_type_id, cooperative_center_code=cc, status=status,
+                                  thematic_area_id=thematic_id, year=year, month=month, records=delta)
+
+
+def refresh_object_stats(model, object_id):
+    """
+    Update statistics with the difference between current state of record and the keys already counted
+    """
+    model, has_thematics = stats_model(model)
+    if not model:
+        return
+
+    c_type = ContentType.objects.get_for_model(model)
+    for attempt in range(REFRESH_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                update_object_stats(model, has_thematics, c_type, object_id)
+            return
+        except IntegrityError:
+            # first save of record by concurrent requests
+            if attempt == REFRESH_ATTEMPTS - 1:
+                raise
+
+
+def update_object_stats(model, has_thematics, c_type, object_id):
+    new_keys = []
+    values = model.objects.filter(pk=object_id).values_list('cooperative_center_code', 'status',
+                                                            'created_time').first()
+    if values:
+        thematic_ids = []
+        if has_thematics:
+            thematic_ids = ResourceThematic.objects.filter(content_type=c_type, object_id=object_id) \
+                                                   .order_by('pk').values_list('thematic_area_id', flat=True)
+        new_keys = stat_keys(*values, thematic_ids=thematic_ids)
+
+    # row of record is locked until the end of transaction (updates of same record are serialized)
+    stat_object, created = ReportStatObject.objects.select_for_update() \
+                                                   .get_or_create(content_type=c_type, object_id=object_id)
+    old_keys = stat_object.get_keys()
+
+    deltas = Counter(new_keys)
+    deltas.subtract(old_keys)
+    for key, delta in deltas.items():
+        if delta:
+            update_stat(c_type.pk, key, delta)
+
+    if not new_keys:
+        stat_object.delete()
+    elif new_keys != old_keys:
+        stat_object.keys = simplejson.dumps(new_keys)
+        stat_object.save()
+
+
+def record_changed(sender, instance, **kwargs):
+    if sender is ResourceThematic:
+        if instance.content_type_id and instance.object_id:
+            model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+            if model:
+                refresh_object_stats(model, instance.object_id)
+    elif stats_model(sender)[0]:
+        refresh_object_stats(sender, instance.pk)
+
+
+post_save.connect(record_changed, dispatch_uid='report_stats_record_saved')
+post_delete.connect(record_changed, dispatch_uid='report_stats_record_deleted')
@@ -0,0 +1,132 @@
+# coding: utf-8
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test.utils import override_settings
+
+from main.models import Resource, ResourceThematic, ThematicArea
+from report_stats.models import ReportStat
+
+from utils.tests import BaseTestCase
+
+
+class ReportStatsTest(BaseTestCase):
+    """
+    Tests for incremental update of report statistics tables
+    """
+    def setUp(self):
+        super(ReportStatsTest, self).setUp()
+        self.thematic = ThematicArea.objects.create(acronym='LISBR1.1', name='Enfermagem')
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+
+        self.resources = [Resource.objects.create(status=0, title='Recurso de teste (%s)' % cc,
+                                                  link='http://bvsalud.org', originator='BIREME',
+                                                  created_by=user, cooperative_center_code=cc)
+                          for cc in ('BR1.1', 'BR1.1', 'PY3.1')]
+        ResourceThematic.objects.create(object_id=self.resources[0].pk, thematic_area=self.thematic,
+                                        content_type=ContentType.objects.get_for_model(Resource))
+
+    def totals(self, **filters):
+        stats = ReportStat.objects.filter(content_type=ContentType.objects.get_for_model(Resource), **filters)
+        totals = stats.values_list('cooperative_center_code').annotate(total=Sum('records'))
+        return dict((cc, total) for cc, total in totals if total)
+
+    def test_incremental_update(self):
+        self.assertEqual(self.totals(thematic_area__isnull=True), {'BR1.1': 2, 'PY3.1': 1})
+        self.assertEqual(self.totals(thematic_area=self.thematic), {'BR1.1': 1})
+
+        resource = self.resources[0]
+        resource.cooperative_center_code = 'PY3.1'
+        resource.save()
+        self.assertEqual(self.totals(thematic_area__isnull=True), {'BR1.1': 1, 'PY3.1': 2})
+        self.assertEqual(self.totals(thematic_area=self.thematic), {'PY3.1': 1})
+
+        ResourceThematic.objects.filter(object_id=resource.pk).delete()
+        self.assertEqual(self.totals(thematic_area=self.thematic), {})
+
+        resource.delete()
+        self.assertEqual(self.totals(thematic_area__isnull=True), {'BR1.1': 1, 'PY3.1': 1})
+
+    def test_rebuild(self):
+        expected = self.totals()
+        ReportStat.objects.all().delete()
+
+        call_command('rebuild_report_stats', verbosity=0)
+        self.assertEqual(self.totals(), expected)
+
+
+class ReportsStatsTest(BaseTestCase):
+    """
+    Tests for reports read from summary tables of report_stats app
+    """
+    def setUp(self):
+        super(ReportsStatsTest, self).setUp()
+        self.login_documentalist()
+        user = User.objects.get(username='doc')
+
+        self.nursing = ThematicArea.objects.create(acronym='LISBR1.1', name='Enfermagem')
+        self.medicine = ThematicArea.objects.create(acronym='LISBR1.2', name='Medicina')
+
+        object_ct = ContentType.objects.get_for_model(Resource)
+        for cc, status, thematics in (('BR1.1', 0, [self.nursing]), ('BR1.1', 1, [self.nursing, self.medicine]),
+                                      ('BR1.1', 1, []), ('PY3.1', 0, [self.medicine])):
+            resource = Resource.objects.create(status=status, title='Recurso de teste (%s)' % cc,
+                                               link='http://bvsalud.org', originator='BIREME',
+                                               created_by=user, cooperative_center_code=cc)
+            for thematic in thematics:
+                ResourceThematic.objects.create(object_id=resource.pk, content_type=object_ct,
+                                                thematic_area=thematic)
+
+    def report_rows(self, params):
+        response = self.client.get('/reports/', dict(params, source='resource'))
+        self.assertEqual(response.status_code, 200)
+
+        return [dict(row) for row in response.context['report_rows']]
+
+    def assertSameReport(self, params, expected):
+        with override_settings(REPORT_STATS_ENABLED=False):
+            table_rows = self.report_rows(params)
+        with override_settings(REPORT_STATS_ENABLED=True):
+            stats_rows = self.report_rows(params)
+
+        # rows with same total may be returned in any order
+        self.assertItemsEqual(table_rows, expected)
+        self.assertItemsEqual(stats_rows, expected)
+
+    def test_report_by_cooperative_center(self):
+        self.assertSameReport({'report': '2'}, [{'cooperative_center_code': 'BR1.1', 'total': 3},
+                                                {'cooperative_center_code': 'PY3.1', 'total': 1}])
+        self.assertSameReport({'report': '2', 'status': '0'}, [{'cooperative_center_code': 'BR1.1', 'total': 1},
+                                                               {'cooperative_center_code': 'PY3.1', 'total': 1}])
+        self.assertSameReport({'report': '2', 'filter_thematic': self.medicine.pk},
+                              [{'cooperative_center_code': 'BR1.1', 'total': 1},
+                               {'cooperative_center_code': 'PY3.1', 'total': 1}])
+
+    def test_report_by_year(self):
+        params = {'report': '3', 'filter_thematic': self.nursing.pk}
+        with override_settings(REPORT_STATS_ENABLED=False):
+            table_totals = [row['total'] for row in self.report_rows(params)]
+        with override_settings(REPORT_STATS_ENABLED=True):
+            stats_totals = [row['total'] for row in self.report_rows(params)]
+
+        self.assertEqual(table_totals, [2])
+        self.assertEqual(stats_totals, table_totals)
+
+    def test_report_by_thematic_area(self):
+        self.assertSameReport({'report': '5'}, [{'thematic': self.medicine, 'total': 2},
+                                                {'thematic': self.nursing, 'total': 2}])
+        self.assertSameReport({'report': '5', 'filter_created_by_cc': 'BR1.1'},
+                              [{'thematic': self.nursing, 'total': 2}, {'thematic': self.medicine, 'total': 1}])
+
+    def test_report_by_status(self):
+        self.assertSameReport({'report': '6'}, [{'status': 0, 'total': 2}, {'status': 1, 'total': 2}])
+
+    def test_report_without_cooperative_center(self):
+        user = User.objects.get(username='doc')
+        Resource.objects.create(status=0, title='Recurso sem centro', link='http://bvsalud.org',
+                                originator='BIREME', created_by=user, cooperative_center_code='')
+
+        self.assertSameReport({'report': '2', 'status': '0'}, [{'cooperative_center_code': 'BR1.1', 'total': 1},
+                                                               {'cooperative_center_code': 'PY3.1', 'total': 1},
+                                                               {'cooperative_center_code': '', 'total': 1}])
@@ -0,0 +1,133 @@
+#! coding: utf-8
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from main.models import Resource, ResourceThematic, ThematicArea
+from multimedia.models import Media, MediaCollection, MediaType
+from biblioref.models import ReferenceSource, ReferenceAnalytic
+from title.models import Title, IndexRange, IndexCode
+from reports.views import ReportsListView
+from utils.models import UserCooperativeCenter
+
+import time
+
+# (report number, source) measured by the benchmark
+BENCHMARK_REPORTS = (('1', 'resource'), ('2', 'resource'), ('3', 'resource'), ('5', 'resource'),
+                     ('6', 'resource'), ('7', 'media'), ('9', 'referenceanalytic'))
+
+# reports that can be read from report_stats summary tables
+STATS_REPORTS = ('2', '3', '4', '5', '6')
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and number of queries of reports over a seeded dataset. ' \
+           'Seeded records are removed (transaction rollback) at the end of execution.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User that request the reports (must have a profile)')
+        parser.add_argument('--users', type=int, default=500, help='Number of users to create')
+        parser.add_argument('--ccs', type=int, default=50, help='Number of cooperative centers of created users')
+        parser.add_argument('--thematics', type=int, default=100, help='Number of thematic areas to create')
+        parser.add_argument('--collections', type=int, default=100, help='Number of media collections to create')
+        parser.add_argument('--records', type=int, default=5000, help='Number of resources and medias to create')
+        parser.add_argument('--serials', type=int, default=100, help='Number of serials (LILACS-Express) to create')
+        parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of executions of each report')
+        parser.add_argument('--no-seed', action='store_true', default=False, help='Use current database content')
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist' % options['username'])
+
+        with transaction.atomic():
+            if not options['no_seed']:
+                self.seed(options)
+                call_command('rebuild_report_stats', verbosity=0)
+
+            for report, source in BENCHMARK_REPORTS:
+                with override_settings(REPORT_STATS_ENABLED=False):
+                    self.benchmark(report, source, options['repeat'])
+                if report in STATS_REPORTS:
+                    with override_settings(REPORT_STATS_ENABLED=True):
+                        self.benchmark(report, source, options['repeat'], label='summary tables')
+
+            # discard seeded records
+            transaction.set_rollback(True)
+
+    def benchmark(self, report, source, repeat, label='source tables'):
+        request = RequestFactory().get('/reports/', {'report': report, 'source': source})
+        request.user = self.user
+
+        timings = []
+        for count in range(repeat):
+            view = ReportsListView()
+            view.request = request
+            view.args, view.kwargs = (), {}
+            with CaptureQueriesContext(connection) as context:
+                start = time.time()
+                rows = list(view.get_queryset())
+                timings.append(time.time() - start)
+
+        self.stdout.write('report %s (%s, %s): %d rows, %d queries, min %.1f ms, avg %.1f ms' % (
+                          report, source, label, len(rows), len(context.captured_queries),
+                          min(timings) * 1000, sum(timings) / len(timings) * 1000))
+
+    def seed(self, options):
+        start = time.time()
+        prefix = 'benchmark-%d' % int(start)
+
+        users = []
+        for count in range(options['users']):
+            user = User.objects.create(username='%s-%d' % (prefix, count))
+            UserCooperativeCenter.objects.create(user=user, cc='BENCH%d' % (count % options['ccs']))
+            users.append(user)
+
+        thematics = [ThematicArea.objects.create(name='%s thematic %d' % (prefix, count), language='en')
+                     for count in range(options['thematics'])]
+        collections = [MediaCollection.objects.create(name='%s collection %d' % (prefix, count))
+                       for count in range(options['collections'])]
+        media_type = MediaType.objects.create(name='%s media type' % prefix, language='en')
+
+        Resource.objects.bulk_create(
+            Resource(title='%s resource %d' % (prefix, count), link='http://example.org/%d' % count,
+                     originator=prefix, created_by=users[count % len(users)], status=count % 3)
+            for count in range(options['records'])
+        )
+        resource_ctype = ContentType.objects.get_for_model(Resource)
+        resource_ids = Resource.objects.filter(originator=prefix).values_list('pk', flat=True)
+        ResourceThematic.objects.bulk_create(
+            ResourceThematic(content_type=resource_ctype, object_id=resource_id,
+                             thematic_area=thematics[resource_id % len(thematics)])
+            for resource_id in resource_ids
+        )
+
+        Media.objects.bulk_create(
+            Media(title='%s media %d' % (prefix, count), link='http://example.org/%d' % count,
+                  media_type=media_type, media_collection=collections[count % len(collections)],
+                  created_by=users[count % len(users)])
+            for count in range(options['records'])
+        )
+
+        lilacs_code = IndexCode.objects.filter(code='LL').first() or IndexCode.objects.create(code='LL')
+        for count in range(options['serials']):
+            serial_name = '%s serial %d' % (prefix, count)
+            title = Title.objects.create(title=serial_name, shortened_title=serial_name, id_number=str(count),
+                                         cooperative_center_code='BENCH%d' % (count % options['ccs']))
+            IndexRange.objects.create(title=title, index_code=lilacs_code,
+                                      indexer_cc_code='BENCH%d' % (count % options['ccs']))
+
+            source = ReferenceSource.objects.create(title_serial=serial_name, literature_type='S',
+                                                    treatment_level='', status=0)
+            for analytic in range(5):
+                ReferenceAnalytic.objects.create(source=source, literature_type='S', treatment_level='as',
+                                                 status=0)
+
+        self.stdout.write('Seeded %d users, %d thematic areas, %d collections, %d resources/medias and '
+                          '%d serials in %.1f s' % (options['users'], options['thematics'], options['collections'],
+                          options['records'], options['serials'], time.time() - start))
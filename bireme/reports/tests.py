@@ -0,0 +1,139 @@
+# coding: utf-8
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from main.models import Resource, ResourceThematic, ThematicArea
+from multimedia.models import Media, MediaCollection, MediaType
+from biblioref.models import ReferenceSource, ReferenceAnalytic
+from title.models import Title, IndexRange, IndexCode
+
+from utils.tests import BaseTestCase
+
+
+@override_settings(REPORT_STATS_ENABLED=False)
+class ReportsTest(BaseTestCase):
+    """
+    Tests for reports computed with aggregate queries. Rows and totals are the same of the former
+    computation by user/thematic area/collection/serial and the number of queries don't depend of
+    the number of rows
+    """
+    def setUp(self):
+        super(ReportsTest, self).setUp()
+        self.login_documentalist()
+        self.user = User.objects.get(username='doc')
+        self.thematics = [ThematicArea.objects.create(acronym='LISBR1.%s' % count, name='Tema %s' % count)
+                          for count in range(4)]
+
+    def get_report(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/reports/', params)
+        self.assertEqual(response.status_code, 200)
+
+        return [dict(row) for row in response.context['report_rows']], len(context.captured_queries)
+
+    def create_resource(self, user, thematics=()):
+        resource = Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                           originator='BIREME', created_by=user, cooperative_center_code='BR1.1')
+        object_ct = ContentType.objects.get_for_model(Resource)
+        for thematic in thematics:
+            ResourceThematic.objects.create(object_id=resource.pk, content_type=object_ct, thematic_area=thematic)
+
+    def test_report_by_user(self):
+        other = User.objects.create_user('other', 'other@test.com', 'other')
+        for count in range(3):
+            self.create_resource(self.user, self.thematics[:1])
+        self.create_resource(other, self.thematics[1:2])
+
+        params = {'source': 'resource', 'report': '1'}
+        rows, queries = self.get_report(params)
+        self.assertEqual(rows, [{'user': 'doc', 'total': 3}, {'user': 'other', 'total': 1}])
+
+        rows, queries = self.get_report(dict(params, filter_thematic=self.thematics[1].pk))
+        self.assertEqual(rows, [{'user': 'other', 'total': 1}])
+
+        for count in range(3):
+            self.create_resource(User.objects.create_user('user%s' % count, 'user@test.com', 'user'))
+        rows, more_rows_queries = self.get_report(params)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(more_rows_queries, queries)
+
+    def test_report_by_thematic_area(self):
+        self.create_resource(self.user, self.thematics[:2])
+        self.create_resource(self.user, self.thematics[1:2])
+
+        params = {'source': 'resource', 'report': '5'}
+        rows, queries = self.get_report(params)
+        # sorted by total (reverse) and name
+        self.assertEqual(rows, [{'thematic': self.thematics[1], 'total': 2}, {'thematic': self.thematics[0], 'total': 1}])
+
+        self.create_resource(self.user, self.thematics[2:])
+        rows, more_rows_queries = self.get_report(params)
+        self.assertEqual([row['thematic'] for row in rows], [self.thematics[1], self.thematics[0],
+                                                             self.thematics[2], self.thematics[3]])
+        self.assertEqual(more_rows_queries, queries)
+
+    def test_report_by_collection(self):
+        media_type = MediaType.objects.create(acronym='video', name='Video')
+        collections = [MediaCollection.objects.create(name=u'Coleção %s' % count) for count in range(3)]
+
+        def create_media(collection, status=0):
+            Media.objects.create(status=status, title='Midia de teste', media_type=media_type,
+                                 link='http://bvsalud.org', media_collection=collection,
+                                 cooperative_center_code='BR1.1')
+
+        create_media(collections[1])
+        create_media(collections[1], status=1)
+        create_media(collections[0])
+        create_media(None)
+
+        params = {'source': 'media', 'report': '7'}
+        rows, queries = self.get_report(params)
+        self.assertEqual(rows, [{'collection': collections[1], 'total': 2}, {'collection': collections[0], 'total': 1}])
+
+        rows, queries = self.get_report(dict(params, status='1'))
+        self.assertEqual(rows, [{'collection': collections[1], 'total': 1}])
+
+        create_media(collections[2])
+        rows, more_rows_queries = self.get_report(dict(params, status='0'))
+        self.assertEqual(rows, [{'collection': collections[0], 'total': 1}, {'collection': collections[1], 'total': 1},
+                                {'collection': collections[2], 'total': 1}])
+        self.assertEqual(more_rows_queries, queries)
+
+    def test_report_lilacs_express_by_serial(self):
+        lilacs = IndexCode.objects.create(code='LL', name='LILACS')
+
+        def create_title(shortened_title, indexer_cc_code):
+            title = Title.objects.create(id_number=shortened_title, record_type='KS', treatment_level='K', status='1',
+                                         title=shortened_title, shortened_title=shortened_title)
+            if indexer_cc_code:
+                IndexRange.objects.create(title=title, index_code=lilacs, indexer_cc_code=indexer_cc_code)
+
+        def create_analytics(title_serial, total, status=0):
+            source = ReferenceSource.objects.create(status=status, literature_type='S', treatment_level='',
+                                                    title_serial=title_serial)
+            for count in range(total):
+                ReferenceAnalytic.objects.create(status=status, literature_type='S', treatment_level='as',
+                                                 source=source, title=[{'text': 'Analitica', '_i': 'pt'}])
+
+        # indexer of the first title with the serial name
+        create_title('Rev. Enfermagem', 'BR1.1')
+        create_title('Rev. Enfermagem', 'PY3.1')
+        create_title('Rev. Medicina', '')
+        create_analytics('Rev. Enfermagem', 2)
+        create_analytics('Rev. Medicina', 1)
+        create_analytics('Rev. Medicina', 3, status=1)
+
+        params = {'source': 'referenceanalytic', 'report': '9'}
+        rows, queries = self.get_report(params)
+        self.assertEqual(rows, [{'source__title_serial': 'Rev. Enfermagem', 'num_pending': 2, 'indexer_cc': 'BR1.1'},
+                                {'source__title_serial': 'Rev. Medicina', 'num_pending': 1, 'indexer_cc': ''}])
+
+        create_title('Rev. Odontologia', 'BR2.1')
+        create_analytics('Rev. Odontologia', 1)
+        create_analytics('Rev. Saude', 1)
+        rows, more_rows_queries = self.get_report(params)
+        self.assertEqual(len(rows), 4)
+        self.assertIn({'source__title_serial': 'Rev. Odontologia', 'num_pending': 1, 'indexer_cc': 'BR2.1'}, rows)
+        self.assertEqual(more_rows_queries, queries)
@@ -6,7 +6,8 @@ from django.http import HttpResponse, HttpResponseRedirect
 from django.views.generic.list import ListView
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
-from django.db.models import Count
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
 from django.db import connection
 
 from django.conf import settings
@@ -14,6 +15,7 @@ from django.conf import settings
 from utils.views import ACTIONS
 from utils.views import LoginRequiredView, SuperUserRequiredView
 from utils.context_processors import additional_user_info
+from utils.profile import users_of_cc
 
 from collections import OrderedDict
 from main.models import Descriptor, ThematicArea
@@ -21,6 +23,9 @@ from multimedia.models import Media, MediaCollection
 from title.models import Title, IndexRange, IndexCode
 from utils.views import CSVResponseMixin
 from biblioref.models import ReferenceAnalytic
+from report_stats.models import ReportStat, stats_model
+
+from datetime import date
 
 
 class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
@@ -50,41 +55,36 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
         if report and source_name:
             source_ctype = ContentType.objects.get(model=source_name)
             source = source_ctype.model_class()
+            stats = self.get_stats(source, report, filter_status, filter_created_by_cc, filter_thematic)
 
             if report == '1':
                 user_data = additional_user_info(self.request)
-                user_list = User.objects.all()
-                user_filter_list = []
+                source_list = source.objects.filter(created_by__isnull=False)
+                # if is not superuser or a user from BR1.1 (BIREME) filter only users from the same CC as request.user
+                if not self.request.user.is_superuser and user_data['user_cc'] != 'BR1.1':
+                    user_filter_list = users_of_cc([user_data['user_cc']]).filter(is_superuser=False)
+                    source_list = source_list.filter(created_by__in=user_filter_list)
 
-                # if is superuser or is a user from BR1.1 (BIREME)
-                if self.request.user.is_superuser or user_data['user_cc'] == 'BR1.1':
-                    user_filter_list = user_list
-                else:
-                    # else filter only users from the same CC as request.user
-                    for user in user_list:
-                        if not user.is_superuser:
-                            user_cc = user.profile.get_attribute('cc')
-                            if user_cc == user_data['user_cc']:
-                                user_filter_list.append(user)
-
-                for user in user_filter_list:
-                    source_list = source.objects.filter(created_by=user)
-                    if filter_status:
-                        source_list = source_list.filter(status=filter_status)
-                    if filter_created_by_cc:
-                        source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
-                    if filter_thematic:
-                        source_list = source_list.filter(thematics__thematic_area=filter_thematic)
+                if filter_status:
+                    source_list = source_list.filter(status=filter_status)
+                if filter_created_by_cc:
+                    source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
+                if filter_thematic:
+                    source_list = source_list.filter(thematics__thematic_area=filter_thematic)
+
+                # total by user (sorted by total reverse)
+                totals = source_list.values('created_by__username').annotate(total=Count('pk')) \
+                                    .order_by('-total', 'created_by')
 
-                    total_by_user = source_list.count()
-                    if total_by_user > 0:
-                        data = OrderedDict()
-                        data['user'] = user.username
-                        data['total'] = total_by_user
-                        report_rows.append(data)
+                for row in totals:
+                    data = OrderedDict()
+                    data['user'] = row['created_by__username']
+                    data['total'] = row['total']
+                    report_rows.append(data)
 
-                    # sort the result list by total (reverse)
-                    report_rows = sorted(report_rows, key=lambda k:k['total'], reverse=True)
+            elif report == '2' and stats is not None:
+                report_rows = stats.values('cooperative_center_code').annotate(total=Sum('records')) \
+                                   .filter(total__gt=0).order_by('-total')
 
             elif report == '2':
                 source_list = source.objects.all()
@@ -95,7 +95,33 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
                 if filter_thematic:
                     source_list = source_list.filter(thematics__thematic_area=filter_thematic)
 
-                report_rows = source_list.values('cooperative_center_code').annotate(total=Count('cooperative_center_code')).order_by('-total')
+                # records without cooperative center (NULL or blank) are totaled together as in report statistics
+                totals = source_list.annotate(cc=Coalesce('cooperative_center_code', Value(''))).values('cc') \
+                                    .annotate(total=Count('pk')).order_by('-total')
+
+                for row in totals:
+                    data = OrderedDict()
+                    data['cooperative_center_code'] = row['cc']
+                    data['total'] = row['total']
+                    report_rows.append(data)
+
+            elif (report == '3' or report == '4') and stats is not None:
+                stats = stats.filter(year__isnull=False)
+                if report == '3':
+                    totals = stats.values('year').annotate(total=Sum('records')).filter(total__gt=0) \
+                                  .order_by('-year')
+                else:
+                    totals = stats.values('year', 'month').annotate(total=Sum('records')).filter(total__gt=0) \
+                                  .order_by('-year', '-month')
+
+                for row in totals:
+                    data = OrderedDict()
+                    if report == '3':
+                        data['year'] = date(row['year'], 1, 1)
+                    else:
+                        data['month'] = date(row['year'], row['month'], 1)
+                    data['total'] = row['total']
+                    report_rows.append(data)
 
             elif report == '3' or report == '4':
                 if report == '3':
@@ -111,30 +137,39 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
                 if filter_created_by_cc:
                     source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
                 if filter_thematic:
-                    source_list = source_list.filter(thematics__thematic_area=filter_status)
+                    source_list = source_list.filter(thematics__thematic_area=filter_thematic)
 
                 order = "-{0}".format(truncate_by)
                 report_rows = source_list.values(truncate_by).annotate(total=Count('pk')).order_by(order)
 
             elif report == '5':
-                thematic_list = ThematicArea.objects.all().order_by('name')
-
-                for thematic in thematic_list:
-                    source_list = source.objects.filter(thematics__thematic_area=thematic)
+                if stats is not None:
+                    totals = stats.values_list('thematic_area').annotate(total=Sum('records')).filter(total__gt=0)
+                else:
+                    source_list = source.objects.filter(thematics__thematic_area__isnull=False)
                     if filter_status:
                         source_list = source_list.filter(status=filter_status)
                     if filter_created_by_cc:
                         source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
 
-                    total_by_thematic = source_list.count()
-                    if total_by_thematic > 0:
-                        data = OrderedDict()
-                        data['thematic'] = thematic
-                        data['total'] = total_by_thematic
-                        report_rows.append(data)
+                    totals = source_list.values_list('thematics__thematic_area').annotate(total=Count('pk'))
+
+                totals = list(totals)
+                thematic_list = ThematicArea.objects.in_bulk([thematic_id for thematic_id, total in totals])
+
+                for thematic_id, total in totals:
+                    data = OrderedDict()
+                    data['thematic'] = thematic_list[thematic_id]
+                    data['total'] = total
+                    report_rows.append(data)
 
-                    # sort the result list by total (reverse)
-                    report_rows = sorted(report_rows, key=lambda k:k['total'], reverse=True)
+                # sort the result list by total (reverse) and name
+                report_rows.sort(key=lambda k: k['thematic'].name)
+                report_rows.sort(key=lambda k: k['total'], reverse=True)
+
+            elif report == '6' and stats is not None:
+                report_rows = stats.filter(status__isnull=False).values('status').annotate(total=Sum('records')) \
+                                   .filter(total__gt=0).order_by('-total')
 
             elif report == '6':
                 source_list = source.objects.all()
@@ -148,26 +183,26 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
                 report_rows = source_list.values('status').annotate(total=Count('status')).order_by('-total')
 
             if report == '7':
-                collection_list = MediaCollection.objects.all().order_by('name')
+                source_list = Media.objects.filter(media_collection__isnull=False)
+                if filter_status:
+                    source_list = source_list.filter(status=filter_status)
+                if filter_created_by_cc:
+                    source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
+                if filter_thematic:
+                    source_list = source_list.filter(thematics__thematic_area=filter_thematic)
 
-                for collection in collection_list:
-                    source_list = Media.objects.filter(media_collection=collection)
-                    if filter_status:
-                        source_list = source_list.filter(status=filter_status)
-                    if filter_created_by_cc:
-                        source_list = source_list.filter(cooperative_center_code=filter_created_by_cc)
-                    if filter_thematic:
-                        source_list = source_list.filter(thematics__thematic_area=filter_thematic)
+                totals = source_list.values('media_collection').annotate(total=Count('pk'))
+                collection_list = MediaCollection.objects.in_bulk([row['media_collection'] for row in totals])
 
-                    total_by_collection = source_list.count()
-                    if total_by_collection > 0:
-                        data = OrderedDict()
-                        data['collection'] = collection
-                        data['total'] = total_by_collection
-                        report_rows.append(data)
+                for row in totals:
+                    data = OrderedDict()
+                    data['collection'] = collection_list[row['media_collection']]
+                    data['total'] = row['total']
+                    report_rows.append(data)
 
-                    # sort the result list by total (reverse)
-                    report_rows = sorted(report_rows, key=lambda k:k['total'], reverse=True)
+                # sort the result list by total (reverse) and name
+                report_rows.sort(key=lambda k: k['collection'].name)
+                report_rows.sort(key=lambda k: k['total'], reverse=True)
 
             if report == '8':
                 report_rows = OrderedDict()
@@ -186,20 +221,26 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
                 llxp_list = ReferenceAnalytic.objects.filter(status=0)
 
                 # summarize by serial
-                report_rows = llxp_list.values('source__title_serial').annotate(num_pending=Count('pk')).order_by('-num_pending')
+                report_rows = list(llxp_list.values('source__title_serial').annotate(num_pending=Count('pk'))
+                                            .order_by('-num_pending'))
 
-                # add information of indexer cc code
+                # add information of indexer cc code (LILACS index range of first title with serial name)
                 lilacs_code = IndexCode.objects.get(code='LL').pk
-                for row in report_rows:
-                    indexer_cc = ''
-                    current_title = row['source__title_serial']
-                    title_obj = Title.objects.filter(shortened_title=current_title).first()
-
-                    indexrange =  IndexRange.objects.filter(title=title_obj, index_code=lilacs_code)
-                    if indexrange:
-                        indexer_cc = indexrange[0].indexer_cc_code
+                serial_list = [row['source__title_serial'] for row in report_rows]
+                first_title = {}
+                for title_id, shortened_title in Title.objects.filter(shortened_title__in=serial_list) \
+                                                              .order_by('pk').values_list('pk', 'shortened_title'):
+                    first_title.setdefault(shortened_title, title_id)
+
+                indexer_cc_by_title = {}
+                index_ranges = IndexRange.objects.filter(title__in=first_title.values(), index_code=lilacs_code) \
+                                                 .order_by('pk').values_list('title', 'indexer_cc_code')
+                for title_id, indexer_cc_code in index_ranges:
+                    indexer_cc_by_title.setdefault(title_id, indexer_cc_code)
 
-                    row.update({'indexer_cc': indexer_cc})
+                for row in report_rows:
+                    title_id = first_title.get(row['source__title_serial'])
+                    row.update({'indexer_cc': indexer_cc_by_title.get(title_id, '')})
 
             if report == '10':
                 report_rows = OrderedDict()
@@ -208,6 +249,33 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
 
         return report_rows
 
+    def get_stats(self, source, report, filter_status, filter_created_by_cc, filter_thematic):
+        """
+        Return ReportStat queryset of source or None if report must be computed from source table
+        """
+        if not settings.REPORT_STATS_ENABLED or report not in ('2', '3', '4', '5', '6'):
+            return None
+
+        stats_source, has_thematics = stats_model(source)
+        if stats_source is not source or (not has_thematics and (report == '5' or filter_thematic)):
+            return None
+
+        stats = ReportStat.objects.filter(content_type=ContentType.objects.get_for_model(source))
+        if filter_status:
+            stats = stats.filter(status=filter_status)
+        if filter_created_by_cc:
+            stats = stats.filter(cooperative_center_code=filter_created_by_cc)
+
+        # rows with thematic area only count records classified with it
+        if report == '5':
+            stats = stats.filter(thematic_area__isnull=False)
+        elif filter_thematic:
+            stats = stats.filter(thematic_area=filter_thematic)
+        else:
+            stats = stats.filter(thematic_area__isnull=True)
+
+        return stats
+
     def get_context_data(self, **kwargs):
         context = super(ReportsListView, self).get_context_data(**kwargs)
         cc_filter_list = []
@@ -219,12 +287,9 @@ class ReportsListView(LoginRequiredView, CSVResponseMixin, ListView):
         report = self.request.GET.get('report', None)
 
         thematic_list = ThematicArea.objects.all().order_by('name')
-        user_list = User.objects.filter(is_superuser=False).order_by('username')
         # mantain in user filter list only users from the same CCS (CC's in the network) as request.user
-        for user in user_list:
-            user_cc = user.profile.get_attribute('cc')
-            if user_cc == user_data['user_cc'] or user_cc in user_data['ccs']:
-                user_filter_list.append(user)
+        user_filter_list = users_of_cc([user_data['user_cc']] + list(user_data['ccs'])) \
+                               .filter(is_superuser=False).order_by('username')
 
         cc_filter_list = user_data['ccs']
         # remove duplications from list
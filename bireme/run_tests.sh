@@ -1,6 +1,6 @@
 # run tests
 
-for app in main events suggest multimedia biblioref
+for app in main events suggest multimedia biblioref api reports report_stats utils log
 do
     echo "Runing tests from [$app]"
     python -W ignore manage.py test -v 0 $app
@@ -1,12 +1,10 @@
 import datetime
 from haystack import indexes
 from haystack.exceptions import SkipDocument
-from main.models import Descriptor, Keyword, SourceLanguage, SourceType, ResourceThematic
 from models import Title
+from utils.indexing import BatchPrepareMixin
 
-from django.contrib.contenttypes.models import ContentType
-
-class TitleIndex(indexes.SearchIndex, indexes.Indexable):
+class TitleIndex(BatchPrepareMixin, indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
     status = indexes.CharField(model_attr='status')
@@ -15,6 +13,8 @@ class TitleIndex(indexes.SearchIndex, indexes.Indexable):
     created_date = indexes.CharField()
     updated_date = indexes.CharField()
 
+    batch_generic_related = ('descriptors', 'keywords')
+
     def get_model(self):
         return Title
 
@@ -25,10 +25,10 @@ class TitleIndex(indexes.SearchIndex, indexes.Indexable):
             raise SkipDocument
 
     def prepare_descriptor(self, obj):
-        return [descriptor.code for descriptor in Descriptor.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [descriptor.code for descriptor in self.get_batch_related('descriptors', obj) if descriptor.status == 1]
 
     def prepare_keyword(self, obj):
-        return [keyword.text for keyword in Keyword.objects.filter(object_id=obj.id, content_type=ContentType.objects.get_for_model(obj), status=1)]
+        return [keyword.text for keyword in self.get_batch_related('keywords', obj) if keyword.status == 1]
 
     def prepare_created_date(self, obj):
         if obj.created_time:
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from utils.models import profile_saved
+
+        # keep UserCooperativeCenter in sync with the user profile model of biremelogin (user.profile)
+        profile_model = User._meta.get_field('profile').related_model
+        post_save.connect(profile_saved, sender=profile_model, dispatch_uid='utils_profile_saved')
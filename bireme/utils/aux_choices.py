@@ -0,0 +1,89 @@
+#! coding: utf-8
+from django.db.models.fields import BLANK_CHOICE_DASH
+from django.utils.translation import get_language
+
+from utils.process_cache import ProcessCache
+
+
+class AuxChoiceRegistry(ProcessCache):
+    """
+    Per-process registry of the choices of auxiliary code fields (AuxCode/AuxCodeLocal).
+
+    All codes and translations are loaded with one query at first use. The rendered (code, label)
+    list of each field is built once by language and discarded with the codes when they are
+    invalidated by post_save/post_delete of AuxCode or AuxCodeLocal.
+    """
+    name = 'aux_choices'
+
+    def get_loaded(self):
+        """
+        Return tuple with codes ({field: [(code, label, {language: label}), ...]}) and rendered choices
+        """
+        from utils.models import AuxCode, AuxCodeLocal
+
+        return self.get_entry('codes', (AuxCode, AuxCodeLocal), self.load_codes)
+
+    def get_codes(self, field):
+        """
+        Return list of (code, label, {language: label}) of field
+        """
+        codes, choices = self.get_loaded()
+
+        return codes.get(field, [])
+
+    def load_codes(self):
+        from utils.models import AuxCode
+
+        rows = AuxCode.objects.order_by('pk', 'auxcodelocal__pk').values_list(
+            'pk', 'field', 'code', 'label', 'auxcodelocal__language', 'auxcodelocal__label')
+
+        codes = {}
+        translations = {}
+        for pk, field, code, label, trans_language, trans_label in rows:
+            if pk not in translations:
+                translations[pk] = {}
+                codes.setdefault(field, []).append((code, label, translations[pk]))
+            if trans_language:
+                translations[pk].setdefault(trans_language.lower(), trans_label)
+
+        return codes, {}
+
+    def get_choices(self, field, language=None):
+        """
+        Return list of (code, label) of field with labels in language (default is current language)
+        """
+        language = (language or get_language() or '').lower()
+        key = (field, language)
+
+        codes, choices = self.get_loaded()
+        if key not in choices:
+            choices[key] = [(code, translations.get(language, label))
+                            for code, label, translations in codes.get(field, [])]
+
+        return choices[key]
+
+    def get_all_labels(self, field):
+        """
+        Return set with labels of all languages of field codes
+        """
+        labels = set()
+        for code, label, translations in self.get_codes(field):
+            labels.add(label)
+            labels.update(translations.values())
+
+        return labels
+
+
+aux_choices = AuxChoiceRegistry()
+
+
+def aux_field_choices(field, blank_choice=BLANK_CHOICE_DASH):
+    """
+    Return choices of auxiliary code field in current language. Used as callable choices of form fields
+    so the list is built at render/validation time and not at form class creation
+    """
+    return blank_choice + aux_choices.get_choices(field)
+
+
+def aux_field_labels(field):
+    return aux_choices.get_all_labels(field)
@@ -0,0 +1,28 @@
+#! coding: utf-8
+from utils.process_cache import ProcessCache
+
+
+class ChoiceListCache(ProcessCache):
+    """
+    Per-process cache of choice lists of forms that depend on database tables (ex. serial titles
+    indexed by a cooperative center).
+
+    Lists are built by functions registered with the models they read and cached by name and
+    arguments of the function. Lists are invalidated by post_save/post_delete of one of its models.
+    """
+    name = 'choice_lists'
+
+    def __init__(self, *args, **kwargs):
+        super(ChoiceListCache, self).__init__(*args, **kwargs)
+        self.builders = {}
+
+    def register(self, name, builder, models):
+        self.builders[name] = (builder, tuple(models))
+
+    def get(self, name, *args):
+        builder, models = self.builders[name]
+
+        return self.get_entry((name, args), models, builder, *args)
+
+
+choice_lists = ChoiceListCache()
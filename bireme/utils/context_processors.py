@@ -2,10 +2,37 @@
 from django.contrib.auth.models import User
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
+from utils.profile import get_profile_data
+
+class UserInfoCounter(object):
+    """
+    Count how many times the user info was computed (not read from request cache)
+    """
+    def __init__(self):
+        self.computed = 0
+
+    def reset(self):
+        self.computed = 0
+
+user_info_counter = UserInfoCounter()
 
-import simplejson
 
 def additional_user_info(request):
+    """
+    Return user info (cc, networks, service roles, etc). The info is computed once by request and shared by
+    context processor and views, a copy is returned so callers can add keys (ex. is_owner)
+    """
+    # cache is discarded if user changes during request (login/logout)
+    user_id, user_info = getattr(request, '_user_info_cache', (None, None))
+    if user_info is None or user_id != request.user.pk:
+        user_info = compute_user_info(request)
+        request._user_info_cache = (request.user.pk, user_info)
+
+    return dict(user_info)
+
+
+def compute_user_info(request):
+    user_info_counter.computed += 1
 
     user = request.user
     user_role = ''
@@ -16,7 +43,7 @@ def additional_user_info(request):
     service_list = []
 
     if user.is_authenticated():
-        user_data = simplejson.loads(user.profile.data)
+        user_data = get_profile_data(user)
         user_cc = user_data['cc']
         networks = user_data['networks']
         ccs = user_data['ccs']
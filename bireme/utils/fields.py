@@ -7,7 +7,9 @@ from django.db.models.fields import BLANK_CHOICE_DASH
 from django.forms.utils import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from utils.models import *
+from utils.aux_choices import aux_field_choices
 
+import functools
 import json
 import jsonfield
 
@@ -46,9 +48,9 @@ class AuxiliaryChoiceField(models.Field):
     def formfield(self, **kwargs):
         """Overwrite  formfield to change html input to select and populate choiceis with auxiliar codes from database"""
 
+        # callable choices are loaded from AuxChoiceRegistry in the language of the request
         defaults = {'widget': forms.Select(), 'form_class': forms.ChoiceField,
-                    'choices': BLANK_CHOICE_DASH + [(aux.code, aux) for aux in
-                                                    AuxCode.objects.filter(field=self.name)]}
+                    'choices': functools.partial(aux_field_choices, self.name)}
 
         defaults.update(kwargs)
 
@@ -90,9 +92,9 @@ class MultipleAuxiliaryChoiceField(models.Field):
     def formfield(self, **kwargs):
         """Overwrite  formfield to change html input to select  multiple and populate choiceis with auxiliar codes from database"""
 
+        # callable choices are loaded from AuxChoiceRegistry in the language of the request
         defaults = {'widget': forms.SelectMultiple(), 'form_class': forms.MultipleChoiceField,
-                    'choices': BLANK_CHOICE_DASH + [(aux.code, aux) for aux in
-                                                    AuxCode.objects.filter(field=self.name)]}
+                    'choices': functools.partial(aux_field_choices, self.name)}
 
         defaults.update(kwargs)
 
@@ -0,0 +1,258 @@
+#! coding: utf-8
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.contrib.contenttypes.models import ContentType
+
+from haystack import connections
+from haystack.backends.solr_backend import SolrEngine, SolrSearchBackend
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+
+from log.middleware import flush_audit_log, discard_audit_log
+from main.models import Descriptor, Keyword, ResourceThematic
+from attachments.models import Attachment
+from utils.models import SearchIndexQueue
+from utils.prefetch import bulk_generic_related
+
+import threading
+
+# generic relation models that can be preloaded by BatchPrepareMixin (name: (model, select_related))
+BATCH_GENERIC_RELATED = {
+    'descriptors': (Descriptor, ()),
+    'keywords': (Keyword, ()),
+    'thematics': (ResourceThematic, ('thematic_area',)),
+    'attachments': (Attachment, ()),
+}
+
+
+# batches prepared in the current thread by index. Index instances are shared by all threads of
+# process (unified index), so concurrent updates (ex. queue worker and reindex) have their own batch
+_batches = threading.local()
+
+
+class BatchPrepareMixin(object):
+    """
+    SearchIndex mixin that preloads related rows for a whole batch of objects with a few IN queries
+    before the documents are built (see BatchSolrSearchBackend).
+
+    Indexes list at batch_generic_related the generic relations used by prepare_* methods and
+    may extend load_batch to preload other data. Objects prepared outside of a batch (ex. realtime
+    signal processor) are loaded as a batch of one object.
+    """
+    batch_generic_related = ()
+
+    def thread_batches(self):
+        batches = getattr(_batches, 'by_index', None)
+        if batches is None:
+            batches = _batches.by_index = {}
+
+        return batches
+
+    def prepare_batch(self, objects):
+        batch_ids = frozenset(obj.pk for obj in objects)
+        self.thread_batches()[self] = (batch_ids, self.load_batch(objects))
+
+    def clear_batch(self):
+        self.thread_batches().pop(self, None)
+
+    def load_batch(self, objects):
+        data = {}
+        if self.batch_generic_related:
+            c_type = ContentType.objects.get_for_model(self.get_model())
+            ids_by_ctype = {c_type.pk: [obj.pk for obj in objects]}
+
+            for name in self.batch_generic_related:
+                model, select_related = BATCH_GENERIC_RELATED[name]
+                data[name] = bulk_generic_related(model, ids_by_ctype, select_related=select_related)
+
+        return data
+
+    def get_batch(self, obj):
+        batch = self.thread_batches().get(self)
+        if batch is None or obj.pk not in batch[0]:
+            self.prepare_batch([obj])
+            batch = self.thread_batches()[self]
+
+        return batch[1]
+
+    def get_batch_related(self, name, obj):
+        related = self.get_batch(obj)[name]
+        if name in self.batch_generic_related:
+            key = (ContentType.objects.get_for_model(obj).pk, obj.pk)
+        else:
+            key = obj.pk
+
+        return related.get(key, [])
+
+
+class BatchSolrSearchBackend(SolrSearchBackend):
+    """
+    Solr backend that call the prepare_batch hook of the index before building the documents of a batch
+    """
+
+    def update(self, index, iterable, commit=True):
+        if not hasattr(index, 'prepare_batch'):
+            return super(BatchSolrSearchBackend, self).update(index, iterable, commit=commit)
+
+        objects = list(iterable)
+        index.prepare_batch(objects)
+        try:
+            super(BatchSolrSearchBackend, self).update(index, objects, commit=commit)
+        finally:
+            index.clear_batch()
+
+
+class BatchSolrEngine(SolrEngine):
+    backend = BatchSolrSearchBackend
+
+
+def is_indexed(model):
+    unified_index = connections['default'].get_unified_index()
+    return model in unified_index.get_indexed_models()
+
+
+def enqueue_index_update(model, object_id, action=SearchIndexQueue.ACTION_UPDATE):
+    """
+    Add object to search index queue. A pending entry of the same object is reused (only last action is kept)
+    """
+    c_type = ContentType.objects.get_for_model(model)
+    pending = SearchIndexQueue.objects.filter(content_type=c_type, object_id=object_id, in_process=False)
+    if not pending.update(action=action):
+        SearchIndexQueue.objects.create(content_type=c_type, object_id=object_id, action=action)
+
+
+# index updates collected by index_on_commit in the current thread
+_deferred = threading.local()
+
+
+def queue_index_update(model, object_id, action=SearchIndexQueue.ACTION_UPDATE):
+    """
+    Add object to search index queue or to the updates of the current index_on_commit block
+    """
+    updates = getattr(_deferred, 'updates', None)
+    if updates is not None:
+        updates[(model, object_id)] = action
+    else:
+        enqueue_index_update(model, object_id, action)
+
+
+@contextmanager
+def index_on_commit():
+    """
+    Run the block in a transaction and queue the index updates of the objects changed by the block
+    once (last action by object) after commit. Audit log entries of the block are saved in the same
+    transaction. Updates and entries are discarded if the block raise an exception
+    """
+    if getattr(_deferred, 'updates', None) is not None:
+        # nested block, updates are queued by the outer block
+        with transaction.atomic():
+            yield
+        return
+
+    _deferred.updates = OrderedDict()
+    try:
+        with transaction.atomic():
+            yield
+            flush_audit_log()
+        updates = _deferred.updates
+    except Exception:
+        discard_audit_log()
+        raise
+    finally:
+        _deferred.updates = None
+
+    for (model, object_id), action in updates.items():
+        enqueue_index_update(model, object_id, action)
+
+
+def reset_index_queue():
+    """
+    Return to pending state the entries left in process by an interrupted worker
+    """
+    SearchIndexQueue.objects.filter(in_process=True).update(in_process=False)
+
+
+def process_index_queue(using='default', batch_size=1000):
+    """
+    Send a batch of pending entries of the search index queue to the search engine.
+    Return number of entries processed
+    """
+    entry_ids = list(SearchIndexQueue.objects.filter(in_process=False).order_by('pk')
+                                             .values_list('pk', flat=True)[:batch_size])
+    if not entry_ids:
+        return 0
+
+    # entries in process are not reused by enqueue_index_update
+    SearchIndexQueue.objects.filter(pk__in=entry_ids).update(in_process=True)
+    entries = SearchIndexQueue.objects.filter(pk__in=entry_ids).order_by('pk')
+
+    # last action by object, grouped by content type
+    actions = OrderedDict()
+    for entry in entries:
+        actions.setdefault(entry.content_type_id, OrderedDict())[entry.object_id] = entry.action
+
+    backend = connections[using].get_backend()
+    unified_index = connections[using].get_unified_index()
+
+    for c_type_id, object_actions in actions.items():
+        model = ContentType.objects.get_for_id(c_type_id).model_class()
+        try:
+            index = unified_index.get_index(model)
+        except NotHandled:
+            continue
+
+        update_ids = [pk for pk, action in object_actions.items() if action == SearchIndexQueue.ACTION_UPDATE]
+        objects = list(index.index_queryset(using=using).filter(pk__in=update_ids)) if update_ids else []
+        found_ids = set(obj.pk for obj in objects)
+
+        objects = [obj for obj in objects if index.should_update(obj)]
+        if objects:
+            backend.update(index, objects)
+
+        # removed objects or objects not available for index anymore
+        for pk in object_actions:
+            if pk not in found_ids:
+                backend.remove('%s.%s.%s' % (model._meta.app_label, model._meta.model_name, pk))
+
+    SearchIndexQueue.objects.filter(pk__in=entry_ids).delete()
+
+    return len(entry_ids)
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Signal processor that store changes of indexed objects at SearchIndexQueue instead of updating the
+    search engine inside the request. Changes of descriptors, keywords, thematic areas and attachments
+    queue an update of the related object. The queue is sent to search engine by process_index_queue command.
+    """
+    generic_related_models = (Descriptor, Keyword, ResourceThematic, Attachment)
+
+    def setup(self):
+        models.signals.post_save.connect(self.handle_save)
+        models.signals.post_delete.connect(self.handle_delete)
+
+    def teardown(self):
+        models.signals.post_save.disconnect(self.handle_save)
+        models.signals.post_delete.disconnect(self.handle_delete)
+
+    def handle_save(self, sender, instance, **kwargs):
+        if sender in self.generic_related_models:
+            self.handle_related(instance)
+        elif is_indexed(sender):
+            queue_index_update(sender, instance.pk)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        if sender in self.generic_related_models:
+            self.handle_related(instance)
+        elif is_indexed(sender):
+            queue_index_update(sender, instance.pk, SearchIndexQueue.ACTION_DELETE)
+
+    def handle_related(self, instance):
+        if not instance.content_type_id or not instance.object_id:
+            return
+
+        model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+        if model and is_indexed(model):
+            queue_index_update(model, instance.object_id)
@@ -0,0 +1,69 @@
+#! coding: utf-8
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haystack import connections
+from haystack.exceptions import NotHandled
+
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and number of queries to build the search documents of a batch of records, ' \
+           'with related rows preloaded for the batch and loaded one record at a time (before)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', nargs='?', default='biblioref.ReferenceAnalytic',
+                            help='Indexed model (app_label.ModelName)')
+        parser.add_argument('-n', '--rows', type=int, default=1000, help='Number of records of the batch')
+        parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of executions')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+            index = connections['default'].get_unified_index().get_index(model)
+        except (LookupError, ValueError, NotHandled):
+            raise CommandError('"%s" is not an indexed model' % options['model'])
+
+        objects = list(index.index_queryset().order_by('pk')[:options['rows']])
+        if not objects:
+            self.stdout.write('No records found')
+            return
+
+        def prepare_batch():
+            index.prepare_batch(objects)
+            try:
+                for obj in objects:
+                    index.full_prepare(obj)
+            finally:
+                index.clear_batch()
+
+        def prepare_one_by_one():
+            # each record is loaded as a batch of one record
+            for obj in objects:
+                index.full_prepare(obj)
+                index.clear_batch()
+
+        # populate ContentType and translation caches
+        index.full_prepare(objects[0])
+        index.clear_batch()
+
+        results = []
+        for name, function in (('batch', prepare_batch), ('one by one (before)', prepare_one_by_one)):
+            timings = []
+            for count in range(options['repeat']):
+                with CaptureQueriesContext(connection) as context:
+                    start = time.time()
+                    function()
+                    timings.append(time.time() - start)
+
+            results.append(min(timings))
+            self.stdout.write('%s: %d queries, min %.1f ms, %.2f ms/record' % (
+                              name, len(context.captured_queries), min(timings) * 1000,
+                              min(timings) / len(objects) * 1000))
+
+        self.stdout.write('%d records' % len(objects))
+        if results[0]:
+            self.stdout.write('speed-up: %.1fx' % (results[1] / results[0]))
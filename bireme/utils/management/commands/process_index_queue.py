@@ -0,0 +1,38 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+
+from utils.indexing import process_index_queue, reset_index_queue
+
+import time
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = 'Send pending updates of search index queue (QueuedSignalProcessor) to search engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of queue entries sent to search engine on each commit')
+        parser.add_argument('-u', '--using', default='default', help='Haystack connection name')
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help='Keep running and check the queue every --interval seconds')
+        parser.add_argument('-i', '--interval', type=int, default=DEFAULT_INTERVAL,
+                            help='Seconds to wait when queue is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        # only one worker must run at a time, entries in process belongs to an interrupted execution
+        reset_index_queue()
+
+        while True:
+            total = process_index_queue(using=options['using'], batch_size=options['batch_size'])
+            if total and verbosity >= 2:
+                self.stdout.write('%d queue entries sent to search engine' % total)
+
+            if total < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
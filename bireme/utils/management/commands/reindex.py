@@ -0,0 +1,148 @@
+#! coding: utf-8
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections as db_connections
+from django.db.models import Min, Max
+
+from haystack import connections
+from haystack.utils.app_loading import haystack_get_models, haystack_load_apps
+
+import json
+import multiprocessing
+import os
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHECKPOINT_FILE = os.path.join(settings.PROJECT_ROOT_PATH, 'reindex-checkpoint.json')
+
+
+def model_label(model):
+    return '%s.%s' % (model._meta.app_label, model._meta.model_name)
+
+
+def index_range(args):
+    """
+    Build and send to search engine the documents of one id range [start, end) of a model
+    """
+    using, label, start, end = args
+
+    model = haystack_get_models(label)[0]
+    index = connections[using].get_unified_index().get_index(model)
+    backend = connections[using].get_backend()
+
+    objects = list(index.build_queryset(using=using).filter(pk__gte=start, pk__lt=end).order_by('pk'))
+    if objects:
+        backend.update(index, objects, commit=True)
+
+    return (label, start, len(objects))
+
+
+def init_worker(using):
+    # each worker process need its own database and search engine connections
+    for alias in db_connections:
+        db_connections[alias].close()
+    connections[using].reset_sessions()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search index by id ranges using a pool of processes. Interrupted runs are resumed ' \
+           'from the checkpoint file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('labels', nargs='*', help='app_label or app_label.model_name to index')
+        parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Size of the id range sent to search engine on each commit')
+        parser.add_argument('-k', '--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('-c', '--checkpoint', default=DEFAULT_CHECKPOINT_FILE, help='Checkpoint file path')
+        parser.add_argument('-u', '--using', default='default', help='Haystack connection name')
+        parser.add_argument('--reset', action='store_true', default=False,
+                            help='Ignore existing checkpoint and index everything')
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options.get('verbosity', 1))
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+        self.checkpoint_file = options['checkpoint']
+        self.using = options['using']
+
+        self.checkpoint = {} if options['reset'] else self.load_checkpoint()
+
+        for model in self.get_models(options['labels']):
+            self.index_model(model)
+
+        # complete run, next execution starts from zero
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    def get_models(self, labels):
+        unified_index = connections[self.using].get_unified_index()
+        indexed_models = unified_index.get_indexed_models()
+
+        models = []
+        for label in labels or haystack_load_apps():
+            for model in haystack_get_models(label):
+                if model in indexed_models and model not in models:
+                    models.append(model)
+
+        return models
+
+    def index_model(self, model):
+        label = model_label(model)
+        index = connections[self.using].get_unified_index().get_index(model)
+        queryset = index.build_queryset(using=self.using)
+        id_range = queryset.aggregate(first_id=Min('pk'), last_id=Max('pk'))
+        if id_range['first_id'] is None:
+            return
+
+        state = self.checkpoint.get(label)
+        if not state or state['batch_size'] != self.batch_size:
+            state = {'first_id': id_range['first_id'], 'batch_size': self.batch_size, 'done': []}
+            self.checkpoint[label] = state
+
+        done = set(state['done'])
+        tasks = [(self.using, label, start, start + self.batch_size)
+                 for start in range(state['first_id'], id_range['last_id'] + 1, self.batch_size)
+                 if start not in done]
+
+        if self.verbosity >= 1:
+            self.stdout.write('Indexing %s: %d of %d ranges pending' % (label, len(tasks), len(tasks) + len(done)))
+
+        if self.workers > 1:
+            # forked workers must not share the parent database connections
+            for alias in db_connections:
+                db_connections[alias].close()
+
+            pool = multiprocessing.Pool(self.workers, initializer=init_worker, initargs=(self.using,))
+            try:
+                for result in pool.imap_unordered(index_range, tasks):
+                    self.range_done(*result)
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        else:
+            for task in tasks:
+                self.range_done(*index_range(task))
+
+    def range_done(self, label, start, total):
+        self.checkpoint[label]['done'].append(start)
+        self.save_checkpoint()
+
+        if self.verbosity >= 2:
+            self.stdout.write('  %s: indexed %d records from id %d' % (label, total, start))
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return {}
+
+        with open(self.checkpoint_file) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def save_checkpoint(self):
+        # write to temporary file and rename to avoid a corrupted checkpoint if process is killed
+        tmp_file = '%s.tmp' % self.checkpoint_file
+        with open(tmp_file, 'w') as checkpoint_file:
+            json.dump(self.checkpoint, checkpoint_file)
+
+        os.rename(tmp_file, self.checkpoint_file)
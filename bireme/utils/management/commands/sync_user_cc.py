@@ -0,0 +1,17 @@
+#! coding: utf-8
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+
+from utils.models import sync_user_cooperative_center
+
+
+class Command(BaseCommand):
+    help = 'Copy cooperative center data of all user profiles to UserCooperativeCenter table'
+
+    def handle(self, *args, **options):
+        total = 0
+        for user in User.objects.all().iterator():
+            sync_user_cooperative_center(user.pk, user.profile.data)
+            total += 1
+
+        self.stdout.write('%d users synchronized' % total)
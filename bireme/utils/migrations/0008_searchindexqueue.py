@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('utils', '0007_auto_20180220_1041'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexQueue',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(default=b'U', max_length=1, verbose_name='Action')),
+                ('in_process', models.BooleanField(default=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'search index queue',
+                'verbose_name_plural': 'search index queue',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='searchindexqueue',
+            index_together=set([('content_type', 'object_id')]),
+        ),
+    ]
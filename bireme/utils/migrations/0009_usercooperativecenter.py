@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('utils', '0008_searchindexqueue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCooperativeCenter',
+            fields=[
+                ('user', models.OneToOneField(related_name='cooperative_center', primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('cc', models.CharField(db_index=True, max_length=55, verbose_name='Cooperative center', blank=True)),
+                ('ccs', models.TextField(verbose_name='Cooperative centers of network', blank=True)),
+                ('networks', models.TextField(verbose_name='Networks', blank=True)),
+            ],
+            options={
+                'verbose_name': 'user cooperative center',
+                'verbose_name_plural': 'user cooperative centers',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+import json
+
+
+def parse_cooperative_center(raw_data):
+    try:
+        profile_data = json.loads(raw_data) if raw_data else {}
+    except ValueError:
+        profile_data = {}
+
+    return {
+        'cc': profile_data.get('cc') or '',
+        'ccs': json.dumps(profile_data.get('ccs') or []),
+        'networks': json.dumps(profile_data.get('networks') or []),
+    }
+
+
+def profile_model(apps):
+    # profile model of biremelogin: one-to-one relation with user (user.profile) with json data
+    for model in apps.get_app_config('biremelogin').get_models():
+        for field in model._meta.fields:
+            if field.one_to_one and field.rel.related_name == 'profile':
+                return model
+
+    raise LookupError("biremelogin profile model not found")
+
+
+def backfill_user_cooperative_center(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserCooperativeCenter = apps.get_model('utils', 'UserCooperativeCenter')
+    profiles = dict(profile_model(apps).objects.values_list('user_id', 'data'))
+
+    synchronized = set(UserCooperativeCenter.objects.values_list('user_id', flat=True))
+    for user_id in User.objects.exclude(pk__in=synchronized).values_list('pk', flat=True).iterator():
+        UserCooperativeCenter.objects.create(user_id=user_id, **parse_cooperative_center(profiles.get(user_id)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biremelogin', '__first__'),
+        ('utils', '0009_usercooperativecenter'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_cooperative_center, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,4 @@
 from django.db import models
-from django.forms.models import model_to_dict
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _, get_language
 from django.contrib.auth.models import User
@@ -7,29 +6,70 @@ from django.contrib.admin.models import LogEntry, ADDITION, CHANGE
 from django.contrib.contenttypes.models import ContentType
 
 from main import choices
+from utils.translation_cache import cached_translations, cached_translation
+
+import copy
+import simplejson
 
 #from datetime import datetime
 
-class Generic(models.Model):
+# (name, attname) of the fields tracked by ChangeTracker by model
+_tracked_fields = {}
 
-    def __init__(self, *args, **kwargs):
-        super(Generic, self).__init__(*args, **kwargs)
-        self.__initial = self._dict
 
-    class Meta:
-        abstract = True
+def tracked_fields(model):
+    fields = _tracked_fields.get(model)
+    if fields is None:
+        fields = [(field.name, field.attname) for field in model._meta.concrete_fields if field.editable]
+        _tracked_fields[model] = fields
 
-    created_time = models.DateTimeField(_("created at"), auto_now_add=True, editable=False)
-    updated_time = models.DateTimeField(_("updated"), auto_now=True, editable=False, null=True, blank=True)
-    created_by = models.ForeignKey(User, null=True, blank=True, related_name="+", editable=False)
-    updated_by = models.ForeignKey(User, null=True, blank=True, related_name="+", editable=False)
+    return fields
+
+
+def tracked_values(instance):
+    # deferred fields are not at instance __dict__ and are not tracked
+    values = instance.__dict__
+    return dict((attname, values[attname]) for name, attname in tracked_fields(type(instance)) if attname in values)
+
+
+class ChangeTracker(object):
+    """
+    Report the concrete editable fields changed since the instance was loaded or saved. Values are
+    compared as stored at the instance (ex. id of foreign keys), without form field conversion.
+
+    The snapshot is lazy: an instance loaded from database only keeps a reference to the row read and
+    the initial values are built from it when changes are checked. Values are deep-copied at save, so
+    changes made in place at JSON fields (ex. obj.title.append(...)) are detected.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ChangeTracker, cls).from_db(db, field_names, values)
+        instance._loaded_row = (db, field_names, values)
+        return instance
+
+    @property
+    def initial_values(self):
+        initial = self.__dict__.get('_initial_values')
+        if initial is None:
+            initial = {}
+            if '_loaded_row' in self.__dict__:
+                # other instance of the same row has the values as converted at load (ex. JSON decoded)
+                loaded = super(ChangeTracker, type(self)).from_db(*self._loaded_row)
+                initial = tracked_values(loaded)
+            self._initial_values = initial
+
+        return initial
 
     @property
     def diff(self):
-        d1 = self.__initial
-        d2 = self._dict
-        diffs = [(k, (v, d2[k])) for k, v in d1.items() if v != d2[k]]
-        return dict(diffs)
+        initial = self.initial_values
+        current = self.__dict__
+        diffs = {}
+        for name, attname in tracked_fields(type(self)):
+            if attname in initial and initial[attname] != current.get(attname):
+                diffs[name] = (initial[attname], current.get(attname))
+
+        return diffs
 
     @property
     def has_changed(self):
@@ -45,16 +85,21 @@ class Generic(models.Model):
         """
         return self.diff.get(field_name, None)
 
+    def save(self, *args, **kwargs):
+        super(ChangeTracker, self).save(*args, **kwargs)
+        self._initial_values = copy.deepcopy(tracked_values(self))
+        self.__dict__.pop('_loaded_row', None)
 
-    @property
-    def _dict(self):
-        return model_to_dict(self, fields=[field.name for field in
-                             self._meta.fields])
 
+class Generic(ChangeTracker, models.Model):
 
-    def save(self, *args, **kwargs):
-        super(Generic, self).save(*args, **kwargs)
-        self.__initial = self._dict
+    class Meta:
+        abstract = True
+
+    created_time = models.DateTimeField(_("created at"), auto_now_add=True, editable=False)
+    updated_time = models.DateTimeField(_("updated"), auto_now=True, editable=False, null=True, blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, related_name="+", editable=False)
+    updated_by = models.ForeignKey(User, null=True, blank=True, related_name="+", editable=False)
 
 
 class CountryManager(models.Manager):
@@ -79,18 +124,18 @@ class Country(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % ('en', self.name.strip())]
-        translation = CountryLocal.objects.filter(country=self.id)
+        translation = cached_translations(CountryLocal, 'country', self.id)
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.name.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, name.strip()) for language, name in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = CountryLocal.objects.filter(country=self.id, language=lang_code.lower())
-        if translation:
-            return translation[0].name
+        translation = cached_translation(CountryLocal, 'country', self.id, lang_code)
+        if translation is not None:
+            return translation
         else:
             return self.name
 
@@ -118,24 +163,25 @@ class AuxCode(Generic):
 
     def get_translations(self):
         translation_list = ["%s^%s" % (self.language, self.label.strip())]
-        translation = AuxCodeLocal.objects.filter(auxcode_id=self.id)
+        translation = cached_translations(AuxCodeLocal, 'auxcode', self.id, label_field='label')
         if translation:
-            other_languages = ["%s^%s" % (trans.language, trans.label.strip()) for trans in translation]
+            other_languages = ["%s^%s" % (language, label.strip()) for language, label in translation]
             translation_list.extend(other_languages)
 
         return translation_list
 
     def get_all_labels(self):
         label_list = [self.label]
-        label_list.extend([local.label for local in AuxCodeLocal.objects.filter(auxcode_id=self.id)])
+        label_list.extend([label for language, label in cached_translations(AuxCodeLocal, 'auxcode', self.id,
+                                                                            label_field='label')])
 
         return label_list
 
     def __unicode__(self):
         lang_code = get_language()
-        translation = AuxCodeLocal.objects.filter(auxcode_id=self.id, language=lang_code)
-        if translation:
-            return translation[0].label
+        translation = cached_translation(AuxCodeLocal, 'auxcode', self.id, lang_code, label_field='label')
+        if translation is not None:
+            return translation
         else:
             return self.label
 
@@ -152,3 +198,73 @@ class AuxCodeLocal(models.Model):
 
     def __unicode__(self):
         return self.label
+
+
+# Pending updates of search index (see utils.indexing.QueuedSignalProcessor)
+class SearchIndexQueue(models.Model):
+
+    class Meta:
+        verbose_name = _("search index queue")
+        verbose_name_plural = _("search index queue")
+        index_together = [['content_type', 'object_id']]
+
+    ACTION_UPDATE = 'U'
+    ACTION_DELETE = 'D'
+
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(_("Action"), max_length=1, default=ACTION_UPDATE)
+    in_process = models.BooleanField(default=False)
+    created_time = models.DateTimeField(_("created at"), auto_now_add=True, editable=False)
+
+    def __unicode__(self):
+        return u"%s.%s (%s)" % (self.content_type_id, self.object_id, self.action)
+
+
+# Denormalized copy of cooperative center data of user profile (biremelogin) for indexed queries
+class UserCooperativeCenter(models.Model):
+
+    class Meta:
+        verbose_name = _("user cooperative center")
+        verbose_name_plural = _("user cooperative centers")
+
+    user = models.OneToOneField(User, primary_key=True, related_name='cooperative_center')
+    cc = models.CharField(_("Cooperative center"), max_length=55, db_index=True, blank=True)
+    ccs = models.TextField(_("Cooperative centers of network"), blank=True)
+    networks = models.TextField(_("Networks"), blank=True)
+
+    def get_ccs(self):
+        return simplejson.loads(self.ccs) if self.ccs else []
+
+    def get_networks(self):
+        return simplejson.loads(self.networks) if self.networks else []
+
+    def __unicode__(self):
+        return u"%s (%s)" % (self.user_id, self.cc)
+
+
+def parse_profile_data(raw_data):
+    try:
+        return simplejson.loads(raw_data) if raw_data else {}
+    except ValueError:
+        return {}
+
+
+def user_cooperative_center_fields(raw_data):
+    profile_data = parse_profile_data(raw_data)
+    return {
+        'cc': profile_data.get('cc') or '',
+        'ccs': simplejson.dumps(profile_data.get('ccs') or []),
+        'networks': simplejson.dumps(profile_data.get('networks') or []),
+    }
+
+
+def sync_user_cooperative_center(user_id, raw_data):
+    UserCooperativeCenter.objects.update_or_create(user_id=user_id,
+                                                   defaults=user_cooperative_center_fields(raw_data))
+
+
+def profile_saved(sender, instance, **kwargs):
+    # keep UserCooperativeCenter in sync with user profile (biremelogin) data
+    if instance.user_id:
+        sync_user_cooperative_center(instance.user_id, instance.data)
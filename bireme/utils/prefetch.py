@@ -0,0 +1,44 @@
+#! coding: utf-8
+from collections import defaultdict
+
+
+def bulk_generic_related(model, ids_by_ctype, select_related=(), **filters):
+    """
+    Load rows of a generic relation model (ex. Descriptor, ResourceThematic, Attachment) for
+    a group of objects using one IN query by content type.
+    Return dictionary keyed by (content_type_id, object_id) with list of rows
+    """
+    related = defaultdict(list)
+    for ctype_id, object_ids in ids_by_ctype.items():
+        if not object_ids:
+            continue
+        rows = model.objects.filter(content_type_id=ctype_id, object_id__in=object_ids, **filters)
+        if select_related:
+            rows = rows.select_related(*select_related)
+
+        for row in rows:
+            related[(row.content_type_id, row.object_id)].append(row)
+
+    return related
+
+
+def bulk_related(model, field_name, object_ids, select_related=(), **filters):
+    """
+    Load rows of model related by foreign key (field_name) to a list of object ids using a single IN query.
+    Return dictionary keyed by object id with list of rows
+    """
+    related = defaultdict(list)
+    if not object_ids:
+        return related
+
+    lookup = {'%s__in' % field_name: object_ids}
+    lookup.update(filters)
+    rows = model.objects.filter(**lookup)
+    if select_related:
+        rows = rows.select_related(*select_related)
+
+    attname = model._meta.get_field(field_name).attname
+    for row in rows:
+        related[getattr(row, attname)].append(row)
+
+    return related
@@ -0,0 +1,69 @@
+#! coding: utf-8
+from django.db.models.signals import post_save, post_delete
+
+import time
+
+# maximum age (seconds) of cached data. Signals only invalidate the cache of the process where the
+# change was made, the timeout make other processes reload the data.
+PROCESS_CACHE_TIMEOUT = 300
+
+# all caches of process (see clear_process_caches)
+_process_caches = []
+
+
+class ProcessCache(object):
+    """
+    Base of per-process caches of data loaded from database tables (auxiliary tables, choice lists).
+
+    Each entry is loaded at first use by a function and stored by key with the models it reads.
+    Entries are reloaded after timeout and invalidated by post_save/post_delete of one of its models.
+    The version is incremented at each invalidation. Cached data is shared, callers must copy before
+    changing it.
+    """
+    # prefix of dispatch_uid of signal receivers
+    name = 'process_cache'
+
+    def __init__(self, timeout=PROCESS_CACHE_TIMEOUT):
+        self.timeout = timeout
+        self.version = 0
+        self.entries = {}
+        self.connected_models = set()
+        _process_caches.append(self)
+
+    def get_entry(self, key, models, load, *args):
+        """
+        Return cached data of key, loaded by load(*args) if missing or expired
+        """
+        entry = self.entries.get(key)
+
+        if entry is None or time.time() - entry[0] > self.timeout:
+            self.connect_signals(models)
+            entry = (time.time(), tuple(models), load(*args))
+            self.entries[key] = entry
+
+        return entry[2]
+
+    def connect_signals(self, models):
+        for model in models:
+            if model not in self.connected_models:
+                dispatch_uid = '%s_%s.%s' % (self.name, model._meta.app_label, model._meta.model_name)
+                post_save.connect(self.invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+                post_delete.connect(self.invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+                self.connected_models.add(model)
+
+    def invalidate(self, sender, **kwargs):
+        self.version += 1
+        for key, (loaded_time, models, data) in self.entries.items():
+            if sender in models:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries = {}
+
+
+def clear_process_caches():
+    """
+    Clear all caches of process (ex. database rolled back between tests)
+    """
+    for cache in _process_caches:
+        cache.clear()
@@ -0,0 +1,47 @@
+#! coding: utf-8
+from django.contrib.auth.models import User
+
+from utils.models import UserCooperativeCenter, parse_profile_data, sync_user_cooperative_center
+
+
+def get_profile_data(user):
+    """
+    Return parsed profile data of user. The result is cached at user object (request.user is
+    created for each request) and parsed again only if profile data changes.
+    """
+    raw_data = user.profile.data
+    cached = getattr(user, '_profile_data_cache', None)
+    if cached is None or cached[0] != raw_data:
+        cached = (raw_data, parse_profile_data(raw_data))
+        user._profile_data_cache = cached
+
+    return cached[1]
+
+
+def get_user_cc(user):
+    """
+    Return cooperative center code of user
+    """
+    return get_profile_data(user).get('cc', '')
+
+
+def get_users_cc(user_ids):
+    """
+    Return dictionary with cooperative center code of each user id (one indexed query)
+    """
+    user_ids = set(user_ids)
+    users_cc = dict(UserCooperativeCenter.objects.filter(user__in=user_ids).values_list('user_id', 'cc'))
+
+    # users not synchronized yet
+    for user in User.objects.filter(pk__in=user_ids - set(users_cc.keys())):
+        users_cc[user.pk] = get_user_cc(user)
+        sync_user_cooperative_center(user.pk, user.profile.data)
+
+    return users_cc
+
+
+def users_of_cc(cc_list):
+    """
+    Return queryset of users of cooperative centers in cc_list
+    """
+    return User.objects.filter(cooperative_center__cc__in=cc_list)
@@ -4,7 +4,7 @@ from django.utils.safestring import mark_safe
 from django.utils.html import linebreaks
 from django.core.exceptions import FieldDoesNotExist
 
-from utils.models import AuxCode
+from utils.aux_choices import aux_choices
 
 import json
 
@@ -248,7 +248,7 @@ def substring_before(text, delim):
 
 @register.filter
 def auxfield(field):
-    aux_values = AuxCode.objects.filter(field=field.name)
+    aux_values = [label for code, label in aux_choices.get_choices(field.name)]
 
     return aux_values
 
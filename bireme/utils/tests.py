@@ -1,9 +1,30 @@
 # coding: utf-8
 from django.test import TestCase
 from django.test.client import Client
-from django.test.utils import override_settings
-
+from django.test.utils import override_settings, CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.utils import translation
+
+from haystack import connections
+from StringIO import StringIO
+
+from main.models import Resource, Descriptor, ThematicArea
+from biblioref.models import ReferenceSource
+from utils.models import SearchIndexQueue, UserCooperativeCenter, AuxCode, AuxCodeLocal
+from utils.aux_choices import aux_choices, aux_field_choices
+from utils.profile import get_user_cc, users_of_cc
+from utils.context_processors import user_info_counter
+from utils.indexing import process_index_queue
+from utils.process_cache import clear_process_caches
+from utils.version import VersionProvider
+from utils.views import csv_header, csv_lines
+
+import json
+import os
+import tempfile
 
 @override_settings(AUTHENTICATION_BACKENDS=('django.contrib.auth.backends.ModelBackend',))
 class BaseTestCase(TestCase):
@@ -14,6 +35,8 @@ class BaseTestCase(TestCase):
     def setUp(self):
         # set a client.
         self.client = Client()
+        # auxiliary tables and choice lists are cached by process and test database is rolled back between tests
+        clear_process_caches()
 
     def login_documentalist(self):
         user_doc =  User.objects.create_user('doc', 'user@test.com', 'doc')
@@ -80,3 +103,268 @@ class BaseTestCase(TestCase):
         # only superuser can edit lists
         user_admin = User.objects.create_superuser('admin', 'admin@test.com', 'admin')
         self.client.login(username='admin', password='admin')
+
+
+class VersionProviderTest(TestCase):
+    """
+    Tests for process-wide provider of system version number
+    """
+    def setUp(self):
+        version_file, self.path = tempfile.mkstemp()
+        os.close(version_file)
+        self.write_version('2.1.0', mtime=1000)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_version(self, version, mtime):
+        with open(self.path, 'w') as version_file:
+            version_file.write('%s\n' % version)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_version_reloaded_when_file_changes(self):
+        provider = VersionProvider(self.path, check_interval=0)
+        self.assertEqual(provider.get_version(), '2.1.0')
+
+        # file is not read again if modification time is the same
+        with open(self.path, 'w') as version_file:
+            version_file.write('2.1.1\n')
+        os.utime(self.path, (1000, 1000))
+        self.assertEqual(provider.get_version(), '2.1.0')
+
+        self.write_version('2.2.0', mtime=2000)
+        self.assertEqual(provider.get_version(), '2.2.0')
+
+    def test_check_interval(self):
+        provider = VersionProvider(self.path, check_interval=30)
+        self.assertEqual(provider.get_version(), '2.1.0')
+
+        self.write_version('2.2.0', mtime=2000)
+        self.assertEqual(provider.get_version(), '2.1.0')
+
+        # modification time checked again after the interval
+        provider.last_check -= 30
+        self.assertEqual(provider.get_version(), '2.2.0')
+
+    def test_missing_file(self):
+        provider = VersionProvider(self.path + '.missing', check_interval=0)
+        self.assertEqual(provider.get_version(), '')
+
+
+class ChangeTrackerTest(BaseTestCase):
+    """
+    Tests for change tracking of Generic/AuditLog models
+    """
+    def test_changed_fields(self):
+        user = User.objects.create_user('doc', 'user@test.com', 'doc')
+        resource = Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                           originator='BIREME', created_by=user, cooperative_center_code='BR1.1')
+        resource = Resource.objects.get(pk=resource.pk)
+        self.assertFalse(resource.has_changed)
+
+        resource.title = 'Recurso de teste alterado'
+        resource.status = 1
+        self.assertEqual(sorted(resource.changed_fields), ['status', 'title'])
+        self.assertEqual(resource.get_field_diff('status'), (0, 1))
+
+        resource.save()
+        self.assertFalse(resource.has_changed)
+
+    def test_json_field_changed_in_place(self):
+        source = ReferenceSource.objects.create(status=-1, literature_type='S', treatment_level='',
+                                                title_serial='Rev. Enfermagem',
+                                                electronic_address=[{'_u': 'http://bvsalud.org'}])
+        source = ReferenceSource.objects.get(pk=source.pk)
+        source.electronic_address.append({'_u': 'http://fulltext.org'})
+        self.assertEqual(source.changed_fields, ['electronic_address'])
+        self.assertEqual(source.get_field_diff('electronic_address')[0], [{'_u': 'http://bvsalud.org'}])
+
+        # values are copied at save
+        source.save()
+        self.assertFalse(source.has_changed)
+        source.electronic_address.pop()
+        self.assertEqual(source.changed_fields, ['electronic_address'])
+
+
+def create_resources():
+    """
+    Create three resources of two cooperative centers
+    """
+    for created_by_id, cc in ((1, 'BR1.1'), (2, 'BR1.1'), (3, 'PY3.1')):
+        Resource.objects.create(status=0, title='Recurso de teste (%s)' % cc, link='http://bvsalud.org',
+                                originator='BIREME', created_by_id=created_by_id, cooperative_center_code=cc)
+
+
+class ReindexCommandTest(BaseTestCase):
+    """
+    Tests for reindex management command
+    """
+    def setUp(self):
+        super(ReindexCommandTest, self).setUp()
+
+        connections.connections_info['simple'] = {'ENGINE': 'haystack.backends.simple_backend.SimpleEngine'}
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+        ThematicArea.objects.create(acronym='LISBR1.1', name='Enfermagem')
+        create_resources()
+        self.first_id = Resource.objects.order_by('pk')[0].pk
+
+    def tearDown(self):
+        del connections.connections_info['simple']
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def reindex(self):
+        out = StringIO()
+        call_command('reindex', 'main.resource', using='simple', batch_size=2, checkpoint=self.checkpoint,
+                     verbosity=2, stdout=out)
+
+        return out.getvalue()
+
+    def test_reindex(self):
+        """
+        Tests all ranges are indexed and checkpoint is removed at end
+        """
+        output = self.reindex()
+
+        self.assertIn('2 of 2 ranges pending', output)
+        self.assertIn('indexed 2 records from id %s' % self.first_id, output)
+        self.assertIn('indexed 1 records from id %s' % (self.first_id + 2), output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_reindex_resume(self):
+        """
+        Tests ranges saved at checkpoint are not indexed again
+        """
+        with open(self.checkpoint, 'w') as checkpoint:
+            json.dump({'main.resource': {'first_id': self.first_id, 'batch_size': 2, 'done': [self.first_id]}},
+                      checkpoint)
+
+        output = self.reindex()
+
+        self.assertIn('1 of 2 ranges pending', output)
+        self.assertNotIn('from id %s\n' % self.first_id, output)
+        self.assertIn('indexed 1 records from id %s' % (self.first_id + 2), output)
+
+
+class SearchIndexQueueTest(BaseTestCase):
+    """
+    Tests for queue of search index updates (QueuedSignalProcessor)
+    """
+    def setUp(self):
+        super(SearchIndexQueueTest, self).setUp()
+
+        connections.connections_info['simple'] = {'ENGINE': 'haystack.backends.simple_backend.SimpleEngine'}
+        ThematicArea.objects.create(acronym='LISBR1.1', name='Enfermagem')
+
+    def tearDown(self):
+        del connections.connections_info['simple']
+
+    def test_queue_coalesce(self):
+        """
+        Tests several changes of a resource generate only one queue entry
+        """
+        resource = Resource.objects.create(status=0, title='Recurso de teste', link='http://bvsalud.org',
+                                           originator='BIREME', cooperative_center_code='BR1.1')
+        resource.title = 'Recurso de teste alterado'
+        resource.save()
+
+        object_ct = ContentType.objects.get_for_model(Resource)
+        Descriptor.objects.create(object_id=resource.pk, content_type=object_ct, text='descritor 1')
+
+        queue = SearchIndexQueue.objects.filter(content_type=object_ct, object_id=resource.pk)
+        self.assertEqual(queue.count(), 1)
+        self.assertEqual(queue[0].action, SearchIndexQueue.ACTION_UPDATE)
+
+        resource.delete()
+        self.assertEqual(queue.count(), 1)
+        self.assertEqual(queue[0].action, SearchIndexQueue.ACTION_DELETE)
+
+    def test_process_queue(self):
+        """
+        Tests queue entries are removed after sent to search engine
+        """
+        create_resources()
+        self.assertEqual(SearchIndexQueue.objects.count(), 3)
+
+        total = process_index_queue(using='simple', batch_size=2)
+        self.assertEqual(total, 2)
+        self.assertEqual(SearchIndexQueue.objects.count(), 1)
+
+        call_command('process_index_queue', using='simple')
+        self.assertEqual(SearchIndexQueue.objects.count(), 0)
+
+
+class UserCooperativeCenterTest(BaseTestCase):
+    """
+    Tests for denormalized cooperative center of user profiles
+    """
+    def test_profile_sync(self):
+        self.login_documentalist()
+        self.login_editor_llxp()
+
+        user_doc = User.objects.get(username='doc')
+        self.assertEqual(UserCooperativeCenter.objects.get(user=user_doc).cc, 'BR1.1')
+        self.assertEqual(UserCooperativeCenter.objects.get(user=user_doc).get_ccs(), ['BR1.1'])
+        self.assertEqual(get_user_cc(user_doc), 'BR1.1')
+
+        self.assertEqual([user.username for user in users_of_cc(['BR772'])], ['editor_llxp'])
+
+        # change of profile data
+        user_doc.profile.data = '{"cc": "PY3.1", "ccs": ["PY3.1"], "networks": [], "service_role": []}'
+        user_doc.profile.save()
+        self.assertEqual(UserCooperativeCenter.objects.get(user=user_doc).cc, 'PY3.1')
+        self.assertEqual(get_user_cc(user_doc), 'PY3.1')
+
+    def test_user_info_computed_once_by_request(self):
+        """
+        Tests user info is shared by views and context processor of the same request
+        """
+        self.login_documentalist()
+
+        user_info_counter.reset()
+        response = self.client.get('/resources/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_info_counter.computed, 1)
+
+
+class CSVExportTest(BaseTestCase):
+    """
+    Tests for streaming CSV export of reports (CSVResponseMixin)
+    """
+    def test_csv_of_values_queryset(self):
+        report_rows = ThematicArea.objects.values('acronym', 'name').order_by('name')
+        self.assertEqual(list(csv_lines(report_rows, csv_header(report_rows))), ['acronym,name\r\n'])
+
+        ThematicArea.objects.create(acronym='LISBR1.1', name=u'Saúde')
+        self.assertEqual(list(csv_lines(report_rows, csv_header(report_rows))),
+                         ['acronym,name\r\n', 'LISBR1.1,Sa\xc3\xbade\r\n'])
+
+
+class AuxChoiceRegistryTest(BaseTestCase):
+    """
+    Tests for choices of auxiliary code fields (utils.aux_choices)
+    """
+    def test_choices_by_language(self):
+        aux = AuxCode.objects.create(code='pt', field='text_language', language='pt', label=u'Português')
+        AuxCodeLocal.objects.create(auxcode=aux, language='en', label='Portuguese')
+        AuxCode.objects.create(code='Doutorado', field='thesis_dissertation_academic_title', language='pt',
+                               label='Doutorado')
+
+        self.assertEqual(aux_choices.get_choices('text_language', 'pt-br'), [('pt', u'Português')])
+        self.assertEqual(aux_choices.get_choices('text_language', 'en'), [('pt', 'Portuguese')])
+        self.assertEqual(aux_choices.get_all_labels('text_language'), set([u'Português', 'Portuguese']))
+
+        # all fields and languages are served from the registry
+        with CaptureQueriesContext(connection) as context:
+            aux_choices.get_choices('thesis_dissertation_academic_title', 'es')
+            translation.activate('en')
+            aux_field_choices('text_language')
+            translation.deactivate()
+        self.assertEqual(len(context.captured_queries), 0)
+
+        # changes invalidate the registry
+        version = aux_choices.version
+        AuxCode.objects.create(code='es', field='text_language', language='pt', label=u'Espanhol')
+        self.assertGreater(aux_choices.version, version)
+        self.assertEqual(aux_choices.get_choices('text_language', 'pt-br'), [('pt', u'Português'), ('es', u'Espanhol')])
@@ -0,0 +1,54 @@
+#! coding: utf-8
+from utils.process_cache import ProcessCache
+
+
+class TranslationCache(ProcessCache):
+    """
+    Per-process cache of the translation tables (*Local models) of auxiliary models.
+
+    The whole translation table is loaded with one query at first use and stored as
+    {object_id: [(language, label), ...]}. Tables are invalidated by post_save/post_delete
+    of the translation model and of the translated (base) model.
+    """
+    name = 'translation_cache'
+
+    def get_table(self, local_model, fk_name, label_field):
+        base_model = local_model._meta.get_field(fk_name).rel.to
+
+        return self.get_entry((local_model, fk_name, label_field), (local_model, base_model),
+                              self.load_table, local_model, fk_name, label_field)
+
+    def load_table(self, local_model, fk_name, label_field):
+        fk_attname = local_model._meta.get_field(fk_name).attname
+        rows = local_model.objects.order_by('pk').values_list(fk_attname, 'language', label_field)
+
+        table = {}
+        for object_id, language, label in rows:
+            table.setdefault(object_id, []).append((language, label))
+
+        return table
+
+
+translation_cache = TranslationCache()
+
+
+def cached_translations(local_model, fk_name, object_id, label_field='name'):
+    """
+    Return list of (language, label) translations of object_id in local_model
+    """
+    return translation_cache.get_table(local_model, fk_name, label_field).get(object_id, [])
+
+
+def cached_translation(local_model, fk_name, object_id, language, label_field='name'):
+    """
+    Return label of object_id in language or None if there is no translation
+    """
+    if not language:
+        return None
+
+    language = language.lower()
+    for trans_language, label in cached_translations(local_model, fk_name, object_id, label_field):
+        if trans_language.lower() == language:
+            return label
+
+    return None
@@ -0,0 +1,55 @@
+#! coding: utf-8
+from django.conf import settings
+
+import os
+import threading
+import time
+
+VERSION_FILE = os.path.join(settings.PROJECT_ROOT_PATH, 'templates/version.txt')
+
+# minimum interval (seconds) between checks of version file modification time
+VERSION_CHECK_INTERVAL = 30
+
+
+class VersionProvider(object):
+    """
+    Process-wide holder of the system version number (first line of templates/version.txt).
+    The file is read once and only reloaded when its modification time changes.
+    """
+
+    def __init__(self, path, check_interval=VERSION_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.version = ''
+        self.mtime = None
+        self.last_check = 0
+        self.lock = threading.Lock()
+
+    def get_version(self):
+        now = time.time()
+        if now - self.last_check >= self.check_interval:
+            with self.lock:
+                self.last_check = now
+                self.reload_if_changed()
+
+        return self.version
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+
+        if mtime != self.mtime:
+            with open(self.path) as version_file:
+                version_number = version_file.readline()
+
+            self.version = version_number.rstrip()
+            self.mtime = mtime
+
+
+version_provider = VersionProvider(VERSION_FILE)
+
+
+def get_system_version():
+    return version_provider.get_version()
@@ -1,5 +1,6 @@
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.conf import settings
+from django.db.models.query import QuerySet, ValuesQuerySet
 
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
@@ -107,6 +108,35 @@ class GenericUpdateWithOneFormset(LoginRequiredView):
 
         return context
 
+class Echo(object):
+    """
+    Pseudo-buffer for csv.writer that return the written line instead of storing it
+    """
+    def write(self, value):
+        return value
+
+
+def csv_header(data):
+    """
+    Return column names of report data (values() queryset or list of dicts)
+    """
+    if isinstance(data, ValuesQuerySet):
+        return list(data.query.extra_select) + list(data.field_names) + list(data.query.annotation_select)
+
+    return data[0].keys() if data else []
+
+
+def csv_lines(data, header):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+
+    # querysets are read by chunks from database cursor instead of loading the whole result
+    rows = data.iterator() if isinstance(data, QuerySet) else data
+    for item in rows:
+        values = [item[key] for key in header]
+        yield writer.writerow([value.encode('utf-8') if isinstance(value, basestring) else value for value in values])
+
+
 class CSVResponseMixin(object):
     """
     A generic mixin that constructs a CSV response from the context data if
@@ -114,24 +144,15 @@ class CSVResponseMixin(object):
     """
     def render_to_response(self, context, **response_kwargs):
         """
-        Creates a CSV response if requested, otherwise returns the default
+        Creates a streaming CSV response if requested, otherwise returns the default
         template response.
         """
         # Sniff if we need to return a CSV export
         if 'csv' in self.request.GET.get('export', ''):
             data = context['report_rows']
-            response = HttpResponse(content_type='text/csv')
+            response = StreamingHttpResponse(csv_lines(data, csv_header(data)), content_type='text/csv')
             response['Content-Disposition'] = 'attachment; filename="%s.csv"' % slugify(context['title'])
 
-            writer = csv.writer(response)
-            # Write CSV header line
-            writer.writerow(data[0].keys())
-
-            # Write the data from the context somehow
-            for item in data:
-                encode_values = [value.encode('utf-8') if isinstance(value, basestring) else value for value in item.values()]
-                writer.writerow(encode_values)
-
             return response
         # Business as usual otherwise
         else: